@@ -0,0 +1,78 @@
+# Python utils
+import datetime
+import json
+import random
+
+START_TIME = datetime.datetime(2019, 2, 13, 10, 0, 0)
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%S.{:03d}Z"
+
+
+def generate_operations(events, merchants=100, premium_rate=0.0, duplicate_rate=0.05, burstiness=0.1,
+                        accounts=1, seed=0):
+    """
+    Generate a synthetic operation stream, the same parameters always generate the same stream.
+    :param events: Int, number of events, including the account events. e.g. 1000000
+    :param merchants: Int, merchant cardinality. e.g. 100
+    :param premium_rate: Float, probability of a premium account. e.g. 0.5
+    :param duplicate_rate: Float, probability of repeating the merchant and amount of the previous transaction.
+    :param burstiness: Float, probability of a transaction a few seconds after the previous one, the rest are spread
+        over minutes.
+    :param accounts: Int, number of accounts, the events are tagged with an "account-id" if it's more than 1.
+    :param seed: Int, random seed.
+    :return: Generator, operations. e.g.
+        {"account": {"active-card": true, "available-limit": 100}}
+        {"transaction": {"merchant": "Burger King", "amount": 20, "time": "2019-02-13T10:00:00.000Z"}}
+    """
+    generator = random.Random(seed)
+    merchant_names = ['merchant-{}'.format(index) for index in range(merchants)]
+    account_ids = [str(index) for index in range(accounts)]
+    initialized_accounts = set()
+    last_operations = {}
+    elapsed = 0.0
+
+    for _ in range(events):
+        account_id = generator.choice(account_ids)
+
+        if account_id not in initialized_accounts:
+            initialized_accounts.add(account_id)
+            event = {'account': {
+                'active-card': True,
+                'available-limit': generator.randrange(1000, 100000000),
+                'is-premium': generator.random() < premium_rate,
+            }}
+        else:
+            if generator.random() < burstiness:
+                elapsed += generator.uniform(0, 5)
+            else:
+                elapsed += generator.expovariate(1 / 60) / accounts
+
+            last_operation = last_operations.get(account_id)
+            if last_operation and generator.random() < duplicate_rate:
+                merchant, amount = last_operation
+            else:
+                merchant, amount = generator.choice(merchant_names), generator.randrange(1, 500)
+            last_operations[account_id] = (merchant, amount)
+
+            time = START_TIME + datetime.timedelta(seconds=elapsed)
+            event = {'transaction': {
+                'merchant': merchant,
+                'amount': amount,
+                'time': time.strftime(TIME_FORMAT.format(time.microsecond // 1000)),
+            }}
+
+        if accounts > 1:
+            event = {'account-id': account_id, **event}
+        yield event
+
+
+def write_operations(path, events, **options):
+    """
+    Write a synthetic operation stream as JSON lines.
+    :param path: String, file path.
+    :param events: Int, number of events.
+    :param options: Dict, generate_operations options.
+    """
+    with open(path, 'w') as operations_file:
+        for event in generate_operations(events, **options):
+            operations_file.write(json.dumps(event))
+            operations_file.write('\n')
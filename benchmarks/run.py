@@ -0,0 +1,223 @@
+# Python utils
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+# Benchmarks
+from benchmarks.generator import generate_operations, write_operations
+
+# Handlers
+from src.handlers.event_handler import normalize_event
+from src.handlers.operations_handler import process_event_stream
+from src.handlers.replay_handler import replay_events
+from src.handlers.shard_handler import process_sharded_event_stream
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLI_PATH = os.path.join(ROOT_PATH, 'cli.py')
+MAX_LATENCY_SAMPLES = 100000
+
+
+class _TimedSource:
+    """
+    Iterator that measures the time spent generating the events, so it's excluded from the engine time.
+    """
+
+    def __init__(self, events):
+        self.events = events
+        self.elapsed = 0.0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            return normalize_event(next(self.events))
+        finally:
+            self.elapsed += time.perf_counter() - start
+
+
+def benchmark_process_events(events, **options):
+    """
+    Benchmark the per-event engine, the time spent generating and decoding the events is excluded.
+    :param events: Int, number of events.
+    :param options: Dict, generate_operations options.
+    :return: Dict, benchmark results.
+    """
+    source = _TimedSource(generate_operations(events, **options))
+    if options.get('accounts', 1) > 1:
+        results = process_sharded_event_stream(source)
+    else:
+        results = process_event_stream(source)
+
+    sample_every = max(1, events // MAX_LATENCY_SAMPLES)
+    latencies = []
+    processed = 0
+    start = time.perf_counter()
+    while True:
+        event_start, source_start = time.perf_counter(), source.elapsed
+        if next(results, None) is None:
+            break
+        processed += 1
+        if processed % sample_every == 0:
+            latencies.append(time.perf_counter() - event_start - (source.elapsed - source_start))
+    elapsed = time.perf_counter() - start - source.elapsed
+
+    return {
+        'events': processed,
+        'seconds': elapsed,
+        'events_per_second': processed / elapsed if elapsed else None,
+        'latency_us': _percentiles(latencies),
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def benchmark_cli(events, **options):
+    """
+    Benchmark the CLI entry point on a generated operations file, including the process startup.
+    :param events: Int, number of events.
+    :param options: Dict, generate_operations options.
+    :return: Dict, benchmark results.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'operations')
+        write_operations(path, events, **options)
+        command = [sys.executable, CLI_PATH, path]
+        if options.get('accounts', 1) > 1:
+            command.append('--workers={}'.format(os.cpu_count()))
+
+        start = time.perf_counter()
+        subprocess.run(command, stdout=subprocess.DEVNULL, check=True)
+        elapsed = time.perf_counter() - start
+
+    return {
+        'events': events,
+        'seconds': elapsed,
+        'events_per_second': events / elapsed,
+        'latency_us': None,
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    }
+
+
+def benchmark_replay(events, **options):
+    """
+    Benchmark the NumPy offline replay of a whole stream, the time spent generating and decoding the events is
+    excluded. There is no per-event latency, the events are processed at once.
+    :param events: Int, number of events.
+    :param options: Dict, generate_operations options.
+    :return: Dict, benchmark results.
+    """
+    event_list = [normalize_event(event) for event in generate_operations(events, **options)]
+    start = time.perf_counter()
+    processed = len(replay_events(event_list))
+    elapsed = time.perf_counter() - start
+
+    return {
+        'events': processed,
+        'seconds': elapsed,
+        'events_per_second': processed / elapsed if elapsed else None,
+        'latency_us': None,
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+ENGINES = {
+    'process_events': benchmark_process_events,
+    'replay': benchmark_replay,
+    'cli': benchmark_cli,
+}
+
+
+def _percentiles(latencies):
+    """
+    Get the latency percentiles in microseconds.
+    :param latencies: List, latencies in seconds.
+    :return: Dict, percentiles. e.g. {"p50": 5.1, "p90": 8.0, "p99": 20.3, "max": 150.2}
+    """
+    if not latencies:
+        return None
+    latencies = sorted(latencies)
+    last = len(latencies) - 1
+    return {
+        'p50': latencies[last * 50 // 100] * 1e6,
+        'p90': latencies[last * 90 // 100] * 1e6,
+        'p99': latencies[last * 99 // 100] * 1e6,
+        'max': latencies[last] * 1e6,
+    }
+
+
+def _parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the account authorizer on synthetic operation streams.')
+    parser.add_argument('--engine', choices=sorted(ENGINES), default='process_events')
+    parser.add_argument('--events', type=float, nargs='+', default=[1e3, 1e4, 1e5],
+                        help='Stream lengths, from 1e3 to 1e7 events.')
+    parser.add_argument('--merchants', type=int, default=100, help='Merchant cardinality.')
+    parser.add_argument('--premium-rate', type=float, default=0.0, help='Probability of a premium account.')
+    parser.add_argument('--duplicate-rate', type=float, default=0.05, help='Probability of a repeated transaction.')
+    parser.add_argument('--burstiness', type=float, default=0.1, help='Probability of a burst transaction.')
+    parser.add_argument('--accounts', type=int, default=1, help='Number of accounts, tagged with "account-id".')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Write the machine-readable results into this JSON file.')
+    parser.add_argument('--in-process', action='store_true',
+                        help='Run the stream lengths on this process, the peak RSS is the max of all of them.')
+    return parser.parse_args(argv)
+
+
+def _run_isolated(events, arguments):
+    """
+    Run the benchmark of a stream length on its own process, the peak RSS (a max over the process life) is only the
+    one of this stream length.
+    :param events: Int, number of events.
+    :param arguments: Namespace, parsed arguments.
+    :return: Dict, benchmark results.
+    """
+    command = [
+        sys.executable, '-m', 'benchmarks.run', '--in-process', '--engine', arguments.engine, '--events', str(events),
+        '--merchants', str(arguments.merchants), '--premium-rate', str(arguments.premium_rate),
+        '--duplicate-rate', str(arguments.duplicate_rate), '--burstiness', str(arguments.burstiness),
+        '--accounts', str(arguments.accounts), '--seed', str(arguments.seed),
+    ]
+    output = subprocess.run(command, stdout=subprocess.PIPE, check=True, cwd=ROOT_PATH).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main(argv=None):
+    """
+    Run the benchmarks and print a JSON line for every stream length. Every stream length runs on its own process,
+    unless --in-process is set.
+    :param argv: List, command line arguments, sys.argv is used by default.
+    :return: List, benchmark results.
+    """
+    arguments = _parse_arguments(argv)
+    options = {
+        'merchants': arguments.merchants,
+        'premium_rate': arguments.premium_rate,
+        'duplicate_rate': arguments.duplicate_rate,
+        'burstiness': arguments.burstiness,
+        'accounts': arguments.accounts,
+        'seed': arguments.seed,
+    }
+
+    results = []
+    for events in arguments.events:
+        if arguments.in_process:
+            result = {'engine': arguments.engine, 'parameters': dict(options, events=int(events))}
+            result.update(ENGINES[arguments.engine](int(events), **options))
+        else:
+            result = _run_isolated(int(events), arguments)
+        print(json.dumps(result), flush=True)
+        results.append(result)
+
+    if arguments.output:
+        with open(arguments.output, 'w') as output_file:
+            json.dump(results, output_file, indent=2)
+    return results
+
+
+if __name__ == '__main__':
+    main()
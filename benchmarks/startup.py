@@ -0,0 +1,100 @@
+# Python utils
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+CLI_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cli.py')
+DEFAULT_BUDGET_MS = 150.0
+# Modules of the optional subsystems and of the tests, the default mode must not import them.
+FORBIDDEN_MODULES = ('asyncio', 'multiprocessing', 'numpy', 'pytest', 'sqlite3', 'mmap', 'concurrent.futures')
+IMPORT_TIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def benchmark_startup(cli=CLI_PATH, runs=20):
+    """
+    Benchmark the CLI startup on an empty input: the wall time of the whole process and the import time of every
+    module, reported with -X importtime.
+    :param cli: String, CLI script or zipapp path.
+    :param runs: Int, number of runs, the medians are reported.
+    :return: Dict, benchmark results.
+    """
+    wall_times = []
+    import_times = []
+    modules = {}
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, cli], stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, check=True)
+        wall_times.append(time.perf_counter() - start)
+
+        process = subprocess.run([sys.executable, '-X', 'importtime', cli], stdin=subprocess.DEVNULL,
+                                 stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True,
+                                 check=True)
+        modules = _parse_import_times(process.stderr)
+        import_times.append(sum(cumulative for cumulative, top_level in modules.values() if top_level))
+
+    slowest_modules = sorted(modules.items(), key=lambda item: item[1][0], reverse=True)[:10]
+    return {
+        'cli': cli,
+        'runs': runs,
+        'wall_ms': _median(wall_times) * 1000,
+        'import_ms': _median(import_times) / 1000,
+        'slowest_imports_ms': {name: cumulative / 1000 for name, (cumulative, _) in slowest_modules},
+        'forbidden_imports': [name for name in FORBIDDEN_MODULES if name in modules],
+    }
+
+
+def _parse_import_times(report):
+    """
+    :param report: String, -X importtime report.
+    :return: Dict, cumulative import time in microseconds and top-level flag of every module. e.g.
+        {"argparse": (12767, True)}
+    """
+    modules = {}
+    for line in report.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            _, cumulative, indent, name = match.groups()
+            modules[name] = (int(cumulative), len(indent) == 1)
+    return modules
+
+
+def _median(values):
+    """
+    :param values: List, numbers.
+    :return: Float, median.
+    """
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def _parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the account authorizer CLI startup.')
+    parser.add_argument('--cli', default=CLI_PATH, help='CLI script or zipapp, cli.py by default.')
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS,
+                        help='Maximum median wall time of the startup.')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """
+    Run the startup benchmark and print a JSON line, the exit status is 1 if the startup is over the budget or it
+    imports a forbidden module.
+    :param argv: List, command line arguments, sys.argv is used by default.
+    :return: Dict, benchmark results.
+    """
+    arguments = _parse_arguments(argv)
+    result = benchmark_startup(arguments.cli, arguments.runs)
+    result['budget_ms'] = arguments.budget_ms
+    print(json.dumps(result), flush=True)
+    if result['wall_ms'] > arguments.budget_ms or result['forbidden_imports']:
+        sys.exit(1)
+    return result
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+# Python utils
+import argparse
+import compileall
+import os
+import shutil
+import tempfile
+import zipapp
+
+ROOT_PATH = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT = 'account_authorizer.pyz'
+MAIN_MODULE = 'from src.account_authorizer import main\n\nmain()\n'
+
+
+def build_zipapp(output=DEFAULT_OUTPUT, interpreter='/usr/bin/env python3', keep_sources=False):
+    """
+    Build the application into a single zipapp with precompiled modules. The modules are compiled next to their
+    sources (legacy .pyc files), the only ones the zip importer loads, so nothing is compiled at startup. The .pyc
+    files only run with the Python version that built them.
+    :param output: String, zipapp path. e.g. "account_authorizer.pyz"
+    :param interpreter: String, shebang interpreter.
+    :param keep_sources: Bool, keep the .py sources next to the .pyc files.
+    :return: String, zipapp path.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        shutil.copytree(os.path.join(ROOT_PATH, 'src'), os.path.join(directory, 'src'),
+                        ignore=shutil.ignore_patterns('__pycache__', '*.pyc'))
+        if not compileall.compile_dir(os.path.join(directory, 'src'), legacy=True, quiet=1):
+            raise RuntimeError('The application modules could not be compiled')
+        if not keep_sources:
+            for path, _, file_names in os.walk(os.path.join(directory, 'src')):
+                for file_name in file_names:
+                    if file_name.endswith('.py'):
+                        os.remove(os.path.join(path, file_name))
+        with open(os.path.join(directory, '__main__.py'), 'w') as main_file:
+            main_file.write(MAIN_MODULE)
+
+        # The archive is not compressed, the modules are read without inflating them.
+        zipapp.create_archive(directory, output, interpreter=interpreter)
+    return output
+
+
+def _parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description='Build the account authorizer into a single precompiled zipapp.')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='Zipapp path.')
+    parser.add_argument('--interpreter', default='/usr/bin/env python3', help='Shebang interpreter.')
+    parser.add_argument('--keep-sources', action='store_true', help='Keep the .py sources in the zipapp.')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """
+    Build the zipapp.
+    :param argv: List, command line arguments, sys.argv is used by default.
+    """
+    arguments = _parse_arguments(argv)
+    build_zipapp(arguments.output, interpreter=arguments.interpreter, keep_sources=arguments.keep_sources)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,5 @@
 # Authorizer Application
 from src.account_authorizer import main
-import pytest
 
 if __name__ == '__main__':
     main()
@@ -1,29 +1,240 @@
-# Validators
-from dataclasses import dataclass
+# Python utils
+import argparse
+import sys
+from functools import partial
 
 # Utils
-from src.utils.account import Account
+from src.utils.transaction import TRANSACTION_WINDOW
+from src.utils.velocity import parse_velocity_rule, register_velocity_rule
 
 # Handlers
-from src.handlers.account_handler import initialize_account
-from src.handlers.event_handler import get_event_list_from_stdin
-from src.handlers.operations_handler import process_events
+from src.handlers.event_handler import get_event_stream_from_stdin
+from src.handlers.operations_handler import process_event_stream
+from src.handlers.output_handler import write_results
 
+# The handlers of the other modes are imported when their mode is selected, so the startup of the default mode doesn't
+# load the process pools, the event loop, NumPy or SQLite.
 
-def _print_results(event_result):
+
+def _parse_arguments(argv=None):
+    """
+    Parse the command line arguments.
+    :param argv: List, command line arguments, sys.argv is used by default. e.g. ["--stream", "operations"]
+    :return: Namespace, parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description='Authorize the account operations read from stdin or files.')
+    parser.add_argument('files', nargs='*', help='Operations files, the stdin is used by default.')
+    parser.add_argument('--stream', action='store_true',
+                        help='Flush every result as soon as its event is processed (long-lived filter mode).')
+    parser.add_argument('--decode-workers', type=int, metavar='N',
+                        help='Decode the input lines with this number of processes, ahead of the authorization.')
+    parser.add_argument('--workers', type=int,
+                        help='Process events tagged with an "account-id", sharded across this number of processes. '
+                             'In batch mode, the number of processes, the number of CPUs by default.')
+    parser.add_argument('--account-db', metavar='PATH',
+                        help='Keep the states of the accounts tagged with an "account-id" in this SQLite database, '
+                             'across runs, with only the recently used accounts in memory.')
+    parser.add_argument('--account-cache', type=int, default=100000, metavar='SIZE',
+                        help='Number of accounts kept in memory by every process with --account-db.')
+    parser.add_argument('--batch', action='store_true',
+                        help='The files are directories or glob patterns of independent operations files, every file '
+                             'starts its own account and they are processed in parallel.')
+    parser.add_argument('--output-dir', metavar='PATH',
+                        help='In batch mode, write the results of every file into this directory instead of stdout.')
+    parser.add_argument('--max-lateness', type=float, metavar='SECONDS',
+                        help='Reorder the transactions up to this lateness, the later ones get a "late-transaction" '
+                             'violation and are not evaluated.')
+    parser.add_argument('--retry-cache', type=int, metavar='SIZE',
+                        help='Return the first result of the retried transactions (same "idempotency-key" or same '
+                             'merchant, amount and time), up to this number of cached results.')
+    parser.add_argument('--retry-ttl', type=float, default=300.0, metavar='SECONDS',
+                        help='Seconds a result is kept in the retry cache.')
+    parser.add_argument('--amendable', action='store_true',
+                        help='Keep a log of the processed events, so the "reverse-transaction" and "amend-transaction" '
+                             'events change the results of the processed transactions.')
+    parser.add_argument('--amendment-horizon', type=float, default=86400.0, metavar='SECONDS',
+                        help='Max age of a reversed or amended transaction, from the newest one. The older events are '
+                             'dropped from the log.')
+    parser.add_argument('--velocity-rule', type=parse_velocity_rule, action='append', default=[], metavar='SPEC',
+                        help='Add a velocity rule on a bucketed window, e.g. '
+                             '"name=hourly-limit,window=3600,max-count=20,max-amount=5000,per=merchant".')
+    parser.add_argument('--replay', action='store_true',
+                        help='Offline audit/replay of the whole input with NumPy arrays, requires NumPy.')
+    parser.add_argument('--convert', metavar='PATH',
+                        help='Convert the input into a columnar binary log in this file instead of authorizing it.')
+    parser.add_argument('--binary', action='store_true',
+                        help='The operations files are binary logs written with --convert, they are memory-mapped.')
+    parser.add_argument('--state-dir', metavar='PATH',
+                        help='Keep a durable state (write-ahead log and snapshots) in this directory across runs.')
+    parser.add_argument('--snapshot-interval', type=int, default=10000,
+                        help='Number of events between snapshots of the durable state.')
+    parser.add_argument('--tcp', metavar='HOST:PORT',
+                        help='Run a JSON Lines server on this TCP address instead of reading the input once.')
+    parser.add_argument('--unix', metavar='PATH',
+                        help='Run a JSON Lines server on this Unix socket instead of reading the input once.')
+    parser.add_argument('--stats', action='store_true',
+                        help='Print the stage latencies and counters to stderr (Prometheus text format) at exit.')
+    parser.add_argument('--stats-file', metavar='PATH',
+                        help='Write the stage latencies and counters into this Prometheus text file at exit.')
+    arguments = parser.parse_args(argv)
+    if (arguments.binary or arguments.batch) and not arguments.files:
+        parser.error('the binary logs and the batch mode require files')
+    # The durable state, the retry cache and the reorder stage are only applied by the one at a time processing of a
+    # single account.
+    other_modes = (
+        ('--tcp', arguments.tcp), ('--unix', arguments.unix), ('--batch', arguments.batch),
+        ('--convert', arguments.convert), ('--replay', arguments.replay), ('--account-db', arguments.account_db),
+        ('--workers', arguments.workers),
+    )
+    if arguments.state_dir:
+        _reject_options(parser, '--state-dir', other_modes + (('--amendable', arguments.amendable),))
+    if arguments.amendable:
+        # The event indexes of the changes are the processing order ones, the reorder stage would change them.
+        _reject_options(parser, '--amendable', other_modes + (('--max-lateness', arguments.max_lateness is not None),))
+    if arguments.retry_cache:
+        _reject_options(parser, '--retry-cache', other_modes + (
+            ('--state-dir', arguments.state_dir), ('--amendable', arguments.amendable),
+        ))
+    if arguments.max_lateness is not None:
+        _reject_options(parser, '--max-lateness', other_modes)
+    return arguments
+
+
+def _reject_options(parser, option, other_options):
     """
-    Print the results on the console
-    :param event_result: List, event results.
+    Exit with a usage error if an option is combined with an unsupported one.
+    :param parser: ArgumentParser.
+    :param option: String, option name. e.g. "--retry-cache"
+    :param other_options: Tuple, (option name, parsed value) of the unsupported options.
     """
-    for event in event_result:
-        print(event)
+    used_options = [name for name, value in other_options if value]
+    if used_options:
+        parser.error('{} is not supported with {}'.format(option, ', '.join(used_options)))
 
 
-def main():
+def main(argv=None):
     """
     Execute the application.
+    :param argv: List, command line arguments, sys.argv is used by default.
+    """
+    arguments = _parse_arguments(argv)
+    for velocity_rule in arguments.velocity_rule:
+        register_velocity_rule(**velocity_rule)
+    if arguments.stats or arguments.stats_file:
+        from src.handlers.stats_handler import enable_stats, write_stats
+
+        enable_stats()
+        try:
+            _run(arguments)
+        finally:
+            if arguments.stats:
+                write_stats()
+            if arguments.stats_file:
+                write_stats(arguments.stats_file)
+    else:
+        _run(arguments)
+
+
+def _run(arguments):
+    """
+    Run the mode selected by the command line arguments.
+    :param arguments: Namespace, parsed arguments.
+    """
+    if arguments.tcp or arguments.unix:
+        from src.handlers.server_handler import serve
+
+        host, _, port = (arguments.tcp or '').rpartition(':')
+        serve(host=host or None, port=int(port) if port else None, path=arguments.unix)
+        return
+    if arguments.batch:
+        from src.handlers.batch_handler import get_batch_files, process_batch
+
+        process_batch(get_batch_files(arguments.files), output_dir=arguments.output_dir, workers=arguments.workers,
+                      binary=arguments.binary)
+        return
+
+    if arguments.binary:
+        from src.handlers.binary_log_handler import get_event_stream_from_binary_logs
+
+        input_stream = get_event_stream_from_binary_logs(arguments.files)
+    elif arguments.decode_workers:
+        from src.handlers.event_handler import ParallelEventReader
+
+        input_stream = ParallelEventReader(arguments.files, workers=arguments.decode_workers)
+    else:
+        input_stream = get_event_stream_from_stdin(arguments.files)
+    if arguments.convert:
+        from src.handlers.binary_log_handler import convert_events
+
+        convert_events(input_stream, arguments.convert)
+        return
+
+    if arguments.replay and arguments.binary and len(arguments.files) == 1:
+        from src.handlers.binary_log_handler import BinaryEventLog
+        from src.handlers.replay_handler import replay_binary_log
+
+        with BinaryEventLog(arguments.files[0]) as binary_log:
+            event_result = replay_binary_log(binary_log)
+    elif arguments.replay:
+        from src.handlers.replay_handler import replay_events
+
+        event_result = replay_events(list(input_stream))
+    elif not (arguments.account_db or arguments.workers):
+        event_result = _process_single_account(input_stream, arguments)
+    elif arguments.account_db:
+        from src.handlers.account_store_handler import SQLiteAccountStore
+        from src.handlers.shard_handler import process_sharded_event_stream
+
+        create_store = partial(SQLiteAccountStore, arguments.account_db, cache_size=arguments.account_cache)
+        event_result = process_sharded_event_stream(
+            input_stream, workers=arguments.workers or 1, create_store=create_store,
+            count_invalid_events=getattr(input_stream, 'count_malformed_lines', None),
+        )
+    else:
+        from src.handlers.shard_handler import process_sharded_event_stream
+
+        event_result = process_sharded_event_stream(
+            input_stream, workers=arguments.workers,
+            count_invalid_events=getattr(input_stream, 'count_malformed_lines', None),
+        )
+    write_results(event_result, flush_each=arguments.stream)
+    malformed_lines = getattr(input_stream, 'malformed_lines', 0)
+    if malformed_lines:
+        sys.stderr.write('Skipped {} malformed input lines.\n'.format(malformed_lines))
+
+
+def _process_single_account(input_stream, arguments):
+    """
+    Process the events of a single account one at a time, in time order with the reorder stage if there is a max
+    lateness.
+    :param input_stream: Iterable, normalized operations.
+    :param arguments: Namespace, parsed arguments.
+    :return: Generator, operation results in the input order.
     """
-    event_list = get_event_list_from_stdin()
-    # account = initialize_account()
-    event_result = process_events(event_list=event_list)
-    _print_results(event_result)
+    # The reorder stage releases the transactions in time order, the history only needs its window.
+    max_lateness = None if arguments.max_lateness is None else int(arguments.max_lateness * 1000000)
+    if arguments.state_dir:
+        from src.handlers.state_handler import DurableState, process_durable_event_stream
+
+        durable_state = DurableState(arguments.state_dir, snapshot_interval=arguments.snapshot_interval,
+                                     max_lateness=max_lateness)
+        process = partial(process_durable_event_stream, durable_state=durable_state)
+    elif arguments.amendable:
+        from src.handlers.amend_handler import process_amendable_event_stream
+
+        window = max([TRANSACTION_WINDOW] + [velocity_rule['window'] for velocity_rule in arguments.velocity_rule])
+        process = partial(process_amendable_event_stream, window=window,
+                          amendment_horizon=int(arguments.amendment_horizon * 1000000))
+    elif arguments.retry_cache:
+        from src.handlers.retry_handler import RetryCache, process_idempotent_event_stream
+
+        retry_cache = RetryCache(max_entries=arguments.retry_cache, ttl=arguments.retry_ttl)
+        process = partial(process_idempotent_event_stream, retry_cache=retry_cache, max_lateness=max_lateness)
+    else:
+        process = partial(process_event_stream, max_lateness=max_lateness)
+
+    if max_lateness is None:
+        return process(input_stream)
+    from src.handlers.reorder_handler import process_reordered_event_stream
+
+    return process_reordered_event_stream(input_stream, max_lateness, process)
@@ -0,0 +1,236 @@
+# Python utils
+import json
+import sqlite3
+from collections import OrderedDict
+
+# Utils
+from src.utils.transaction import Transaction
+from src.utils.transaction_history import TransactionHistory
+from src.utils.velocity import get_velocity_tracker_states, restore_velocity_trackers
+
+# Handlers
+from src.handlers.account_handler import initialize_account, new_account
+
+SQLITE_MAX_VARIABLES = 500
+
+
+class MemoryAccountStore:
+    """
+    Account and window state of every account, in memory.
+    """
+
+    def __init__(self):
+        self.accounts = {}
+
+    def get(self, account_id):
+        """
+        :param account_id: Object, account id. e.g. "1"
+        :return: Tuple, Account immutable object, TransactionHistory.
+        """
+        state = self.accounts.get(account_id)
+        if state is None:
+            state = self.accounts[account_id] = (initialize_account(), TransactionHistory())
+        return state
+
+    def put(self, account_id, state):
+        """
+        :param account_id: Object, account id.
+        :param state: Tuple, Account immutable object, TransactionHistory.
+        """
+        self.accounts[account_id] = state
+
+    def prefetch(self, account_ids):
+        """
+        Load the states of a batch of accounts at once, nothing to load in memory.
+        :param account_ids: Iterable, account ids.
+        """
+
+    def close(self):
+        """
+        Nothing to write.
+        """
+
+
+class SQLiteAccountStore:
+    """
+    Account and window state of every account, in a local SQLite database with a LRU cache of the hot accounts.
+    The accounts evicted from the cache are written behind in batches, through a single reused connection. The states
+    of a batch of events are prefetched with a single query. The state has the account, the retained transactions and
+    the buckets of the velocity rules, whose windows may be longer than the retention.
+    """
+
+    def __init__(self, path, cache_size=100000, write_batch=1000):
+        """
+        :param path: String, database path. e.g. "accounts.sqlite"
+        :param cache_size: Int, number of accounts kept in memory.
+        :param write_batch: Int, number of evicted accounts written at once.
+        """
+        self.cache_size = cache_size
+        self.write_batch = write_batch
+        self.cache = OrderedDict()
+        self.dirty_account_ids = set()
+        self.pending_writes = {}
+        self.connection = sqlite3.connect(path, timeout=60)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS accounts (id TEXT PRIMARY KEY, account TEXT NOT NULL, transactions TEXT NOT NULL, '
+            "trackers TEXT NOT NULL DEFAULT '{}')"
+        )
+        # The databases written before the velocity trackers were kept don't have their column.
+        columns = [row[1] for row in self.connection.execute('PRAGMA table_info(accounts)')]
+        if 'trackers' not in columns:
+            self.connection.execute("ALTER TABLE accounts ADD COLUMN trackers TEXT NOT NULL DEFAULT '{}'")
+        self.connection.commit()
+
+    def get(self, account_id):
+        """
+        :param account_id: Object, account id. e.g. "1"
+        :return: Tuple, Account immutable object, TransactionHistory.
+        """
+        state = self.cache.get(account_id)
+        if state is not None:
+            self.cache.move_to_end(account_id)
+            return state
+
+        self.prefetch((account_id,))
+        return self.cache[account_id]
+
+    def put(self, account_id, state):
+        """
+        Update the state of an account in the cache, it's written when it's evicted or the store is closed.
+        :param account_id: Object, account id.
+        :param state: Tuple, Account immutable object, TransactionHistory.
+        """
+        self.cache[account_id] = state
+        self.cache.move_to_end(account_id)
+        self.dirty_account_ids.add(account_id)
+        self._evict()
+
+    def prefetch(self, account_ids):
+        """
+        Load the states of a batch of accounts that are not cached, with a query for every SQLITE_MAX_VARIABLES ids.
+        The unhashable ids are skipped, they can't have a state.
+        :param account_ids: Iterable, account ids.
+        """
+        cache, pending_writes = self.cache, self.pending_writes
+        missing_account_ids = []
+        for account_id in _get_unique_account_ids(account_ids):
+            if account_id in cache:
+                # The batch accounts are the most recently used, so they are not evicted by the loaded ones.
+                cache.move_to_end(account_id)
+            elif account_id in pending_writes:
+                cache[account_id] = pending_writes.pop(account_id)
+                self.dirty_account_ids.add(account_id)
+            else:
+                missing_account_ids.append(account_id)
+
+        keys = {_encode_account_id(account_id): account_id for account_id in missing_account_ids}
+        missing_keys = list(keys)
+        for start in range(0, len(missing_keys), SQLITE_MAX_VARIABLES):
+            key_batch = missing_keys[start:start + SQLITE_MAX_VARIABLES]
+            rows = self.connection.execute(
+                'SELECT id, account, transactions, trackers FROM accounts WHERE id IN ({})'.format(
+                    ','.join('?' * len(key_batch))),
+                key_batch,
+            )
+            for key, account, transactions, trackers in rows:
+                cache[keys.pop(key)] = _decode_state(account, transactions, trackers)
+
+        for account_id in keys.values():
+            cache[account_id] = (initialize_account(), TransactionHistory())
+        self._evict()
+
+    def flush(self):
+        """
+        Write every pending and dirty account.
+        """
+        for account_id in self.dirty_account_ids:
+            self.pending_writes[account_id] = self.cache[account_id]
+        self.dirty_account_ids.clear()
+        self._write_pending()
+
+    def close(self):
+        """
+        Write every pending and dirty account and close the connection.
+        """
+        self.flush()
+        self.connection.close()
+
+    def _evict(self):
+        """
+        Evict the least recently used accounts, the dirty ones are written behind.
+        """
+        while len(self.cache) > self.cache_size:
+            account_id, state = self.cache.popitem(last=False)
+            if account_id in self.dirty_account_ids:
+                self.dirty_account_ids.discard(account_id)
+                self.pending_writes[account_id] = state
+        if len(self.pending_writes) >= self.write_batch:
+            self._write_pending()
+
+    def _write_pending(self):
+        """
+        Write the pending accounts in a single transaction.
+        """
+        if not self.pending_writes:
+            return
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO accounts (id, account, transactions, trackers) VALUES (?, ?, ?, ?)',
+                [(_encode_account_id(account_id), *_encode_state(state))
+                 for account_id, state in self.pending_writes.items()],
+            )
+        self.pending_writes.clear()
+
+
+def _get_unique_account_ids(account_ids):
+    """
+    :param account_ids: Iterable, account ids.
+    :return: Set, hashable account ids.
+    """
+    unique_account_ids = set()
+    for account_id in account_ids:
+        try:
+            unique_account_ids.add(account_id)
+        except TypeError:
+            continue
+    return unique_account_ids
+
+
+def _encode_account_id(account_id):
+    """
+    :param account_id: Object, account id. e.g. "1" or 1
+    :return: String, JSON account id, so the ids of different types are different. e.g. '"1"' or '1'
+    """
+    return json.dumps(account_id)
+
+
+def _encode_state(state):
+    """
+    :param state: Tuple, Account immutable object, TransactionHistory.
+    :return: String, JSON account, String, JSON retained transactions, String, JSON velocity trackers.
+    """
+    account, previous_transactions = state
+    return (
+        json.dumps([account.is_active_card, account.available_limit, account.is_initialized, account.is_premium]),
+        json.dumps([list(transaction) for transaction in previous_transactions]),
+        json.dumps(get_velocity_tracker_states(previous_transactions)),
+    )
+
+
+def _decode_state(account, transactions, trackers):
+    """
+    :param account: String, JSON account.
+    :param transactions: String, JSON retained transactions.
+    :param trackers: String, JSON velocity trackers.
+    :return: Tuple, Account immutable object, TransactionHistory.
+    """
+    is_active_card, available_limit, is_initialized, is_premium = json.loads(account)
+    previous_transactions = TransactionHistory(Transaction(*values) for values in json.loads(transactions))
+    restore_velocity_trackers(previous_transactions, json.loads(trackers))
+    return (
+        new_account(is_active_card=is_active_card, available_limit=available_limit, is_initialized=is_initialized,
+                    is_premium=is_premium),
+        previous_transactions,
+    )
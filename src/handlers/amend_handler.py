@@ -0,0 +1,251 @@
+# Python utils
+from bisect import insort
+
+# Utils
+from src.utils import violation_errors
+from src.utils.operations import AMEND_TRANSACTION_EVENT, REVERSE_TRANSACTION_EVENT, get_event_type
+from src.utils.transaction import TRANSACTION_WINDOW, Transaction, TransactionAmendment
+from src.utils.transaction_history import TransactionHistory
+
+# Handlers
+from src.handlers.account_handler import initialize_account
+from src.handlers.operations_handler import authorize_event
+
+CHANGES_KEY = 'changes'
+# Only the transactions up to a day older than the newest one can be changed.
+DEFAULT_AMENDMENT_HORIZON = 24 * 60 * 60 * 1000000
+# Number of logged events before the ones out of the amendment horizon are dropped, it grows with the kept ones.
+MIN_TRIM_SIZE = 1024
+
+
+class AmendableAuthorizer:
+    """
+    Authorizer that keeps a log of the processed events, so a processed transaction can be reversed or amended later.
+    A changed transaction only affects the later decisions through the available limit and the windows of the rules,
+    so only the events from the changed one are evaluated again, and the evaluation stops as soon as the account
+    state is the same as before and the later events can't see the changed transaction in their windows. The cost
+    depends on the events of the window and on the affected ones, not on the log length.
+    Every logged event keeps its operation result, the account after it and the newest transaction time up to it.
+    Only the transactions inside the amendment horizon can be changed, so the older events are dropped from the log and
+    the memory is bounded by the events of the horizon. The events keep their index since the first event.
+    """
+
+    def __init__(self, window=TRANSACTION_WINDOW, max_lateness=TRANSACTION_WINDOW,
+                 amendment_horizon=DEFAULT_AMENDMENT_HORIZON):
+        """
+        :param window: Int, longest window of the window rules in microseconds, the velocity rules included.
+        :param max_lateness: Int, max lateness of an out of order transaction in microseconds.
+        :param amendment_horizon: Int, max age of a changed transaction in microseconds, from the newest transaction.
+        """
+        self.window = window
+        self.max_lateness = max_lateness
+        self.amendment_horizon = amendment_horizon
+        self.account = initialize_account()
+        self.previous_transactions = TransactionHistory(window=window, max_lateness=max_lateness)
+        self.events = []
+        self.results = []
+        self.accounts = []
+        self.newest_times = []
+        self.transaction_indexes = {}
+        # Number of events dropped from the start of the log.
+        self.offset = 0
+        self._trim_size = MIN_TRIM_SIZE
+
+    def authorize(self, event):
+        """
+        Process a single event, a reversal or an amendment changes the results of the logged events.
+        :param event: Dict, a single normalized event data. e.g.
+            {"reverse-transaction": Transaction(merchant="Habbib's", amount=10, time=1550057700000000)}
+        :return: Dict, operation result or None if the event is ignored. A reversal or an amendment result has the
+            current account and the changed results of the logged events, by event index. e.g.
+            {'account': {'active-card': True, 'available-limit': 90}, 'violations': [],
+             'changes': [{'event': 3, 'account': {'active-card': True, 'available-limit': 80}, 'violations': []}]}
+        """
+        event_type = get_event_type(event)
+        if event_type == REVERSE_TRANSACTION_EVENT and type(event[event_type]) is Transaction:
+            return self._change_transaction(event[event_type], None)
+        if event_type == AMEND_TRANSACTION_EVENT and type(event[event_type]) is TransactionAmendment:
+            original, amended = event[event_type]
+            return self._change_transaction(original, {'transaction': amended})
+
+        self.account, operation_result = authorize_event(self.previous_transactions, event, self.account)
+        if operation_result:
+            self._append(event, operation_result)
+        return operation_result
+
+    def _append(self, event, operation_result):
+        """
+        Add a processed event to the log.
+        :param event: Dict, a single normalized event data.
+        :param operation_result: Dict, operation result.
+        """
+        index = self.offset + len(self.events)
+        newest_time = self.newest_times[-1] if self.newest_times else None
+        operation = event.get('transaction')
+        if type(operation) is Transaction:
+            self.transaction_indexes.setdefault(operation, []).append(index)
+            newest_time = operation.time if newest_time is None else max(newest_time, operation.time)
+        self.events.append(event)
+        self.results.append(operation_result)
+        self.accounts.append(self.account)
+        self.newest_times.append(newest_time)
+        if len(self.events) > self._trim_size:
+            self._trim()
+
+    def _trim(self):
+        """
+        Drop the logged events that can't be changed or read by a change anymore: the events before the amendment
+        horizon, except the last one and the ones with transactions on its windows.
+        """
+        newest_times = self.newest_times
+        if newest_times[-1] is not None:
+            horizon_time = newest_times[-1] - self.amendment_horizon
+            first = 0
+            while newest_times[first] is None or newest_times[first] < horizon_time:
+                first += 1
+            start = max(first - 1, 0)
+            if start and newest_times[start] is not None:
+                min_time = newest_times[start] - self.window - self.max_lateness
+                while start > 0 and newest_times[start - 1] is not None and newest_times[start - 1] >= min_time:
+                    start -= 1
+
+            for position, event in enumerate(self.events[:start], self.offset):
+                operation = event.get('transaction') if event is not None else None
+                if type(operation) is Transaction:
+                    indexes = self.transaction_indexes[operation]
+                    indexes.remove(position)
+                    if not indexes:
+                        del self.transaction_indexes[operation]
+            del self.events[:start], self.results[:start], self.accounts[:start], newest_times[:start]
+            self.offset += start
+        self._trim_size = max(MIN_TRIM_SIZE, 2 * len(self.events))
+
+    def _change_transaction(self, original, event):
+        """
+        Reverse or amend the last logged transaction equal to the original one, and evaluate the affected events again.
+        :param original: Transaction record, processed transaction.
+        :param event: Dict, amended transaction event or None to reverse it.
+        :return: Dict, current account, violations and changed results.
+        """
+        changed_times = [original.time]
+        if event is not None:
+            changed_times.append(event['transaction'].time)
+        newest_time = self.newest_times[-1] if self.newest_times else None
+        if newest_time is not None and min(changed_times) < newest_time - self.amendment_horizon:
+            return self._get_change_result([violation_errors.AMENDMENT_OUTSIDE_HORIZON], [])
+
+        indexes = self.transaction_indexes.get(original)
+        if not indexes:
+            return self._get_change_result([violation_errors.TRANSACTION_NOT_FOUND], [])
+
+        index = indexes.pop()
+        if not indexes:
+            del self.transaction_indexes[original]
+        if event is not None:
+            insort(self.transaction_indexes.setdefault(event['transaction'], []), index)
+        index -= self.offset
+        self.events[index] = event
+
+        return self._get_change_result([], self._evaluate_from(index, max(changed_times)))
+
+    def _evaluate_from(self, index, changed_time):
+        """
+        Evaluate again the logged events from an index until the account state converges and the windows of the later
+        events don't reach the changed transaction.
+        :param index: Int, log position of the changed event.
+        :param changed_time: Int, newest time of the changed transaction, before and after the change.
+        :return: List, changed results. e.g.
+            [{'event': 3, 'account': {'active-card': True, 'available-limit': 80}, 'violations': []}]
+        """
+        account = self.accounts[index - 1] if index else initialize_account()
+        newest_time = self.newest_times[index - 1] if index else None
+        previous_transactions = self._get_previous_transactions(index)
+        changes = []
+
+        for position in range(index, len(self.events)):
+            event = self.events[position]
+            if event is None:
+                operation_result = None
+            else:
+                account, operation_result = authorize_event(previous_transactions, event, account)
+                operation = event.get('transaction')
+                if type(operation) is Transaction:
+                    newest_time = operation.time if newest_time is None else max(newest_time, operation.time)
+
+            if operation_result != self.results[position]:
+                self.results[position] = operation_result
+                index = self.offset + position
+                changes.append({'event': index, 'reversed': True} if operation_result is None
+                               else {'event': index, **operation_result})
+            converged = account == self.accounts[position]
+            self.accounts[position] = account
+            self.newest_times[position] = newest_time
+
+            # The later transactions are at most max lateness older than the newest one, so their windows start
+            # after the changed time.
+            if converged and newest_time is not None and \
+                    newest_time - self.max_lateness - self.window > changed_time:
+                return changes
+
+        # The changed transaction may still be on the window of the next events.
+        self.account = account
+        self.previous_transactions = previous_transactions
+        return changes
+
+    def _get_previous_transactions(self, index):
+        """
+        Build the window index of the transactions logged before an index, like it was when the event was processed.
+        Only the logged events with a newest time inside its retention period are read, the late ones are skipped.
+        :param index: Int, log position of a logged event.
+        :return: TransactionHistory.
+        """
+        previous_transactions = TransactionHistory(window=self.window, max_lateness=self.max_lateness)
+        if not index or self.newest_times[index - 1] is None:
+            return previous_transactions
+
+        min_time = self.newest_times[index - 1] - self.window - self.max_lateness
+        start = index
+        while start > 0 and self.newest_times[start - 1] is not None and self.newest_times[start - 1] >= min_time:
+            start -= 1
+        for event, operation_result in zip(self.events[start:index], self.results[start:index]):
+            operation = event.get('transaction') if event is not None else None
+            # The late transactions were not added to the previous transactions.
+            if type(operation) is Transaction and operation.time >= min_time and \
+                    operation_result['violations'] != [violation_errors.LATE_TRANSACTION]:
+                previous_transactions.append(operation)
+        return previous_transactions
+
+    def _get_change_result(self, violations, changes):
+        """
+        :param violations: List, violations of the reversal or the amendment.
+        :param changes: List, changed results.
+        :return: Dict, current account, violations and changed results.
+        """
+        return {
+            'account': {
+                'active-card': self.account.is_active_card,
+                'available-limit': self.account.available_limit,
+            },
+            'violations': violations,
+            CHANGES_KEY: changes,
+        }
+
+
+def process_amendable_event_stream(event_stream, window=TRANSACTION_WINDOW,
+                                   amendment_horizon=DEFAULT_AMENDMENT_HORIZON):
+    """
+    Process the events one at a time like process_event_stream, the reversal and the amendment events change the
+    results of the processed transactions.
+    :param event_stream: Iterable, normalized operations to validate and execute. e.g.
+        {"transaction": Transaction(merchant="Habbib's", amount=10, time=1550057700000000)}
+        {"reverse-transaction": Transaction(merchant="Habbib's", amount=10, time=1550057700000000)}
+    :param window: Int, longest window of the window rules in microseconds.
+    :param amendment_horizon: Int, max age of a changed transaction in microseconds, from the newest transaction.
+    :return: Generator, operation results. e.g.
+        {'account': {'active-card': True, 'available-limit': 100}, 'violations': [], 'changes': []}
+    """
+    authorizer = AmendableAuthorizer(window=window, amendment_horizon=amendment_horizon)
+    for event in event_stream:
+        operation_result = authorizer.authorize(event)
+        if operation_result:
+            yield operation_result
@@ -0,0 +1,155 @@
+# Utils
+from src.utils import violation_errors
+from src.utils.account import AccountState
+from src.utils.operations import LATE_TRANSACTION_EVENT, get_event_type
+from src.utils.rules import get_compiled_rules
+from src.utils.transaction import Transaction
+from src.utils.transaction_history import TransactionHistory
+
+# Handlers
+from src.handlers.event_handler import normalize_transaction
+from src.handlers.output_handler import MAX_VIOLATION_FRAGMENTS, serialize_result
+
+NO_VIOLATIONS = ()
+
+# Interned violation tuples, the results with the same violations share the same tuple.
+_VIOLATION_TUPLES = {
+    (violation,): (violation,)
+    for name, violation in vars(violation_errors).items() if name.isupper()
+}
+
+
+class AuthorizationResult:
+    """
+    Result view of an authorized event, it's only converted into a dict or a JSON line when it's asked for.
+    """
+    __slots__ = ('active_card', 'available_limit', 'violations')
+
+    def __init__(self, active_card=False, available_limit=0, violations=NO_VIOLATIONS):
+        """
+        :param active_card: Bool, account active card.
+        :param available_limit: Float, account available limit.
+        :param violations: Tuple, violations of the event.
+        """
+        self.active_card = active_card
+        self.available_limit = available_limit
+        self.violations = violations
+
+    def copy(self):
+        """
+        :return: AuthorizationResult, copy of the result view.
+        """
+        return AuthorizationResult(self.active_card, self.available_limit, self.violations)
+
+    def to_dict(self):
+        """
+        :return: Dict, operation result. e.g.
+            {'account': {'active-card': True, 'available-limit': 80}, 'violations': []}
+        """
+        return {
+            'account': {
+                'active-card': self.active_card,
+                'available-limit': self.available_limit,
+            },
+            'violations': list(self.violations),
+        }
+
+    def to_json(self):
+        """
+        :return: String, JSON line without the line break. e.g.
+            {"account": {"active-card": true, "available-limit": 80}, "violations": []}
+        """
+        return serialize_result(self.to_dict())
+
+    def __eq__(self, other):
+        if not isinstance(other, AuthorizationResult):
+            return NotImplemented
+        return (self.active_card, self.available_limit, self.violations) == \
+            (other.active_card, other.available_limit, other.violations)
+
+    def __repr__(self):
+        return 'AuthorizationResult({!r})'.format(self.to_dict())
+
+
+class Authorizer:
+    """
+    Embeddable stateful authorizer, the events are authorized one at a time with the same results as process_events.
+    The account state is updated in place and the result view is reused, so an accepted transaction doesn't allocate
+    an account, a violation list or a result dict. The raw events are not changed.
+    """
+    __slots__ = ('account', 'previous_transactions', '_result')
+
+    def __init__(self):
+        self.account = AccountState()
+        self.previous_transactions = TransactionHistory()
+        self._result = AuthorizationResult()
+
+    def authorize(self, event):
+        """
+        Authorize an event. Invalid events are ignored.
+        The result view is reused by the next call, copy() it to keep it.
+        :param event: Dict, a single event data, normalized or not. e.g.
+            {"transaction": {"merchant": "Habbib's", "amount": 10, "time": "2019-02-13T11:35:00.000Z"}}
+        :return: AuthorizationResult or None if the event is ignored.
+        """
+        try:
+            violations = self._authorize(event)
+        except Exception:
+            return None
+        if violations is None:
+            return None
+
+        account, result = self.account, self._result
+        result.active_card = account.is_active_card
+        result.available_limit = account.available_limit
+        result.violations = violations
+        return result
+
+    def _authorize(self, event):
+        """
+        :param event: Dict, a single event data.
+        :return: Tuple, violations of the event or None if the event is ignored.
+        """
+        event_type = get_event_type(event)
+        account = self.account
+
+        if event_type == 'transaction':
+            operation = event['transaction']
+            if type(operation) is not Transaction:
+                # The raw operation is normalized into a new record, the caller's event is not changed.
+                operation = normalize_transaction(operation)
+            if self.previous_transactions.is_late(operation.time):
+                return _VIOLATION_TUPLES[(violation_errors.LATE_TRANSACTION,)]
+            violations = get_compiled_rules().find_violations(account, operation, self.previous_transactions)
+            self.previous_transactions.append(operation)
+            if violations is not None:
+                return _intern_violations(violations)
+            amount = operation.amount
+            if account.is_initialized and account.is_active_card and amount <= account.available_limit:
+                account.available_limit -= amount
+            return NO_VIOLATIONS
+
+        if event_type == 'account':
+            if account.is_initialized:
+                return _VIOLATION_TUPLES[(violation_errors.ACCOUNT_ALREADY_INITIALIZED,)]
+            values = event['account']
+            is_active_card, available_limit = values['active-card'], values['available-limit']
+            account.is_premium = values.get('is-premium', False)
+            account.is_active_card, account.available_limit = is_active_card, available_limit
+            account.is_initialized = True
+            return NO_VIOLATIONS
+
+        if event_type == LATE_TRANSACTION_EVENT and isinstance(event[LATE_TRANSACTION_EVENT], Transaction):
+            return _VIOLATION_TUPLES[(violation_errors.LATE_TRANSACTION,)]
+        return None
+
+
+def _intern_violations(violations):
+    """
+    :param violations: List, violations. e.g. ['insufficient-limit', 'high-frequency-small-interval']
+    :return: Tuple, interned violations tuple.
+    """
+    violations = tuple(violations)
+    if len(_VIOLATION_TUPLES) >= MAX_VIOLATION_FRAGMENTS:
+        return _VIOLATION_TUPLES.get(violations, violations)
+    return _VIOLATION_TUPLES.setdefault(violations, violations)
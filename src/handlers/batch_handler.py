@@ -0,0 +1,166 @@
+# Python utils
+import glob
+import io
+import multiprocessing
+import os
+import sys
+import time
+
+# Handlers
+from src.handlers.binary_log_handler import get_event_stream_from_binary_logs
+from src.handlers.event_handler import EventReader
+from src.handlers.operations_handler import process_event_stream
+from src.handlers.output_handler import write_results
+
+RESULTS_SUFFIX = '.results'
+
+
+class BatchFileResult:
+    """
+    Summary of a processed operations file.
+    """
+    __slots__ = ('path', 'events', 'malformed_lines', 'seconds', 'output')
+
+    def __init__(self, path, events, malformed_lines, seconds, output=None):
+        """
+        :param path: String, operations file path.
+        :param events: Int, number of results.
+        :param malformed_lines: Int, number of skipped lines.
+        :param seconds: Float, processing time.
+        :param output: String, JSON Lines results if they are not written into a file.
+        """
+        self.path = path
+        self.events = events
+        self.malformed_lines = malformed_lines
+        self.seconds = seconds
+        self.output = output
+
+
+def get_batch_files(patterns):
+    """
+    Get the operations files of directories or glob patterns.
+    :param patterns: List, directories, glob patterns or files. e.g. ["exports/2020-01-01", "exports/*.jsonl"]
+    :return: List, sorted file paths of every pattern, in patterns order.
+    """
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            names = sorted(name for name in os.listdir(pattern) if not name.startswith('.'))
+            matches = [os.path.join(pattern, name) for name in names]
+        else:
+            matches = sorted(glob.glob(pattern))
+        paths.extend(path for path in matches if os.path.isfile(path))
+    return paths
+
+
+def process_batch(paths, output_dir=None, stream=None, workers=None, binary=False, progress=None):
+    """
+    Process independent operations files over a pool of processes. Every file starts its own account, like a single
+    run of process_events.
+    :param paths: List, operations file paths.
+    :param output_dir: String, directory of the per-file results, "<file path>.results" with the file path relative to
+        the common directory of the paths. The results of every file are merged into the stream in paths order if it's
+        None.
+    :param stream: File, text output stream of the merged results, sys.stdout is used by default.
+    :param workers: Int, number of worker processes, os.cpu_count() by default. The files are processed on this
+        process if it's 1.
+    :param binary: Bool, the files are binary logs.
+    :param progress: File, text stream of the progress and throughput summary, sys.stderr is used by default.
+    :return: List, BatchFileResult of every file.
+    """
+    stream = stream or sys.stdout
+    progress = progress or sys.stderr
+    workers = min(workers or os.cpu_count() or 1, max(len(paths), 1))
+    output_paths = _get_output_paths(paths, output_dir) if output_dir else [None] * len(paths)
+    for output_path in output_paths:
+        if output_path:
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    tasks = [(path, output_path, binary) for path, output_path in zip(paths, output_paths)]
+
+    start = time.perf_counter()
+    file_results = []
+    pool = multiprocessing.Pool(workers) if workers > 1 else None
+    try:
+        # The results are received in paths order, so the merged output is ordered.
+        results = pool.imap(_process_file, tasks) if pool else map(_process_file, tasks)
+        for file_result in results:
+            if file_result.output is not None:
+                stream.write(file_result.output)
+                stream.flush()
+                file_result.output = None
+            file_results.append(file_result)
+            progress.write('[{}/{}] {}: {} events in {:.3f}s\n'.format(
+                len(file_results), len(tasks), file_result.path, file_result.events, file_result.seconds))
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+
+    elapsed = time.perf_counter() - start
+    events = sum(file_result.events for file_result in file_results)
+    malformed_lines = sum(file_result.malformed_lines for file_result in file_results)
+    progress.write('{} files, {} events in {:.3f}s ({:.0f} events/s, {} workers, {} malformed lines)\n'.format(
+        len(file_results), events, elapsed, events / elapsed if elapsed else 0, workers, malformed_lines))
+    progress.flush()
+    return file_results
+
+
+def _get_output_paths(paths, output_dir):
+    """
+    Get the results file paths, the operations files keep their paths relative to their common directory, so the files
+    with the same name in different directories don't share a results file.
+    :param paths: List, operations file paths. e.g. ["exports/a/events.jsonl", "exports/b/events.jsonl"]
+    :param output_dir: String, results directory. e.g. "results"
+    :return: List, results file paths. e.g. ["results/a/events.jsonl.results", "results/b/events.jsonl.results"]
+    """
+    if not paths:
+        return []
+    absolute_paths = [os.path.abspath(path) for path in paths]
+    root = os.path.commonpath([os.path.dirname(path) for path in absolute_paths])
+    output_paths = [os.path.join(output_dir, os.path.relpath(path, root) + RESULTS_SUFFIX) for path in absolute_paths]
+
+    seen_paths = set()
+    for path, output_path in zip(paths, output_paths):
+        if output_path in seen_paths:
+            raise ValueError('Operations file processed twice: {}'.format(path))
+        seen_paths.add(output_path)
+    return output_paths
+
+
+def _process_file(task):
+    """
+    Process an operations file, it runs on the worker processes.
+    :param task: Tuple, operations file path, results file path or None, Bool -> the file is a binary log.
+    :return: BatchFileResult.
+    """
+    path, output_path, binary = task
+    start = time.perf_counter()
+    event_stream = get_event_stream_from_binary_logs([path]) if binary else EventReader([path])
+    event_result = _CountedResults(process_event_stream(event_stream))
+
+    if output_path:
+        with open(output_path, 'w') as output_file:
+            write_results(event_result, stream=output_file)
+        output = None
+    else:
+        output_file = io.StringIO()
+        write_results(event_result, stream=output_file)
+        output = output_file.getvalue()
+
+    return BatchFileResult(path=path, events=event_result.count, seconds=time.perf_counter() - start,
+                           malformed_lines=getattr(event_stream, 'malformed_lines', 0), output=output)
+
+
+class _CountedResults:
+    """
+    Iterator that counts the operation results.
+    """
+
+    def __init__(self, event_result):
+        self.event_result = event_result
+        self.count = 0
+
+    def __iter__(self):
+        for operation_result in self.event_result:
+            self.count += 1
+            yield operation_result
@@ -0,0 +1,186 @@
+# Python utils
+import json
+import mmap
+import struct
+import sys
+from array import array
+
+# Utils
+from src.utils.transaction import Transaction
+
+MAGIC = b'AUTHLOG2'
+# Magic, byte order, number of events, sizes of the merchant and account id dictionaries.
+HEADER = struct.Struct('<8scxxxxxxxQQQ')
+AMOUNT_SCALE = 1000000
+MAX_AMOUNT = (2 ** 63 - 1) // AMOUNT_SCALE
+
+TRANSACTION_FLAG = 1
+FLOAT_AMOUNT_FLAG = 2
+ACTIVE_CARD_FLAG = 4
+PREMIUM_FLAG = 8
+
+_BYTE_ORDER = b'<' if sys.byteorder == 'little' else b'>'
+_ACCOUNT_KEYS = {'active-card', 'available-limit'}
+ACCOUNT_ID_KEY = 'account-id'
+
+
+def convert_events(event_stream, path):
+    """
+    Write the normalized events into a columnar binary log: int64 times, int64 fixed-point amounts (the account
+    available limits for the account events), int32 merchant ids, int32 account ids (-1 for the events without an
+    "account-id") and uint8 flags, then the merchant and account id dictionaries.
+    Only the account and transaction events are written, the other events are skipped like by process_events.
+    :param event_stream: Iterable, normalized operations. e.g.
+        {"account-id": "1", "transaction": Transaction(merchant="Burger King", amount=20, time=1550052000000000)}
+    :param path: String, binary log path. e.g. "operations.bin"
+    :return: Int, number of written events.
+    """
+    times, amounts, merchant_ids, account_ids, flags = array('q'), array('q'), array('i'), array('i'), array('B')
+    merchants = {}
+    # The account ids are keyed with their type, so 1 and true are different ids.
+    account_dictionary = {}
+
+    for event in event_stream:
+        size = len(event)
+        if ACCOUNT_ID_KEY in event and ('transaction' in event or 'account' in event):
+            size -= 1
+            account_id = event[ACCOUNT_ID_KEY]
+            try:
+                account_index = account_dictionary.setdefault((type(account_id), account_id), len(account_dictionary))
+            except TypeError:
+                raise ValueError('Account id not supported by the binary log: {!r}'.format(account_id))
+            account_ids.append(account_index)
+        elif 'transaction' in event or 'account' in event:
+            account_ids.append(-1)
+
+        if 'transaction' in event and size == 1:
+            transaction = event['transaction']
+            times.append(transaction.time)
+            amount, flag = _encode_amount(transaction.amount)
+            amounts.append(amount)
+            merchant_ids.append(merchants.setdefault(transaction.merchant, len(merchants)))
+            flags.append(TRANSACTION_FLAG | flag)
+        elif 'account' in event and size == 1:
+            account = event['account']
+            if not _ACCOUNT_KEYS <= account.keys() <= _ACCOUNT_KEYS | {'is-premium'} or \
+                    type(account['active-card']) is not bool or type(account.get('is-premium', False)) is not bool:
+                raise ValueError('Account event not supported by the binary log: {}'.format(account))
+            times.append(0)
+            amount, flag = _encode_amount(account['available-limit'])
+            amounts.append(amount)
+            merchant_ids.append(-1)
+            flags.append(flag | (ACTIVE_CARD_FLAG if account['active-card'] else 0) |
+                         (PREMIUM_FLAG if account.get('is-premium', False) else 0))
+        elif 'account' in event or 'transaction' in event:
+            raise ValueError('Event not supported by the binary log: {}'.format(event))
+
+    merchant_dictionary = json.dumps(list(merchants)).encode()
+    account_id_dictionary = json.dumps([account_id for _, account_id in account_dictionary]).encode()
+    with open(path, 'wb') as log_file:
+        log_file.write(HEADER.pack(MAGIC, _BYTE_ORDER, len(flags), len(merchant_dictionary),
+                                   len(account_id_dictionary)))
+        for column in (times, amounts, merchant_ids, account_ids, flags):
+            column.tofile(log_file)
+            log_file.write(bytes(-column.itemsize * len(column) % 8))
+        log_file.write(merchant_dictionary)
+        log_file.write(account_id_dictionary)
+    return len(flags)
+
+
+def _encode_amount(amount):
+    """
+    :param amount: Int or Float, amount.
+    :return: Int, fixed-point amount, Int, FLOAT_AMOUNT_FLAG if the amount is a float.
+    """
+    if type(amount) is int and abs(amount) <= MAX_AMOUNT:
+        return amount * AMOUNT_SCALE, 0
+    if type(amount) is float and abs(amount) < MAX_AMOUNT:
+        fixed_amount = round(amount * AMOUNT_SCALE)
+        if fixed_amount / AMOUNT_SCALE == amount:
+            return fixed_amount, FLOAT_AMOUNT_FLAG
+    raise ValueError('Amount not supported by the binary log: {!r}'.format(amount))
+
+
+class BinaryEventLog:
+    """
+    Memory-mapped binary log, the columns are zero-copy views of the mapped file.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: String, binary log path. e.g. "operations.bin"
+        """
+        with open(path, 'rb') as log_file:
+            self._mmap = mmap.mmap(log_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mmap) < HEADER.size or self._mmap[:len(MAGIC)] != MAGIC:
+            is_binary_log = self._mmap[:len(MAGIC) - 1] == MAGIC[:-1]
+            self._mmap.close()
+            if is_binary_log:
+                raise ValueError('Binary log written by another version, convert it again: {}'.format(path))
+            raise ValueError('Not a binary log: {}'.format(path))
+        _, byte_order, count, dictionary_size, account_dictionary_size = HEADER.unpack_from(self._mmap)
+        if byte_order != _BYTE_ORDER:
+            self._mmap.close()
+            raise ValueError('Binary log written with another byte order: {}'.format(path))
+
+        view = memoryview(self._mmap)
+        offset = HEADER.size
+        columns = []
+        for type_code, itemsize in (('q', 8), ('q', 8), ('i', 4), ('i', 4), ('B', 1)):
+            columns.append(view[offset:offset + count * itemsize].cast(type_code))
+            offset += -(-count * itemsize // 8) * 8
+        self.times, self.amounts, self.merchant_ids, self.account_ids, self.flags = columns
+        self.merchants = [sys.intern(merchant) if type(merchant) is str else merchant
+                          for merchant in json.loads(bytes(view[offset:offset + dictionary_size]))]
+        offset += dictionary_size
+        self.account_dictionary = json.loads(bytes(view[offset:offset + account_dictionary_size]))
+        self._views = columns + [view]
+
+    def __len__(self):
+        return len(self.flags)
+
+    def __iter__(self):
+        """
+        :return: Generator, normalized operations decoded from the columns.
+        """
+        merchants, account_dictionary = self.merchants, self.account_dictionary
+        for time, amount, merchant_id, account_id, flags in zip(
+                self.times, self.amounts, self.merchant_ids, self.account_ids, self.flags):
+            amount = amount / AMOUNT_SCALE if flags & FLOAT_AMOUNT_FLAG else amount // AMOUNT_SCALE
+            if flags & TRANSACTION_FLAG:
+                event = {'transaction': Transaction(merchants[merchant_id], amount, time)}
+            else:
+                event = {'account': {
+                    'active-card': bool(flags & ACTIVE_CARD_FLAG),
+                    'available-limit': amount,
+                    'is-premium': bool(flags & PREMIUM_FLAG),
+                }}
+            if account_id >= 0:
+                event = {ACCOUNT_ID_KEY: account_dictionary[account_id], **event}
+            yield event
+
+    def close(self):
+        """
+        Release the column views and unmap the file.
+        """
+        for view in self._views:
+            view.release()
+        self._views = []
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+def get_event_stream_from_binary_logs(paths):
+    """
+    Get the operations of binary logs, one at a time.
+    :param paths: List, binary log paths. e.g. ["operations.bin"]
+    :return: Generator, normalized operations to validate and execute.
+    """
+    for path in paths:
+        with BinaryEventLog(path) as binary_log:
+            yield from binary_log
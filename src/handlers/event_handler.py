@@ -1,20 +1,261 @@
 # Python utils
 import json
-import fileinput
+import sys
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-def get_event_list_from_stdin():
+# Utils
+from src.utils.operations import AMEND_TRANSACTION_EVENT, REVERSE_TRANSACTION_EVENT
+from src.utils.stats import STATS
+from src.utils.transaction import Transaction, TransactionAmendment, parse_transaction_time
+
+CHUNK_SIZE = 1024 * 1024
+
+# orjson is used if it's installed, the decoded events are the same.
+json_loads = orjson.loads if orjson else json.loads
+
+
+def get_event_list_from_stdin(files=None):
     """
     Get operation from stdin input
-    :return: List, operation list to validate and execute. e.g.
+    :param files: List, operations files to read, the stdin is used if there are no files. e.g. ["operations"]
+    :return: List, normalized operation list to validate and execute. e.g.
         {"account": {"active-card": true, "available-limit": 100}}
-        {"transaction": {"merchant": "Burger King", "amount": 20, "time": "2019-02-13T10:00:00.000Z"}}
+        {"transaction": Transaction(merchant="Burger King", amount=20, time=1550052000000000)}
+    """
+    return list(get_event_stream_from_stdin(files))
+
+
+def get_event_stream_from_stdin(files=None):
+    """
+    Get operation from stdin input, one at a time as soon as its line is read.
+    :param files: List, operations files to read, the stdin is used if there are no files. e.g. ["operations"]
+    :return: EventReader, iterable of normalized operations to validate and execute. e.g.
+        {"account": {"active-card": true, "available-limit": 100}}
+        {"transaction": Transaction(merchant="Burger King", amount=20, time=1550052000000000)}
+    """
+    return EventReader(files)
+
+
+class EventReader:
+    """
+    Read the operations files (or the stdin) in large binary chunks and decode their lines.
+    The malformed lines are skipped and counted.
+    """
+
+    def __init__(self, files=None, chunk_size=CHUNK_SIZE):
+        """
+        :param files: List, operations files to read, the stdin is used if there are no files. "-" is the stdin.
+        :param chunk_size: Int, number of bytes read at once.
+        """
+        self.files = files or ['-']
+        self.chunk_size = chunk_size
+        self.malformed_lines = 0
+
+    def __iter__(self):
+        for path in self.files:
+            if path == '-':
+                yield from self._read_events(sys.stdin.buffer)
+            else:
+                with open(path, 'rb') as operations_file:
+                    yield from self._read_events(operations_file)
+
+    def _read_events(self, operations_file):
+        """
+        :param operations_file: File, binary operations file.
+        :return: Generator, normalized operations.
+        """
+        for lines in self._read_lines(operations_file):
+            for line in lines:
+                event = self._decode_line(line)
+                if event is not None:
+                    yield event
+
+    def _read_lines(self, operations_file):
+        """
+        :param operations_file: File, binary operations file.
+        :return: Generator, lists of the complete lines of every chunk.
+        """
+        tail = b''
+        while True:
+            # read1 returns the available bytes, so a long-lived stream is not blocked until a chunk is full.
+            chunk = operations_file.read1(self.chunk_size)
+            if not chunk:
+                break
+            lines = chunk.split(b'\n')
+            lines[0] = tail + lines[0]
+            tail = lines.pop()
+            if lines:
+                yield lines
+
+        if tail:
+            yield [tail]
+
+    def _decode_line(self, line):
+        """
+        :param line: Bytes, JSON line.
+        :return: Dict, normalized event or None if the line is blank or malformed.
+        """
+        if not line.strip():
+            return None
+        try:
+            return decode_event(line)
+        except Exception:
+            self.count_malformed_lines(1)
+            return None
+
+    def count_malformed_lines(self, malformed_lines):
+        """
+        Count skipped lines, also used by the later stages that reject a decoded event (e.g. an invalid account id).
+        :param malformed_lines: Int, number of skipped lines.
+        """
+        self.malformed_lines += malformed_lines
+        if STATS.enabled:
+            STATS.increment('dropped_lines', value=malformed_lines)
+
+
+class ParallelEventReader(EventReader):
+    """
+    Read the operations like EventReader, the chunks of lines are decoded by a pool of worker processes.
+    A reader thread submits the chunks into an ordered bounded queue, so the events are returned in order while the
+    next chunks are decoded, and the memory is bounded by the queue size.
     """
-    operations = []
-    for line in fileinput.input():
+
+    def __init__(self, files=None, workers=2, chunk_size=CHUNK_SIZE, max_pending_chunks=None):
+        """
+        :param files: List, operations files to read, the stdin is used if there are no files. "-" is the stdin.
+        :param workers: Int, number of decoding processes.
+        :param chunk_size: Int, number of bytes read at once.
+        :param max_pending_chunks: Int, number of chunks being decoded, twice the workers by default.
+        """
+        super().__init__(files, chunk_size)
+        self.workers = workers
+        self.max_pending_chunks = max_pending_chunks or 2 * workers
+        self._pool = None
+
+    def __iter__(self):
+        # The process pool is only loaded by this reader, it's not needed by the default pipeline.
+        import multiprocessing
+
+        self._pool = multiprocessing.Pool(self.workers)
+        try:
+            yield from super().__iter__()
+        finally:
+            self._pool.terminate()
+            self._pool = None
+
+    def _read_events(self, operations_file):
+        """
+        :param operations_file: File, binary operations file.
+        :return: Generator, normalized operations.
+        """
+        import queue
+        import threading
+
+        pending_chunks = queue.Queue(self.max_pending_chunks)
+        reader = threading.Thread(target=self._submit_chunks, args=(operations_file, pending_chunks), daemon=True)
+        reader.start()
+
+        while True:
+            pending_chunk = pending_chunks.get()
+            if pending_chunk is None:
+                break
+            if isinstance(pending_chunk, BaseException):
+                raise pending_chunk
+            events, malformed_lines = pending_chunk.get()
+            if malformed_lines:
+                self.count_malformed_lines(malformed_lines)
+            yield from events
+        reader.join()
+
+    def _submit_chunks(self, operations_file, pending_chunks):
+        """
+        Submit the chunks of lines to the pool, it runs on the reader thread.
+        :param operations_file: File, binary operations file.
+        :param pending_chunks: Queue, pending results in the chunks order, None at the end.
+        """
+        try:
+            for lines in self._read_lines(operations_file):
+                pending_chunks.put(self._pool.apply_async(_decode_lines, (lines,)))
+        except BaseException as error:
+            pending_chunks.put(error)
+            return
+        pending_chunks.put(None)
+
+
+def _decode_lines(lines):
+    """
+    Decode a chunk of lines, it runs on the worker processes.
+    :param lines: List, JSON lines.
+    :return: List, normalized events, Int, number of malformed lines.
+    """
+    events = []
+    malformed_lines = 0
+    for line in lines:
+        if not line.strip():
+            continue
         try:
-            operations.append(json.loads(line.rstrip()))
+            events.append(decode_event(line))
         except Exception:
-            pass
+            malformed_lines += 1
+    return events, malformed_lines
+
+
+def decode_event(line):
+    """
+    Decode and normalize an input line.
+    :param line: Bytes or String, JSON line. e.g.
+        b'{"transaction": {"merchant": "Habbib's", "amount": 10, "time": "2019-02-13T11:35:00.000Z"}}'
+    :return: Dict, a single normalized event data. e.g.
+        {"transaction": Transaction(merchant="Habbib's", amount=10, time=1550057700000000)}
+    """
+    return normalize_event(json_loads(line))
+
+
+def normalize_event(event):
+    """
+    Normalize a decoded event in place, the transaction operation is converted once into a Transaction record.
+    The reversed transaction is converted into a Transaction record too and the amended one into a TransactionAmendment.
+    :param event: Dict, a single event data. e.g.
+        {"transaction": {"merchant": "Habbib's", "amount": 10, "time": "2019-02-13T11:35:00.000Z"}}
+    :return: Dict, a single normalized event data. e.g.
+        {"transaction": Transaction(merchant="Habbib's", amount=10, time=1550057700000000)}
+    """
+    if 'transaction' in event:
+        event['transaction'] = normalize_transaction(event['transaction'])
+    elif REVERSE_TRANSACTION_EVENT in event:
+        event[REVERSE_TRANSACTION_EVENT] = normalize_transaction(event[REVERSE_TRANSACTION_EVENT])
+    elif AMEND_TRANSACTION_EVENT in event:
+        operation = event[AMEND_TRANSACTION_EVENT]
+        original = normalize_transaction(operation)
+        event[AMEND_TRANSACTION_EVENT] = TransactionAmendment(
+            original=original,
+            amended=normalize_transaction({**operation, **operation['amended']}),
+        )
+    return event
+
+
+def normalize_transaction(operation):
+    """
+    :param operation: Dict, transaction operation. e.g.
+        {"merchant": "Habbib's", "amount": 10, "time": "2019-02-13T11:35:00.000Z"}
+    :return: Transaction record. e.g.
+        Transaction(merchant="Habbib's", amount=10, time=1550057700000000)
+    """
+    amount = operation['amount']
+    if not isinstance(amount, (int, float)):
+        raise ValueError('Invalid transaction amount: {}'.format(amount))
+
+    # Only the strings are interned, the other merchants are kept as they are.
+    merchant = operation['merchant']
+    if type(merchant) is str:
+        merchant = sys.intern(merchant)
 
-    return operations
+    return Transaction(
+        merchant=merchant,
+        amount=amount,
+        time=parse_transaction_time(operation['time']),
+    )
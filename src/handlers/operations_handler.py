@@ -1,6 +1,9 @@
 # Utils
 from src.utils.operations import get_event_type, get_operation_violations, execute_operation_amount_transaction
+from src.utils.operations import LATE_TRANSACTION_EVENT
 from src.utils import violation_errors
+from src.utils.transaction import Transaction
+from src.utils.transaction_history import TransactionHistory
 
 # Handlers
 from src.handlers.account_handler import initialize_account, new_account
@@ -11,35 +14,65 @@ def process_events(event_list):
     Process all event/operation.
         - Create validations/violations
         - Execute a transaction (Update account state)
-    :param event_list:  List, operation list to validate and execute. e.g.
+    :param event_list:  List, normalized operation list to validate and execute. e.g.
         {"account": {"active-card": true, "available-limit": 100}}
-        {"transaction": {"merchant": "Burger King", "amount": 20, "time": "2019-02-13T10:00:00.000Z"}}
-    :return: TODO
+        {"transaction": Transaction(merchant="Burger King", amount=20, time=1550052000000000)}
+    :return: List, operation results. e.g.
+        {'account': {'active-card': True, 'available-limit': 80}, 'violations': []}
+    """
+    return list(process_event_stream(event_list))
+
+
+def process_event_stream(event_stream, max_lateness=None):
+    """
+    Process the events one at a time, every operation result is returned as soon as its event is processed.
+    With a max lateness, only the account and the window of the previous transactions are retained, so the memory does
+    not grow with the stream length. Without it, the older transactions are archived, so the late ones are evaluated
+    against the full history.
+    :param event_stream: Iterable, normalized operations to validate and execute. e.g.
+        {"account": {"active-card": true, "available-limit": 100}}
+        {"transaction": Transaction(merchant="Burger King", amount=20, time=1550052000000000)}
+    :param max_lateness: Int, max lateness of an out of order transaction in microseconds, or None.
+    :return: Generator, operation results. e.g.
+        {'account': {'active-card': True, 'available-limit': 80}, 'violations': []}
     """
     account = initialize_account()
-    operation_result_list = []
-    previous_transactions = []
+    previous_transactions = TransactionHistory(max_lateness=max_lateness)
+
+    for event in event_stream:
+        account, operation_result = authorize_event(previous_transactions, event, account)
+        if operation_result:
+            yield operation_result
 
-    for index, event in enumerate(event_list):
-        try:
-            account, operation_result = _process_event(previous_transactions, event, account)
-            if operation_result:
-                operation_result_list.append(operation_result)
-                if 'transaction' in event:
-                    previous_transactions.append(event)
-        except Exception:
-            continue
-    return operation_result_list
+
+def authorize_event(previous_transactions, event, account):
+    """
+    Process a single event and add its transaction to the previous transactions. Invalid events are ignored.
+    A transaction later than the max lateness of the previous transactions, if they have one, is processed as a late
+    transaction.
+    :param previous_transactions: TransactionHistory, time-ordered window index of the previous transactions.
+    :param event: Dict, a single normalized event data. e.g.
+        {"transaction": Transaction(merchant="Habbib's", amount=10, time=1550057700000000)}
+    :param account: Account immutable object.
+    :return: Account Immutable object, Dict -> Operation result or None if the event is ignored.
+    """
+    try:
+        if 'transaction' in event and previous_transactions.is_late(event['transaction'].time):
+            event = {LATE_TRANSACTION_EVENT: event['transaction']}
+        account, operation_result = _process_event(previous_transactions, event, account)
+        if operation_result and 'transaction' in event:
+            previous_transactions.append(event['transaction'])
+    except Exception:
+        return account, None
+    return account, operation_result
 
 
 def _process_event(previous_transactions, event, account):
     """
     Process all events.
-    :param previous_transactions: List, previous transaction list. e.g.
-        {"transaction": {"merchant": "Burger King", "amount": 50, "time": "2019-02-13T10:55:50.000Z"}}
-        {"transaction": {"merchant": "Habbib's", "amount": 90, "time": "2019-02-13T11:35:00.000Z"}}
-    :param event: Dict, a single event data. e.g.
-        {"transaction": {"merchant": "Habbib's", "amount": 10, "time": "2019-02-13T11:35:00.000Z"}}
+    :param previous_transactions: TransactionHistory, time-ordered window index of the previous transactions.
+    :param event: Dict, a single normalized event data. e.g.
+        {"transaction": Transaction(merchant="Habbib's", amount=10, time=1550057700000000)}
     :param account: Account immutable object.
     :return: Account Immutable object, List -> Operation result.
     """
@@ -87,22 +120,35 @@ def _process_account_event(event, account, _):
 def _process_transaction_event(event, account, previous_transactions):
     """
     Process a single transaction event
-    :param event: Dict, a single event data. e.g.
-        {"transaction": {"merchant": "Habbib's", "amount": 10, "time": "2019-02-13T11:35:00.000Z"}}
+    :param event: Dict, a single normalized event data. e.g.
+        {"transaction": Transaction(merchant="Habbib's", amount=10, time=1550057700000000)}
     :param account: Account immutable object.
-    :param previous_transactions: List, previous transaction list. e.g.
-        {"transaction": {"merchant": "Burger King", "amount": 50, "time": "2019-02-13T10:55:50.000Z"}}
-        {"transaction": {"merchant": "Habbib's", "amount": 90, "time": "2019-02-13T11:35:00.000Z"}}
+    :param previous_transactions: TransactionHistory, time-ordered window index of the previous transactions.
     :return: Account immutable object, List of violations.
     """
     operation = event['transaction']
     violations = get_operation_violations(account=account, operation=operation,
                                           previous_transactions=previous_transactions)
     if not violations:
-        account = execute_operation_amount_transaction(account, operation['amount'])
+        account = execute_operation_amount_transaction(account, operation.amount)
     return account, violations
 
 
+def _process_late_transaction_event(event, account, _):
+    """
+    Process a transaction flagged by the reorder stage as later than its maximum lateness. It's not evaluated, the
+    account is not updated and it's not added to the previous transactions.
+    :param event: Dict, a single late event data. e.g.
+        {"late-transaction": Transaction(merchant="Habbib's", amount=10, time=1550057700000000)}
+    :param account: Account immutable object.
+    :param _: TransactionHistory.
+    :return: Account immutable object, List of violations.
+    """
+    if not isinstance(event[LATE_TRANSACTION_EVENT], Transaction):
+        raise TypeError('Late transactions are only created by the reorder stage')
+    return account, [violation_errors.LATE_TRANSACTION]
+
+
 def _process_transaction_default(event, account):
     """Return a transaction default"""
     return None, None
@@ -115,8 +161,11 @@ def get_handler_by_transaction_type(transaction_type):
     :param transaction_type: String, transaction type -> "transaction" or "account"
     :return: Object, function by reference to execute.
     """
-    switcher = {
-        'account': _process_account_event,
-        'transaction': _process_transaction_event,
-    }
-    return switcher.get(transaction_type, _process_transaction_default)
+    return _EVENT_HANDLERS.get(transaction_type, _process_transaction_default)
+
+
+_EVENT_HANDLERS = {
+    'account': _process_account_event,
+    'transaction': _process_transaction_event,
+    LATE_TRANSACTION_EVENT: _process_late_transaction_event,
+}
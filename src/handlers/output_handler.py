@@ -0,0 +1,145 @@
+# Python utils
+import json
+import sys
+
+# Utils
+from src.utils import violation_errors
+
+MAX_VIOLATION_FRAGMENTS = 256
+RESULT_LINE = '{"account": {"active-card": %s, "available-limit": %s}, "violations": %s}'
+
+_VIOLATIONS_JSON = {
+    (violation,): json.dumps([violation])
+    for name, violation in vars(violation_errors).items() if name.isupper()
+}
+_VIOLATIONS_JSON[()] = '[]'
+
+
+class ResultWriter:
+    """
+    Write the operation results as JSON Lines into a large buffer flushed in bulk.
+    """
+
+    def __init__(self, stream=None, buffer_lines=4096, flush_each=False):
+        """
+        :param stream: File, text output stream, sys.stdout is used by default.
+        :param buffer_lines: Int, number of lines buffered before writing them at once.
+        :param flush_each: Bool, write and flush the stream after every result.
+        """
+        self.stream = stream or sys.stdout
+        self.buffer_lines = 1 if flush_each else buffer_lines
+        self.lines = []
+
+    def write(self, operation_result):
+        """
+        Add an operation result to the buffer.
+        :param operation_result: Dict, operation result. e.g.
+            {'account': {'active-card': True, 'available-limit': 80}, 'violations': []}
+        """
+        self.lines.append(serialize_result(operation_result))
+        if len(self.lines) >= self.buffer_lines:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the buffered lines and flush the stream.
+        """
+        if self.lines:
+            self.lines.append('')
+            self.stream.write('\n'.join(self.lines))
+            self.lines.clear()
+        self.stream.flush()
+
+    def write_lines(self, lines):
+        """
+        Add serialized results to the buffer.
+        :param lines: List, JSON lines without the line breaks.
+        """
+        self.lines.extend(lines)
+        if len(self.lines) >= self.buffer_lines:
+            self.flush()
+
+
+def write_results(event_result, stream=None, flush_each=False):
+    """
+    Write the results as JSON Lines.
+    :param event_result: Iterable, event results.
+    :param stream: File, text output stream, sys.stdout is used by default.
+    :param flush_each: Bool, flush the output after every result.
+    """
+    writer = ResultWriter(stream=stream, flush_each=flush_each)
+    # The results kept as columns (like the replay results) serialize their lines at once.
+    to_json_lines = getattr(event_result, 'to_json_lines', None)
+    if to_json_lines is not None and not flush_each:
+        writer.write_lines(to_json_lines())
+        writer.flush()
+        return
+    for operation_result in event_result:
+        writer.write(operation_result)
+    writer.flush()
+
+
+def serialize_result(operation_result):
+    """
+    Serialize an operation result as a JSON line, without the line break.
+    The violations are serialized with precomputed fragments.
+    :param operation_result: Dict, operation result. e.g.
+        {'account': {'active-card': True, 'available-limit': 80}, 'violations': []}
+    :return: String, JSON line. e.g.
+        {"account": {"active-card": true, "available-limit": 80}, "violations": []}
+    """
+    try:
+        account = operation_result['account']
+        line = RESULT_LINE % (
+            _serialize_boolean(account['active-card']),
+            _serialize_number(account['available-limit']),
+            _serialize_violations(operation_result['violations']),
+        )
+    except (KeyError, TypeError):
+        return json.dumps(operation_result)
+
+    if len(operation_result) == 2 and len(account) == 2:
+        return line
+    if len(operation_result) == 3 and len(account) == 2 and 'account-id' in operation_result:
+        return '{"account-id": %s, %s' % (json.dumps(operation_result['account-id']), line[1:])
+    return json.dumps(operation_result)
+
+
+def _serialize_boolean(value):
+    """
+    Serialize a boolean like json.dumps does.
+    :param value: Bool, value. e.g. True
+    :return: String, JSON boolean. e.g. "true"
+    """
+    if value is True:
+        return 'true'
+    if value is False:
+        return 'false'
+    return json.dumps(value)
+
+
+def _serialize_number(number):
+    """
+    Serialize a number like json.dumps does.
+    :param number: Float, number. e.g. 80.5
+    :return: String, JSON number. e.g. "80.5"
+    """
+    number_type = type(number)
+    if number_type is int or (number_type is float and number - number == 0):
+        return repr(number)
+    return json.dumps(number)
+
+
+def _serialize_violations(violations):
+    """
+    Serialize a violation list with the precomputed fragments, the new combinations of violations are cached.
+    :param violations: List, violations. e.g. ['insufficient-limit', 'high-frequency-small-interval']
+    :return: String, JSON list. e.g. '["insufficient-limit", "high-frequency-small-interval"]'
+    """
+    key = tuple(violations)
+    fragment = _VIOLATIONS_JSON.get(key)
+    if fragment is None:
+        fragment = json.dumps(violations)
+        if len(_VIOLATIONS_JSON) < MAX_VIOLATION_FRAGMENTS:
+            _VIOLATIONS_JSON[key] = fragment
+    return fragment
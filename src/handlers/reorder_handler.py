@@ -0,0 +1,109 @@
+# Python utils
+import heapq
+from collections import deque
+
+# Utils
+from src.utils.operations import LATE_TRANSACTION_EVENT
+from src.utils.transaction import Transaction
+
+
+def reorder_event_stream(event_stream, max_lateness):
+    """
+    Watermark-based reorder stage: the transactions are buffered and released in time order once the watermark (the
+    newest transaction time minus the maximum lateness) passes them, so the time-ordered window index sees them in
+    order. The other events (e.g. the account events) are barriers, the buffer is released before them.
+    A transaction older than the watermark or than a released transaction can't be put in order, it's released at once
+    as a late transaction event, flagged with its own violation.
+    :param event_stream: Iterable, normalized operations to validate and execute.
+    :param max_lateness: Int, maximum lateness of a transaction in microseconds. e.g. 5000000
+    :return: Generator, normalized operations in time order. e.g.
+        {"transaction": Transaction(merchant="Burger King", amount=20, time=1550052000000000)}
+        {"late-transaction": Transaction(merchant="Habbib's", amount=10, time=1550051000000000)}
+    """
+    for _, event in _reorder_indexed_events(event_stream, max_lateness):
+        yield event
+
+
+def process_reordered_event_stream(event_stream, max_lateness, process_event_stream):
+    """
+    Process the events in time order with the reorder stage, and write their results back in the input order.
+    A result is held until the results of the previous events in the input are written, so the held results are
+    bounded by the buffered transactions of the reorder stage.
+    :param event_stream: Iterable, normalized operations to validate and execute.
+    :param max_lateness: Int, maximum lateness of a transaction in microseconds. e.g. 5000000
+    :param process_event_stream: Function, processes an event stream one event at a time and returns the operation
+        results, the invalid events don't have a result. e.g. process_event_stream
+    :return: Generator, operation results in the input order. e.g.
+        {'account': {'active-card': True, 'available-limit': 80}, 'violations': []}
+    """
+    # Input indexes of the released events without a result yet, the last one is the event being processed.
+    released_indexes = deque()
+
+    def get_released_events():
+        for index, event in _reorder_indexed_events(event_stream, max_lateness):
+            released_indexes.append(index)
+            yield event
+
+    held_results = {}
+    next_index = 0
+    for operation_result in process_event_stream(get_released_events()):
+        # The events released before the processed one were ignored.
+        while len(released_indexes) > 1:
+            held_results[released_indexes.popleft()] = None
+        held_results[released_indexes.popleft()] = operation_result
+        while next_index in held_results:
+            operation_result = held_results.pop(next_index)
+            next_index += 1
+            if operation_result:
+                yield operation_result
+
+    for index in released_indexes:
+        held_results[index] = None
+    for index in sorted(held_results):
+        if held_results[index]:
+            yield held_results[index]
+
+
+def _reorder_indexed_events(event_stream, max_lateness):
+    """
+    :param event_stream: Iterable, normalized operations to validate and execute.
+    :param max_lateness: Int, maximum lateness of a transaction in microseconds.
+    :return: Generator, input index and normalized operation, in time order.
+    """
+    buffered_transactions = []
+    watermark = None
+
+    for index, event in enumerate(event_stream):
+        operation = event.get('transaction') if type(event) is dict else None
+        if type(operation) is not Transaction:
+            while buffered_transactions:
+                released_time, released_index, released_event = heapq.heappop(buffered_transactions)
+                watermark = released_time if watermark is None else max(watermark, released_time)
+                yield released_index, released_event
+            yield index, event
+            continue
+
+        if watermark is not None and operation.time < watermark:
+            yield index, _get_late_event(event)
+            continue
+
+        heapq.heappush(buffered_transactions, (operation.time, index, event))
+        release_time = operation.time - max_lateness
+        watermark = release_time if watermark is None else max(watermark, release_time)
+        while buffered_transactions and buffered_transactions[0][0] <= watermark:
+            _, released_index, released_event = heapq.heappop(buffered_transactions)
+            yield released_index, released_event
+
+    while buffered_transactions:
+        _, released_index, released_event = heapq.heappop(buffered_transactions)
+        yield released_index, released_event
+
+
+def _get_late_event(event):
+    """
+    :param event: Dict, a single normalized transaction event.
+    :return: Dict, late transaction event with the same data, the event type is the first key.
+    """
+    late_event = {LATE_TRANSACTION_EVENT: event['transaction']}
+    late_event.update((key, value) for key, value in event.items() if key != 'transaction')
+    return late_event
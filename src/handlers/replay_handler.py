@@ -0,0 +1,446 @@
+# Python utils
+import json
+from collections.abc import Sequence
+from itertools import compress, count, repeat
+from operator import eq, itemgetter
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Utils
+from src.utils import violation_errors
+from src.utils.operations import LATE_TRANSACTION_EVENT
+from src.utils.rules import get_rule_names
+from src.utils.stats import STATS
+from src.utils.transaction import TRANSACTION_WINDOW, Transaction
+
+# Handlers
+from src.handlers.binary_log_handler import TRANSACTION_FLAG
+from src.handlers.operations_handler import process_events
+from src.handlers.output_handler import RESULT_LINE
+
+BUILTIN_RULE_NAMES = (
+    violation_errors.INSUFFICIENT_LIMITS,
+    violation_errors.CARD_NOT_ACTIVE,
+    violation_errors.HIGH_FREQUENCY_SMALL_INTERVAL,
+    violation_errors.DOUBLED_TRANSACTION,
+)
+
+WINDOW_VIOLATIONS = (
+    (),
+    (violation_errors.HIGH_FREQUENCY_SMALL_INTERVAL,),
+    (violation_errors.DOUBLED_TRANSACTION,),
+    (violation_errors.HIGH_FREQUENCY_SMALL_INTERVAL, violation_errors.DOUBLED_TRANSACTION),
+)
+
+TRANSACTION_CODE = 1
+ACCOUNT_CODE = 2
+LATE_TRANSACTION_CODE = 3
+EVENT_CODES = {'transaction': TRANSACTION_CODE, 'account': ACCOUNT_CODE, LATE_TRANSACTION_EVENT: LATE_TRANSACTION_CODE}
+
+# Violation flags of the results built from arrays, the first two are the WINDOW_VIOLATIONS index.
+CARD_NOT_ACTIVE_CODE = 4
+INSUFFICIENT_LIMITS_CODE = 8
+NOT_INITIALIZED_CODE = 16
+ALREADY_INITIALIZED_CODE = 32
+VIOLATION_LISTS = [
+    tuple(violation for flag, violation in (
+        (NOT_INITIALIZED_CODE, violation_errors.ACCOUNT_NOT_INITIALIZED),
+        (ALREADY_INITIALIZED_CODE, violation_errors.ACCOUNT_ALREADY_INITIALIZED),
+        (INSUFFICIENT_LIMITS_CODE, violation_errors.INSUFFICIENT_LIMITS),
+        (CARD_NOT_ACTIVE_CODE, violation_errors.CARD_NOT_ACTIVE),
+    ) if code & flag) + WINDOW_VIOLATIONS[code & 3]
+    for code in range(64)
+]
+MIN_SCAN_BLOCK = 256
+# The sums of the integer amounts and the combined transaction keys must not overflow int64.
+MAX_INT64 = 2 ** 63 - 1
+MAX_EXACT_FLOAT = 2 ** 53
+
+
+class ReplayResults(Sequence):
+    """
+    Operation results of a replay, kept as columns. A result dict is only built when it's read, and the JSON lines are
+    serialized from the columns at once, so a replay doesn't allocate a dict and a list for every event.
+    """
+
+    def __init__(self, active_cards, available_limits, violation_codes):
+        """
+        :param active_cards: Array, active card of every result.
+        :param available_limits: Array, int64 available limit of every result.
+        :param violation_codes: Array, VIOLATION_LISTS index of every result.
+        """
+        self.active_cards = active_cards
+        self.available_limits = available_limits
+        self.violation_codes = violation_codes
+
+    def __len__(self):
+        return len(self.violation_codes)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(len(self)))]
+        return _get_result(bool(self.active_cards[index]), int(self.available_limits[index]),
+                           int(self.violation_codes[index]))
+
+    def __iter__(self):
+        for active_card, available_limit, code in zip(
+                self.active_cards.tolist(), self.available_limits.tolist(), self.violation_codes.tolist()):
+            yield _get_result(active_card, available_limit, code)
+
+    def __eq__(self, other):
+        if not isinstance(other, Sequence) or isinstance(other, (str, bytes)):
+            return NotImplemented
+        return len(self) == len(other) and all(map(eq, self, other))
+
+    __hash__ = None
+
+    def __repr__(self):
+        return 'ReplayResults({!r})'.format(list(self))
+
+    def to_json_lines(self):
+        """
+        :return: List, JSON line of every result, like serialize_result. e.g.
+            ['{"account": {"active-card": true, "available-limit": 80}, "violations": []}']
+        """
+        if STATS.enabled:
+            self._count_stats()
+        active_cards = ('false', 'true')
+        violations = [json.dumps(list(violation_list)) for violation_list in VIOLATION_LISTS]
+        return [
+            RESULT_LINE % (active_cards[active_card], available_limit, violations[code])
+            for active_card, available_limit, code in zip(
+                self.active_cards.tolist(), self.available_limits.tolist(), self.violation_codes.tolist())
+        ]
+
+
+    def _count_stats(self):
+        """
+        Count the results and their violations like the timed serialize_result, from the counts of every violation
+        list.
+        """
+        STATS.increment('results', value=len(self))
+        code_counts = numpy.bincount(self.violation_codes, minlength=len(VIOLATION_LISTS)).tolist()
+        for violation_list, code_count in zip(VIOLATION_LISTS, code_counts):
+            if code_count:
+                for violation in violation_list:
+                    STATS.increment('violations', violation, code_count)
+
+
+def _get_result(active_card, available_limit, code):
+    """
+    :param active_card: Bool, active card.
+    :param available_limit: Int, available limit.
+    :param code: Int, VIOLATION_LISTS index.
+    :return: Dict, operation result.
+    """
+    return {'account': {'active-card': active_card, 'available-limit': available_limit},
+            'violations': list(VIOLATION_LISTS[code])}
+
+
+def replay_events(event_list):
+    """
+    Offline audit/replay of a whole operation list, with the same results as process_events.
+    The window rules only depend on the times, merchants and amounts of the previous transactions, so they are computed
+    for the whole stream at once with sorted NumPy arrays. The account only changes on its first account event and on
+    the accepted transactions, so the available limit is scanned with cumulative sums of the amounts and the results
+    are kept as arrays. Streams with float amounts or limits are scanned one event at a time, so the limits are the
+    same floats. Streams that are not time-ordered (or have unexpected account values) and registries with custom
+    rules are processed by process_events.
+    :param event_list: List, normalized operation list to validate and execute. e.g.
+        {"account": {"active-card": true, "available-limit": 100}}
+        {"transaction": Transaction(merchant="Burger King", amount=20, time=1550052000000000)}
+    :return: ReplayResults or List, operation results. e.g.
+        {'account': {'active-card': True, 'available-limit': 80}, 'violations': []}
+    """
+    if numpy is None:
+        raise RuntimeError('The replay mode requires NumPy, install it with "pip install numpy".')
+
+    if get_rule_names() != BUILTIN_RULE_NAMES:
+        return process_events(event_list)
+
+    columns = _get_event_columns(event_list)
+    if columns is None:
+        return process_events(event_list)
+    event_codes, account_positions, merchants, amounts, times = columns
+
+    # The merchant id is the position of the first transaction of the merchant.
+    merchant_ids = numpy.fromiter(map({}.setdefault, merchants, count()), dtype=numpy.int64, count=len(merchants))
+    window_violations = _get_window_violations(times, merchant_ids, amounts)
+    account = event_list[account_positions[0]]['account'] if len(account_positions) else None
+    available_limit = account['available-limit'] if account is not None else 0
+    if amounts.dtype.kind != 'i' or type(available_limit) is not int or \
+            abs(available_limit) + int(numpy.abs(amounts).max(initial=0)) * len(amounts) > MAX_INT64:
+        event_types = numpy.array(['', 'transaction', 'account'])[event_codes].tolist()
+        return _scan_available_limit(event_list, event_types, window_violations.tolist())
+    return _get_replay_results(event_codes, account_positions, account, amounts, window_violations)
+
+
+def replay_binary_log(binary_log):
+    """
+    Offline audit/replay of a binary log, with the same results as process_events.
+    The window rules are computed on the memory-mapped columns, without decoding the events. Only the sequential scan
+    of the available limit decodes them, one at a time.
+    :param binary_log: BinaryEventLog, memory-mapped binary log.
+    :return: List, operation results.
+    """
+    if numpy is None:
+        raise RuntimeError('The replay mode requires NumPy, install it with "pip install numpy".')
+
+    if get_rule_names() != BUILTIN_RULE_NAMES:
+        return process_events(binary_log)
+
+    is_transaction = (numpy.frombuffer(binary_log.flags, dtype=numpy.uint8) & TRANSACTION_FLAG).astype(bool)
+    times = numpy.frombuffer(binary_log.times, dtype=numpy.int64)[is_transaction]
+    # The events tagged with an account id are processed like the JSON ones.
+    if (times[1:] < times[:-1]).any() or (numpy.frombuffer(binary_log.account_ids, dtype=numpy.int32) >= 0).any():
+        return process_events(binary_log)
+
+    # The fixed-point amounts of 20 and 20.0 are the same, like their transaction keys.
+    merchant_ids = numpy.frombuffer(binary_log.merchant_ids, dtype=numpy.int32)[is_transaction]
+    amounts = numpy.frombuffer(binary_log.amounts, dtype=numpy.int64)[is_transaction]
+    window_violations = _get_window_violations(times, merchant_ids, amounts)
+    event_types = numpy.where(is_transaction, 'transaction', 'account').tolist()
+    return _scan_available_limit(binary_log, event_types, window_violations.tolist())
+
+
+def _get_event_columns(event_list):
+    """
+    Get the columns of the events if the window rules can be computed at once: the transactions are time-ordered and
+    the account events are valid, so every transaction event is processed and added to the previous transactions.
+    The event types and the transaction fields are read by C-level iterators, not one event at a time.
+    :param event_list: List, normalized operation list.
+    :return: Tuple, EVENT_CODES array (0 for the skipped events), account event positions array, merchants list,
+        amounts array and times array, or None if the stream can't be replayed with arrays.
+    """
+    count = len(event_list)
+    try:
+        # The first key of a dict event is its type, the empty and unknown events are skipped.
+        event_types = map(next, map(iter, event_list), repeat(''))
+        event_codes = numpy.fromiter(map(EVENT_CODES.get, event_types, repeat(0)), dtype=numpy.int8, count=count)
+        if (event_codes == LATE_TRANSACTION_CODE).any():
+            return None
+        account_positions = numpy.flatnonzero(event_codes == ACCOUNT_CODE)
+        for position in account_positions.tolist():
+            if not _is_vectorizable_account(event_list[position]):
+                return None
+
+        transactions = list(map(itemgetter('transaction'),
+                                compress(event_list, (event_codes == TRANSACTION_CODE).tolist())))
+        if transactions and set(map(type, transactions)) != {Transaction}:
+            return None
+        merchants = list(map(itemgetter(0), transactions))
+        # The int amounts are an int64 array and the float ones a float64 array, the other ones are object arrays.
+        amounts = numpy.array(list(map(itemgetter(1), transactions)))
+        times = numpy.fromiter(map(itemgetter(2), transactions), dtype=numpy.int64, count=len(transactions))
+    except (TypeError, KeyError, ValueError, OverflowError):
+        return None
+
+    if (times[1:] < times[:-1]).any() or amounts.dtype.kind not in 'if':
+        return None
+    # The float amounts are compared like the Python numbers only if the integers are exact floats.
+    if amounts.dtype.kind == 'f' and not (numpy.abs(amounts) < MAX_EXACT_FLOAT).all():
+        return None
+    return event_codes, account_positions, merchants, amounts, times
+
+
+def _is_vectorizable_account(event):
+    """
+    :param event: Dict, a single account event.
+    :return: Bool, True if the account event is valid, so it's processed like the scan expects.
+    """
+    account = event['account']
+    if not isinstance(account, dict) or type(account.get('active-card')) is not bool:
+        return False
+    return isinstance(account.get('available-limit'), (int, float)) and 'transaction' not in event
+
+
+def _get_window_violations(times, *keys):
+    """
+    Compute the window rules of every transaction against the previous ones.
+    :param times: Array, sorted transaction times.
+    :param keys: Arrays, transaction key columns, the transactions with the same keys are doubled transactions.
+    :return: Array, window violations of every transaction, the index of one of WINDOW_VIOLATIONS.
+    """
+    count = len(times)
+    # There are 3 previous transactions on [time - window, time] if the third previous one is in the window.
+    high_frequency = numpy.zeros(count, dtype=numpy.int8)
+    high_frequency[3:] = times[:-3] >= times[3:] - TRANSACTION_WINDOW
+
+    # The latest previous transaction with the same key is the only one that can be in the window.
+    order = _get_key_order(keys, numpy.arange(count, dtype=numpy.int64))
+    sorted_times = times[order]
+    same_key = numpy.zeros(count, dtype=bool)
+    same_key[1:] = True
+    for key in keys:
+        sorted_key = key[order]
+        same_key[1:] &= sorted_key[1:] == sorted_key[:-1]
+    in_window = numpy.zeros(count, dtype=bool)
+    in_window[1:] = sorted_times[1:] - sorted_times[:-1] <= TRANSACTION_WINDOW
+    doubled = numpy.empty(count, dtype=numpy.int8)
+    doubled[order] = same_key & in_window
+
+    return high_frequency + 2 * doubled
+
+
+def _get_key_order(keys, positions):
+    """
+    Sort the transactions by key and position. The integer keys are combined into a single int64 sort key, so a single
+    unstable sort is enough.
+    :param keys: Tuple, transaction key columns.
+    :param positions: Array, position of every transaction.
+    :return: Array, positions sorted by key and position.
+    """
+    count = len(positions)
+    combined_keys = numpy.zeros(count, dtype=numpy.int64)
+    span = count
+    for key in keys:
+        if key.dtype.kind not in 'iu' or not count:
+            return numpy.lexsort((positions,) + keys[::-1])
+        low = int(key.min())
+        key_span = int(key.max()) - low + 1
+        span *= key_span
+        if span > MAX_INT64:
+            return numpy.lexsort((positions,) + keys[::-1])
+        combined_keys = combined_keys * key_span + (key - low)
+    return numpy.argsort(combined_keys * count + positions)
+
+
+def _get_replay_results(event_codes, account_positions, account, amounts, window_violations):
+    """
+    Build the results of an integer stream as arrays. The transactions before the first account event are not
+    initialized and the later account events are already initialized, so the account only changes on the accepted
+    transactions.
+    :param event_codes: Array, EVENT_CODES of every event.
+    :param account_positions: Array, position of every account event.
+    :param account: Dict, values of the first account event or None.
+    :param amounts: Array, int64 amount of every transaction.
+    :param window_violations: Array, window violations index of every transaction.
+    :return: ReplayResults.
+    """
+    count = len(event_codes)
+    transaction_positions = numpy.flatnonzero(event_codes == TRANSACTION_CODE)
+    initialized_position = int(account_positions[0]) if account is not None else count
+    is_initialized = transaction_positions > initialized_position
+    is_active_card = account is not None and account['active-card']
+    is_premium = account is not None and bool(account.get('is-premium', False))
+    available_limit = account['available-limit'] if account is not None else 0
+
+    # Only the transactions without window violations of an active card can be accepted, if they fit in the limit.
+    eligible = is_initialized & (is_premium or window_violations == 0) & is_active_card
+    accepted = numpy.zeros(len(amounts), dtype=bool)
+    accepted[eligible] = _get_accepted_transactions(amounts[eligible], available_limit)
+    spent = numpy.zeros(count, dtype=numpy.int64)
+    spent[transaction_positions[accepted]] = amounts[accepted]
+    available_limits = available_limit - numpy.cumsum(spent)
+    available_limits[:initialized_position] = 0
+    active_cards = numpy.zeros(count, dtype=bool)
+    active_cards[initialized_position:] = is_active_card
+
+    # The rejected transactions don't change the limit, so the limit of their result is the one they were checked on.
+    transaction_codes = numpy.where(is_initialized, 0, NOT_INITIALIZED_CODE)
+    transaction_codes |= numpy.where(is_initialized & (amounts > available_limits[transaction_positions]),
+                                     INSUFFICIENT_LIMITS_CODE, 0)
+    if not is_active_card:
+        transaction_codes |= numpy.where(is_initialized, CARD_NOT_ACTIVE_CODE, 0)
+    transaction_codes |= window_violations if not is_premium else numpy.where(is_initialized, 0, window_violations)
+    transaction_codes[accepted] = 0
+    violation_codes = numpy.zeros(count, dtype=numpy.int8)
+    violation_codes[transaction_positions] = transaction_codes
+    violation_codes[account_positions[1:]] = ALREADY_INITIALIZED_CODE
+
+    # The skipped events don't have a result.
+    has_result = event_codes != 0
+    return ReplayResults(active_cards[has_result], available_limits[has_result], violation_codes[has_result])
+
+
+def _get_accepted_transactions(amounts, available_limit):
+    """
+    Scan the available limit over the transactions that are accepted if their amount fits in it. The accepted run
+    before the first rejection is found at once with the cumulative sum of a block of amounts, a rejection doesn't
+    change the limit and the next rejections are skipped at once too. The blocks grow while they don't change the
+    state, so the long runs cost a few array operations.
+    :param amounts: Array, int64 amounts.
+    :param available_limit: Int, available limit before the first transaction.
+    :return: Array, accepted flag of every transaction.
+    """
+    count = len(amounts)
+    accepted = numpy.zeros(count, dtype=bool)
+    start = 0
+    block = MIN_SCAN_BLOCK
+    while start < count:
+        spent = numpy.cumsum(amounts[start:start + block])
+        over_limit = spent > available_limit
+        accepted_count = int(over_limit.argmax()) if over_limit.any() else len(spent)
+        accepted[start:start + accepted_count] = True
+        if accepted_count:
+            available_limit -= int(spent[accepted_count - 1])
+        start += accepted_count
+        if accepted_count == len(spent):
+            block *= 2
+            continue
+
+        # The transaction at start doesn't fit, skip the next ones that don't fit either.
+        fits = amounts[start:start + block] <= available_limit
+        rejected_count = int(fits.argmax()) if fits.any() else len(fits)
+        start += rejected_count
+        block = block * 2 if rejected_count == len(fits) else MIN_SCAN_BLOCK
+    return accepted
+
+
+def _scan_available_limit(event_list, event_types, window_violations):
+    """
+    Sequential scan of the account state with the precomputed window violations.
+    :param event_list: Iterable, normalized operations.
+    :param event_types: List, event type of every event.
+    :param window_violations: List, window violations index of every transaction.
+    :return: List, operation results.
+    """
+    is_initialized = is_active_card = is_premium = False
+    available_limit = 0
+    operation_result_list = []
+    append_result = operation_result_list.append
+    window_violations = iter(window_violations)
+
+    for event, event_type in zip(event_list, event_types):
+        if event_type == 'transaction':
+            window_violation = next(window_violations)
+            if not is_initialized:
+                violations = [violation_errors.ACCOUNT_NOT_INITIALIZED]
+            else:
+                amount = event['transaction'].amount
+                if amount > available_limit:
+                    violations = [violation_errors.INSUFFICIENT_LIMITS]
+                    if not is_active_card:
+                        violations.append(violation_errors.CARD_NOT_ACTIVE)
+                elif not is_active_card:
+                    violations = [violation_errors.CARD_NOT_ACTIVE]
+                elif is_premium or not window_violation:
+                    available_limit = available_limit - amount
+                    is_active_card = True
+                    append_result({'account': {'active-card': True, 'available-limit': available_limit},
+                                   'violations': []})
+                    continue
+                else:
+                    violations = []
+            if window_violation and not is_premium:
+                violations.extend(WINDOW_VIOLATIONS[window_violation])
+        elif event_type == 'account':
+            if is_initialized:
+                violations = [violation_errors.ACCOUNT_ALREADY_INITIALIZED]
+            else:
+                account = event['account']
+                is_active_card = account['active-card']
+                available_limit = account['available-limit']
+                is_premium = account.get('is-premium', False)
+                is_initialized = True
+                violations = []
+        else:
+            continue
+
+        append_result({'account': {'active-card': is_active_card, 'available-limit': available_limit},
+                       'violations': violations})
+
+    return operation_result_list
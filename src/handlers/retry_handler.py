@@ -0,0 +1,133 @@
+# Python utils
+import time
+from collections import OrderedDict
+
+# Utils
+from src.utils.stats import STATS
+from src.utils.transaction import Transaction
+from src.utils.transaction_history import TransactionHistory
+
+# Handlers
+from src.handlers.account_handler import initialize_account
+from src.handlers.operations_handler import authorize_event
+
+IDEMPOTENCY_KEY = 'idempotency-key'
+
+
+class RetryCache:
+    """
+    LRU cache of the operation results of the processed events, with a time to live. A retried event gets the result of
+    its first copy, without evaluating the rules or changing the account again.
+    The events are keyed by their "idempotency-key" or, without it, by the fingerprint of their transaction (merchant,
+    amount and time).
+    """
+
+    def __init__(self, max_entries=100000, ttl=300.0, clock=time.monotonic):
+        """
+        :param max_entries: Int, maximum number of cached results, the least recently used ones are evicted.
+        :param ttl: Float, seconds a result is cached, None to keep the results until they are evicted.
+        :param clock: Function, current time in seconds.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def get_key(event):
+        """
+        Get the cache key of an event, the idempotency key is removed from the event.
+        :param event: Dict, a single normalized event data. e.g.
+            {"idempotency-key": "a1", "transaction": Transaction(merchant="Habbib's", amount=10, time=0)}
+        :return: Object, cache key or None if the event is not cached. e.g. ("idempotency-key", "a1")
+        """
+        if type(event) is not dict:
+            # An invalid event is not cached, it's skipped when it's processed.
+            return None
+        idempotency_key = event.pop(IDEMPOTENCY_KEY, None)
+        if isinstance(idempotency_key, (str, int)):
+            return IDEMPOTENCY_KEY, idempotency_key
+        operation = event.get('transaction')
+        if type(operation) is Transaction:
+            return operation
+        return None
+
+    def get(self, key):
+        """
+        :param key: Object, cache key.
+        :return: Dict, cached operation result or None.
+        """
+        entry = self.entries.get(key)
+        if entry is not None:
+            operation_result, expires_at = entry
+            if expires_at is None or expires_at > self.clock():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                _count_stats('hit')
+                return operation_result
+            del self.entries[key]
+            self.expirations += 1
+            _count_stats('expiration')
+        self.misses += 1
+        _count_stats('miss')
+        return None
+
+    def put(self, key, operation_result):
+        """
+        :param key: Object, cache key.
+        :param operation_result: Dict, operation result of the first copy of the event.
+        """
+        self.entries[key] = operation_result, None if self.ttl is None else self.clock() + self.ttl
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+            _count_stats('eviction')
+
+    @property
+    def hit_rate(self):
+        """
+        :return: Float, hits per lookup.
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+def _count_stats(outcome):
+    """
+    :param outcome: String, cache outcome. e.g. "hit", "miss", "eviction" or "expiration".
+    """
+    if STATS.enabled:
+        STATS.increment('retry_cache', outcome)
+
+
+def process_idempotent_event_stream(event_stream, retry_cache, max_lateness=None):
+    """
+    Process the events one at a time like process_event_stream, the retried events get the cached result of their first
+    copy.
+    :param event_stream: Iterable, normalized operations to validate and execute.
+    :param retry_cache: RetryCache, results of the processed events.
+    :param max_lateness: Int, max lateness of an out of order transaction in microseconds, or None.
+    :return: Generator, operation results. e.g.
+        {'account': {'active-card': True, 'available-limit': 80}, 'violations': []}
+    """
+    account = initialize_account()
+    previous_transactions = TransactionHistory(max_lateness=max_lateness)
+
+    for event in event_stream:
+        key = retry_cache.get_key(event)
+        if key is not None:
+            operation_result = retry_cache.get(key)
+            if operation_result is not None:
+                yield operation_result
+                continue
+
+        account, operation_result = authorize_event(previous_transactions, event, account)
+        if operation_result:
+            if key is not None:
+                retry_cache.put(key, operation_result)
+            yield operation_result
@@ -0,0 +1,179 @@
+# Python utils
+import asyncio
+
+# Utils
+from src.utils.stats import STATS
+from src.utils.transaction_history import TransactionHistory
+
+# Handlers
+from src.handlers.account_handler import initialize_account
+from src.handlers.event_handler import decode_event
+from src.handlers.operations_handler import authorize_event
+from src.handlers.output_handler import serialize_result
+
+# Max length of an operation line, the longer lines are skipped.
+LINE_LIMIT = 2 ** 16
+
+
+class AuthorizerServer:
+    """
+    JSON Lines authorizer server. The account and the window state stay resident between connections and a single
+    processing loop owns them, so the results are the same as the CLI ones for the same operations.
+    Every connection can pipeline many operations, the results are written in the same order. The reading stops while
+    the processing loop or the client are behind (backpressure). The malformed and too long lines are skipped and
+    counted.
+    """
+
+    def __init__(self, max_pending=1024, line_limit=LINE_LIMIT):
+        """
+        :param max_pending: Int, max number of operations waiting for the processing loop, and max number of results
+            waiting to be written on each connection.
+        :param line_limit: Int, max length of an operation line in bytes.
+        """
+        self.account = initialize_account()
+        self.previous_transactions = TransactionHistory()
+        self.max_pending = max_pending
+        self.line_limit = line_limit
+        self.malformed_lines = 0
+        self.pending_events = None
+        self.processing_task = None
+
+    async def start(self, host=None, port=None, path=None):
+        """
+        Start the processing loop and listen on a TCP address or a Unix socket.
+        :param host: String, TCP host. e.g. "127.0.0.1"
+        :param port: Int, TCP port. e.g. 8000
+        :param path: String, Unix socket path, used instead of the TCP address. e.g. "/tmp/authorizer.sock"
+        :return: Server, asyncio server.
+        """
+        self.pending_events = asyncio.Queue(self.max_pending)
+        self.processing_task = asyncio.ensure_future(self._process_events())
+        if path:
+            return await asyncio.start_unix_server(self._handle_connection, path=path, limit=self.line_limit)
+        return await asyncio.start_server(self._handle_connection, host, port, limit=self.line_limit)
+
+    async def stop(self, server):
+        """
+        Stop listening and stop the processing loop.
+        :param server: Server, asyncio server returned by start.
+        """
+        server.close()
+        await server.wait_closed()
+        self.processing_task.cancel()
+
+    async def _process_events(self):
+        """
+        Processing loop, the only owner of the account state.
+        """
+        while True:
+            event, result = await self.pending_events.get()
+            self.account, operation_result = authorize_event(self.previous_transactions, event, self.account)
+            result.set_result(operation_result)
+
+    async def _handle_connection(self, reader, writer):
+        """
+        Read the operations of a connection and send them to the processing loop. The reading is cancelled if the
+        results can't be written anymore, so it's not blocked on a full results queue.
+        :param reader: StreamReader, connection reader.
+        :param writer: StreamWriter, connection writer.
+        """
+        pending_results = asyncio.Queue(self.max_pending)
+        writing_task = asyncio.ensure_future(self._write_results(pending_results, writer))
+        reading_task = asyncio.current_task()
+
+        def cancel_reading(_):
+            reading_task.cancel()
+
+        writing_task.add_done_callback(cancel_reading)
+        try:
+            while True:
+                try:
+                    line = await reader.readuntil(b'\n')
+                except asyncio.IncompleteReadError as error:
+                    # The last line can end without a line break.
+                    line = error.partial
+                    if not line:
+                        break
+                except asyncio.LimitOverrunError as error:
+                    await _skip_line(reader, error.consumed)
+                    self._count_malformed_lines()
+                    continue
+                try:
+                    event = decode_event(line)
+                except Exception:
+                    if line.strip():
+                        self._count_malformed_lines()
+                    continue
+                result = asyncio.get_running_loop().create_future()
+                await pending_results.put(result)
+                await self.pending_events.put((event, result))
+        except asyncio.CancelledError:
+            if not writing_task.done():
+                raise
+        finally:
+            writing_task.remove_done_callback(cancel_reading)
+            if not writing_task.done():
+                await pending_results.put(None)
+            try:
+                await writing_task
+            except ConnectionError:
+                pass
+            writer.close()
+
+    def _count_malformed_lines(self):
+        """
+        Count a skipped line.
+        """
+        self.malformed_lines += 1
+        if STATS.enabled:
+            STATS.increment('dropped_lines')
+
+    async def _write_results(self, pending_results, writer):
+        """
+        Write the results of a connection in the operations order.
+        :param pending_results: Queue, futures of the results, None when the connection is closed.
+        :param writer: StreamWriter, connection writer.
+        """
+        while True:
+            result = await pending_results.get()
+            if result is None:
+                break
+            operation_result = await result
+            if operation_result:
+                writer.write(serialize_result(operation_result).encode() + b'\n')
+                await writer.drain()
+
+
+async def _skip_line(reader, consumed):
+    """
+    Skip the rest of a line longer than the reader limit.
+    :param reader: StreamReader, connection reader.
+    :param consumed: Int, number of buffered bytes of the line.
+    """
+    await reader.readexactly(consumed)
+    while True:
+        try:
+            await reader.readuntil(b'\n')
+            return
+        except asyncio.LimitOverrunError as error:
+            await reader.readexactly(error.consumed)
+        except asyncio.IncompleteReadError:
+            return
+
+
+def serve(host=None, port=None, path=None):
+    """
+    Run the authorizer server until it's interrupted.
+    :param host: String, TCP host. e.g. "127.0.0.1"
+    :param port: Int, TCP port. e.g. 8000
+    :param path: String, Unix socket path, used instead of the TCP address. e.g. "/tmp/authorizer.sock"
+    """
+    async def run():
+        server = await AuthorizerServer().start(host=host, port=port, path=path)
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
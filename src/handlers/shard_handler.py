@@ -0,0 +1,291 @@
+# Python utils
+import multiprocessing
+import queue
+import time
+import zlib
+from collections import deque
+from itertools import islice
+
+# Utils
+from src.utils.stats import STATS
+
+# Handlers
+from src.handlers.account_store_handler import MemoryAccountStore
+from src.handlers.operations_handler import authorize_event
+from src.handlers.stats_handler import enable_stats
+
+ACCOUNT_ID_KEY = 'account-id'
+CLOSE_TIMEOUT = 30
+LIVENESS_INTERVAL = 1
+
+
+def process_sharded_event_stream(event_stream, workers=1, chunk_size=1000, max_pending_chunks=4,
+                                 create_store=MemoryAccountStore, count_invalid_events=None):
+    """
+    Process the events of many accounts. Every event is tagged with an account id and the accounts are
+    hash-partitioned across a pool of worker processes, each one holding the Account and the window state of its
+    accounts. The events of an account are processed in order by its worker and the results keep the input order.
+    :param event_stream: Iterable, normalized operations tagged with an account id. e.g.
+        {"account-id": "1", "account": {"active-card": true, "available-limit": 100}}
+        {"account-id": "1", "transaction": Transaction(merchant="Burger King", amount=20, time=1550052000000000)}
+    :param workers: Int, number of worker processes, the events are processed on this process if it's 1.
+    :param chunk_size: Int, number of events sent to the workers at once.
+    :param max_pending_chunks: Int, number of chunks being processed before waiting for their results.
+    :param create_store: Function, creates the account store of a shard, e.g. a SQLiteAccountStore partial. The
+        accounts of a chunk are prefetched from the store before its events are processed.
+    :param count_invalid_events: Function, receives the number of skipped events that are not objects or have an
+        account id that can't be hashed, e.g. EventReader.count_malformed_lines.
+    :return: Generator, operation results tagged with the account id. e.g.
+        {'account-id': '1', 'account': {'active-card': True, 'available-limit': 80}, 'violations': []}
+    """
+    event_stream = _get_valid_events(event_stream, count_invalid_events)
+    if workers <= 1:
+        shard = _AccountShard(create_store())
+        try:
+            while True:
+                chunk = list(islice(event_stream, chunk_size))
+                if not chunk:
+                    break
+                for operation_result in shard.process_chunk(chunk):
+                    if operation_result:
+                        yield operation_result
+        finally:
+            shard.close()
+        return
+
+    pool = _ShardPool(workers, max_pending_chunks, create_store)
+    try:
+        pending_chunks = deque()
+        while True:
+            chunk = list(islice(event_stream, chunk_size))
+            if chunk:
+                pending_chunks.append(pool.submit(chunk))
+            if pending_chunks and (not chunk or len(pending_chunks) >= max_pending_chunks):
+                yield from pool.collect(pending_chunks.popleft())
+            if not chunk and not pending_chunks:
+                break
+    finally:
+        pool.close()
+
+
+def get_shard_index(account_id, shards):
+    """
+    Get the shard of an account, the partition is stable across processes and runs.
+    :param account_id: Object, account id. e.g. "1"
+    :param shards: Int, number of shards.
+    :return: Int, shard index.
+    """
+    return zlib.crc32(str(account_id).encode()) % shards
+
+
+def _get_valid_events(event_stream, count_invalid_events=None):
+    """
+    Remove the account id from every event, on the main process. The events that are not objects or have an account
+    id that can't be hashed are skipped and counted, so they never reach a shard.
+    :param event_stream: Iterable, normalized operations tagged with an account id.
+    :param count_invalid_events: Function, receives the number of skipped events or None.
+    :return: Generator, (account id, event) pairs.
+    """
+    for event in event_stream:
+        account_id_event = _split_account_id(event)
+        if account_id_event is not None:
+            yield account_id_event
+        elif count_invalid_events is not None:
+            count_invalid_events(1)
+
+
+def _split_account_id(event):
+    """
+    Remove the account id from an event.
+    :param event: Dict, a single normalized event data tagged with an account id.
+    :return: Tuple, account id or None and event data, or None if the event is invalid.
+    """
+    if type(event) is not dict:
+        return None
+    account_id = event.pop(ACCOUNT_ID_KEY, None)
+    try:
+        hash(account_id)
+    except TypeError:
+        return None
+    return account_id, event
+
+
+class _AccountShard:
+    """
+    Account and window state of the accounts of a shard.
+    """
+
+    def __init__(self, store=None):
+        """
+        :param store: MemoryAccountStore or SQLiteAccountStore, account states, in memory by default.
+        """
+        self.store = MemoryAccountStore() if store is None else store
+
+    def process_chunk(self, chunk):
+        """
+        Process a chunk of events, the states of its accounts are prefetched at once.
+        :param chunk: List, (account id, event) pairs.
+        :return: List, operation results, one for every event (None if it's ignored).
+        """
+        self.store.prefetch({account_id for account_id, _ in chunk})
+        return [self.process_event(account_id, event) for account_id, event in chunk]
+
+    def process_event(self, account_id, event):
+        """
+        Process a single event of an account. The invalid events are ignored by authorize_event, the errors of the
+        store are raised, so the run fails instead of losing the account states.
+        :param account_id: Object, account id or None.
+        :param event: Dict, a single normalized event data.
+        :return: Dict, operation result tagged with the account id, or None if the event is ignored.
+        """
+        account, previous_transactions = self.store.get(account_id)
+        account, operation_result = authorize_event(previous_transactions, event, account)
+        self.store.put(account_id, (account, previous_transactions))
+        if operation_result and account_id is not None:
+            operation_result = {ACCOUNT_ID_KEY: account_id, **operation_result}
+        return operation_result
+
+    def close(self):
+        """
+        Write and close the account store.
+        """
+        self.store.close()
+
+
+def _run_shard_worker(input_queue, output_queue, create_store, stats_enabled=False):
+    """
+    Worker process loop, process the chunks of events until it receives None. An error stops the worker, so the main
+    process fails.
+    :param input_queue: Queue, chunks of (account id, event).
+    :param output_queue: Queue, chunks of operation results, one for every event (None if it's ignored), then the
+        (counters, histograms) stats tuple of the worker if the stats are enabled.
+    :param create_store: Function, creates the account store of the shard.
+    :param stats_enabled: Bool, collect the stats and send them to the main process once it's stopped.
+    """
+    if stats_enabled:
+        enable_stats()
+        # The stats of the main process copied by a fork are not counted again.
+        STATS.clear()
+    shard = _AccountShard(create_store())
+    try:
+        for chunk in iter(input_queue.get, None):
+            output_queue.put(shard.process_chunk(chunk))
+    finally:
+        shard.close()
+    if stats_enabled:
+        output_queue.put((STATS.counters, STATS.histograms))
+
+
+class _ShardPool:
+    """
+    Pool of worker processes, every worker owns a shard of the accounts.
+    """
+
+    def __init__(self, workers, max_pending_chunks, create_store=MemoryAccountStore):
+        self.input_queues = [multiprocessing.Queue(max_pending_chunks) for _ in range(workers)]
+        self.output_queues = [multiprocessing.Queue(max_pending_chunks) for _ in range(workers)]
+        self.processes = [
+            multiprocessing.Process(target=_run_shard_worker, args=(*queues, create_store, STATS.enabled), daemon=True)
+            for queues in zip(self.input_queues, self.output_queues)
+        ]
+        for process in self.processes:
+            process.start()
+
+    def submit(self, chunk):
+        """
+        Send a chunk of events to the workers.
+        :param chunk: List, (account id, event) pairs.
+        :return: List, shard index of every event, needed to collect the results in order.
+        """
+        shards = len(self.processes)
+        shard_chunks = [[] for _ in range(shards)]
+        shard_indexes = []
+        for account_id, event in chunk:
+            shard_index = get_shard_index(account_id, shards)
+            shard_chunks[shard_index].append((account_id, event))
+            shard_indexes.append(shard_index)
+
+        for input_queue, process, shard_chunk in zip(self.input_queues, self.processes, shard_chunks):
+            while True:
+                try:
+                    input_queue.put(shard_chunk, timeout=LIVENESS_INTERVAL)
+                    break
+                except queue.Full:
+                    _check_worker(process)
+        return shard_indexes
+
+    def collect(self, shard_indexes):
+        """
+        Get the results of a chunk in the input order.
+        :param shard_indexes: List, shard index of every event of the chunk.
+        :return: Generator, operation results.
+        """
+        shard_results = [iter(_get_worker_results(output_queue, process))
+                         for output_queue, process in zip(self.output_queues, self.processes)]
+        for shard_index in shard_indexes:
+            operation_result = next(shard_results[shard_index])
+            if operation_result:
+                yield operation_result
+
+    def close(self):
+        """
+        Stop the worker processes. The results that were not collected are dropped, so the workers can take the stop
+        signal and write their account stores before they stop. The stats of the workers are added to the main process
+        ones.
+        """
+        deadline = time.monotonic() + CLOSE_TIMEOUT
+        for input_queue, output_queue, process in zip(self.input_queues, self.output_queues, self.processes):
+            stop_sent = False
+            while process.is_alive() and time.monotonic() < deadline:
+                if not stop_sent:
+                    try:
+                        input_queue.put_nowait(None)
+                        stop_sent = True
+                    except queue.Full:
+                        pass
+                try:
+                    _merge_worker_stats(output_queue.get(timeout=0.05))
+                except queue.Empty:
+                    pass
+                process.join(timeout=0.05)
+            if process.is_alive():
+                process.terminate()
+            elif STATS.enabled:
+                # The stats are sent right before the worker stops.
+                try:
+                    while True:
+                        _merge_worker_stats(output_queue.get(timeout=0.05))
+                except queue.Empty:
+                    pass
+
+
+def _merge_worker_stats(output):
+    """
+    :param output: List, chunk of operation results, or Tuple, (counters, histograms) stats of a stopped worker.
+    """
+    if type(output) is tuple:
+        STATS.merge(*output)
+
+
+def _get_worker_results(output_queue, process):
+    """
+    Wait for the results of a chunk, checking that the worker is still alive.
+    :param output_queue: Queue, chunks of operation results of the worker.
+    :param process: Process, worker process.
+    :return: List, operation results of the chunk.
+    """
+    while True:
+        try:
+            return output_queue.get(timeout=LIVENESS_INTERVAL)
+        except queue.Empty:
+            # A stopped worker flushes its queue before it exits.
+            if output_queue.empty():
+                _check_worker(process)
+
+
+def _check_worker(process):
+    """
+    :param process: Process, worker process.
+    """
+    if not process.is_alive():
+        raise RuntimeError('A shard worker stopped with exit code {}'.format(process.exitcode))
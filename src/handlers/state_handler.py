@@ -0,0 +1,186 @@
+# Python utils
+import json
+import os
+
+# Utils
+from src.utils.transaction import Transaction
+from src.utils.transaction_history import TransactionHistory
+from src.utils.velocity import get_velocity_tracker_states, restore_velocity_trackers
+
+# Handlers
+from src.handlers.account_handler import initialize_account, new_account
+from src.handlers.operations_handler import authorize_event
+
+SNAPSHOT_FILE_NAME = 'snapshot.json'
+LOG_FILE_NAME = 'events.{}.log'
+
+
+class DurableState:
+    """
+    Durable authorizer state: an append-only write-ahead log of the events plus periodic compact snapshots of the
+    account, the still-relevant window of the previous transactions and the buckets of the velocity trackers.
+    The recovery loads the latest snapshot and replays only the log written after it, so the restart time is bounded by
+    the snapshot interval instead of the history length.
+    """
+
+    def __init__(self, directory, snapshot_interval=10000, max_lateness=None):
+        """
+        :param directory: String, state directory. e.g. "/var/lib/authorizer"
+        :param snapshot_interval: Int, number of events between snapshots.
+        :param max_lateness: Int, max lateness of an out of order transaction in microseconds, or None.
+        """
+        self.directory = directory
+        self.snapshot_interval = snapshot_interval
+        self.max_lateness = max_lateness
+        self.generation = 0
+        self.logged_events = 0
+        self.log_file = None
+
+    def recover(self):
+        """
+        Load the latest snapshot and replay the log written after it, then open the log to append new events.
+        :return: Account immutable object, TransactionHistory.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        account, previous_transactions = initialize_account(), TransactionHistory(max_lateness=self.max_lateness)
+
+        snapshot_path = os.path.join(self.directory, SNAPSHOT_FILE_NAME)
+        if os.path.exists(snapshot_path):
+            with open(snapshot_path) as snapshot_file:
+                snapshot = json.load(snapshot_file)
+            self.generation = snapshot['generation']
+            account = new_account(**snapshot['account'])
+            previous_transactions = TransactionHistory((Transaction(*values) for values in snapshot['transactions']),
+                                                       max_lateness=self.max_lateness)
+            restore_velocity_trackers(previous_transactions, snapshot.get('trackers', {}))
+
+        log_path = self._log_path(self.generation)
+        if os.path.exists(log_path):
+            with open(log_path, 'rb+') as log_file:
+                offset = 0
+                for line in log_file:
+                    try:
+                        event = decode_log_event(line)
+                    except ValueError:
+                        # Incomplete last line of a crash, the event was not applied.
+                        log_file.truncate(offset)
+                        break
+                    offset += len(line)
+                    account, _ = authorize_event(previous_transactions, event, account)
+                    self.logged_events += 1
+
+        self.log_file = open(log_path, 'a')
+        return account, previous_transactions
+
+    def log_event(self, event):
+        """
+        Append an event to the write-ahead log, before it's applied.
+        :param event: Dict, a single normalized event data.
+        """
+        self.log_file.write(encode_log_event(event))
+        self.log_file.flush()
+        self.logged_events += 1
+
+    def should_snapshot(self):
+        """
+        :return: Bool, True if the snapshot interval was reached.
+        """
+        return self.logged_events >= self.snapshot_interval
+
+    def snapshot(self, account, previous_transactions):
+        """
+        Write a snapshot of the state and start a new log generation.
+        :param account: Account immutable object.
+        :param previous_transactions: TransactionHistory, time-ordered window index of the previous transactions.
+        """
+        self._sync_log()
+        snapshot = {
+            'generation': self.generation + 1,
+            'account': {
+                'is_active_card': account.is_active_card,
+                'available_limit': account.available_limit,
+                'is_initialized': account.is_initialized,
+                'is_premium': account.is_premium,
+            },
+            'transactions': [list(transaction) for transaction in previous_transactions],
+            'trackers': get_velocity_tracker_states(previous_transactions),
+        }
+        snapshot_path = os.path.join(self.directory, SNAPSHOT_FILE_NAME)
+        with open(snapshot_path + '.tmp', 'w') as snapshot_file:
+            json.dump(snapshot, snapshot_file)
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+        os.replace(snapshot_path + '.tmp', snapshot_path)
+
+        self.log_file.close()
+        os.remove(self._log_path(self.generation))
+        self.generation += 1
+        self.log_file = open(self._log_path(self.generation), 'a')
+        self.logged_events = 0
+
+    def close(self):
+        """
+        Sync and close the log.
+        """
+        if self.log_file:
+            self._sync_log()
+            self.log_file.close()
+            self.log_file = None
+
+    def _sync_log(self):
+        self.log_file.flush()
+        os.fsync(self.log_file.fileno())
+
+    def _log_path(self, generation):
+        return os.path.join(self.directory, LOG_FILE_NAME.format(generation))
+
+
+def process_durable_event_stream(event_stream, durable_state):
+    """
+    Process the events starting from the recovered state, every event is logged before it's applied and a snapshot is
+    written on every snapshot interval.
+    :param event_stream: Iterable, normalized operations to validate and execute.
+    :param durable_state: DurableState, state to recover and update.
+    :return: Generator, operation results. e.g.
+        {'account': {'active-card': True, 'available-limit': 80}, 'violations': []}
+    """
+    account, previous_transactions = durable_state.recover()
+    try:
+        for event in event_stream:
+            durable_state.log_event(event)
+            account, operation_result = authorize_event(previous_transactions, event, account)
+            if durable_state.should_snapshot():
+                durable_state.snapshot(account, previous_transactions)
+            if operation_result:
+                yield operation_result
+    finally:
+        durable_state.close()
+
+
+def encode_log_event(event):
+    """
+    Encode a normalized event as a log line.
+    :param event: Dict, a single normalized event data. e.g.
+        {"transaction": Transaction(merchant="Habbib's", amount=10, time=1550057700000000)}
+    :return: String, log line. e.g.
+        {"transaction": ["Habbib's", 10, 1550057700000000]}
+    """
+    if 'transaction' in event:
+        event = dict(event, transaction=list(event['transaction']))
+    return json.dumps(event) + '\n'
+
+
+def decode_log_event(line):
+    """
+    Decode a log line into a normalized event.
+    :param line: Bytes, log line. e.g.
+        b'{"transaction": ["Habbib's", 10, 1550057700000000]}\n'
+    :return: Dict, a single normalized event data. e.g.
+        {"transaction": Transaction(merchant="Habbib's", amount=10, time=1550057700000000)}
+    """
+    if not line.endswith(b'\n'):
+        raise ValueError('Incomplete log line')
+    event = json.loads(line)
+    if 'transaction' in event:
+        event['transaction'] = Transaction(*event['transaction'])
+    return event
@@ -0,0 +1,85 @@
+# Python utils
+import os
+import sys
+
+# Utils
+from src.utils.rules import reset_compiled_rules
+from src.utils.stats import STATS
+
+# Handlers
+from src.handlers import event_handler, operations_handler, output_handler
+
+# Stage name, module and function name of every instrumented stage.
+INSTRUMENTED_STAGES = (
+    ('ingest', event_handler, 'decode_event'),
+    ('get_event_type', operations_handler, 'get_event_type'),
+    ('execute_operation_amount_transaction', operations_handler, 'execute_operation_amount_transaction'),
+    ('output', output_handler, 'serialize_result'),
+)
+
+_original_functions = {}
+
+
+def enable_stats():
+    """
+    Enable the stats and replace the pipeline stages with timed functions, the rules are compiled again with timed
+    checks. It must be called before the pipeline starts, the stages are not wrapped while it's disabled, so there is no
+    cost otherwise.
+    The shard workers collect their own stats, they are added to the current process ones when the workers stop.
+    """
+    if STATS.enabled:
+        return
+    STATS.enabled = True
+
+    for stage, module, name in INSTRUMENTED_STAGES:
+        function = _original_functions[(module, name)] = getattr(module, name)
+        if stage == 'output':
+            function = _count_violations(function)
+        setattr(module, name, STATS.timed(stage, function))
+    reset_compiled_rules()
+
+
+def disable_stats():
+    """
+    Disable the stats and restore the original pipeline stages.
+    """
+    if not STATS.enabled:
+        return
+    STATS.enabled = False
+
+    for (module, name), function in _original_functions.items():
+        setattr(module, name, function)
+    _original_functions.clear()
+    reset_compiled_rules()
+
+
+def write_stats(path=None):
+    """
+    Write the stats with the Prometheus text format.
+    :param path: String, output file path, the stderr is used by default. e.g. "authorizer.prom"
+    """
+    text = STATS.to_prometheus()
+    if path is None:
+        sys.stderr.write(text)
+        return
+
+    with open(path + '.tmp', 'w') as stats_file:
+        stats_file.write(text)
+    # The file is replaced at once, so a collector never reads it half written.
+    os.replace(path + '.tmp', path)
+
+
+def _count_violations(serialize_result):
+    """
+    :param serialize_result: Function, result serializer.
+    :return: Function, result serializer that counts the results and their violations.
+    """
+    increment = STATS.increment
+
+    def counted_serialize_result(operation_result):
+        increment('results')
+        for violation in operation_result.get('violations') or ():
+            increment('violations', violation)
+        return serialize_result(operation_result)
+
+    return counted_serialize_result
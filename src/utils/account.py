@@ -11,3 +11,17 @@ class Account:
     available_limit: 0
     is_initialized: False
     is_premium: False
+
+
+class AccountState:
+    """
+    Mutable account in-memory state, updated in place by the embeddable Authorizer.
+    It has the same attributes as Account, so the rules accept both.
+    """
+    __slots__ = ('is_active_card', 'available_limit', 'is_initialized', 'is_premium')
+
+    def __init__(self, is_active_card=False, available_limit=0, is_initialized=False, is_premium=False):
+        self.is_active_card = is_active_card
+        self.available_limit = available_limit
+        self.is_initialized = is_initialized
+        self.is_premium = is_premium
@@ -1,12 +1,18 @@
-# Python utils
-import datetime
-
 # Utils
 from src.utils import violation_errors
+from src.utils.rules import get_compiled_rules, register_rule
+from src.utils.transaction import TRANSACTION_WINDOW
 
 # Handlers
 from src.handlers.account_handler import new_account
 
+# Transactions later than the maximum lateness of the reorder stage, they are not evaluated.
+LATE_TRANSACTION_EVENT = 'late-transaction'
+# Chargebacks and amendments of a processed transaction, they are only evaluated by the amendable authorizer.
+REVERSE_TRANSACTION_EVENT = 'reverse-transaction'
+AMEND_TRANSACTION_EVENT = 'amend-transaction'
+EVENT_TYPES = ('transaction', 'account', LATE_TRANSACTION_EVENT, REVERSE_TRANSACTION_EVENT, AMEND_TRANSACTION_EVENT)
+
 
 def get_event_type(event):
     """
@@ -17,7 +23,7 @@ def get_event_type(event):
     """
     try:
         operation_type = list(event.keys())[0]
-        if operation_type not in ["transaction", "account"]:
+        if operation_type not in EVENT_TYPES:
             return None
         return operation_type
     except Exception:
@@ -26,94 +32,70 @@ def get_event_type(event):
 
 def get_operation_violations(account, operation, previous_transactions):
     """
-    Get the violations by an operation.
+    Get the violations by an operation, with the compiled chain of the registered rules.
     :param account: Account Immutable object.
-    :param operation: Dict, Current transaction operation. e.g.
-        {"merchant": "Habbib's", "amount": 10, "time": "2019-02-13T11:35:00.000Z"}
-    :param previous_transactions: List, previous transaction list. e.g.
-        {"transaction": {"merchant": "Burger King", "amount": 50, "time": "2019-02-13T10:55:50.000Z"}}
-        {"transaction": {"merchant": "Habbib's", "amount": 90, "time": "2019-02-13T11:35:00.000Z"}}
+    :param operation: Transaction record, current transaction operation.
+    :param previous_transactions: TransactionHistory, time-ordered window index of the previous transactions.
     :return: List, violations to apply. e.g.
         ['insufficient-limit', 'high-frequency-small-interval']
     """
-    violations = []
-
-    violations.extend(_base_account_operation_violations(account, operation))
-    violations.extend(_basic_account_operation_violations(account, operation, previous_transactions))
+    return get_compiled_rules().get_violations(account, operation, previous_transactions)
 
-    return violations
 
+def _get_operation_insufficient_limit_violations(account, operation, _):
+    """
+    Check if the amount is greater than the available limit.
+    :param account: Account Immutable object.
+    :param operation: Transaction record, current transaction operation.
+    :param _: TransactionHistory, not used.
+    :return: String, the violation "insufficient-limit" or None.
+    """
+    if operation.amount > account.available_limit:
+        return violation_errors.INSUFFICIENT_LIMITS
 
-def _base_account_operation_violations(account, operation):
-    violations = []
-    if not account.is_initialized:
-        violations.append(violation_errors.ACCOUNT_NOT_INITIALIZED)
-        return violations
-
-    if operation['amount'] > account.available_limit:
-        violations.append(violation_errors.INSUFFICIENT_LIMITS)
 
+def _get_operation_card_not_active_violations(account, operation, _):
+    """
+    Check if the account card is not active.
+    :param account: Account Immutable object.
+    :param operation: Transaction record, current transaction operation.
+    :param _: TransactionHistory, not used.
+    :return: String, the violation "card-not-active" or None.
+    """
     if not account.is_active_card:
-        violations.append(violation_errors.CARD_NOT_ACTIVE)
-
-    return violations
+        return violation_errors.CARD_NOT_ACTIVE
 
 
-def _basic_account_operation_violations(account, operation, previous_transactions):
-    violations = []
-    if not account.is_premium:
-        high_frequency_violations = _get_operation_high_frequency_violations(operation, previous_transactions)
-        if high_frequency_violations:
-            violations.append(high_frequency_violations)
-
-        doubled_transaction_violations = _get_operation_doubled_transaction_violations(operation, previous_transactions)
-        if doubled_transaction_violations:
-            violations.append(doubled_transaction_violations)
-    return violations
-
-
-def _get_operation_high_frequency_violations(operation, previous_transactions):
+def _get_operation_high_frequency_violations(account, operation, previous_transactions):
     """
     Check if exist more than 3 transaction on a 2-minutes interval.
-    :param operation: Dict, Current transaction operation. e.g.
-        {"merchant": "Habbib's", "amount": 10, "time": "2019-02-13T11:35:00.000Z"}
-    :param previous_transactions: List, previous transaction list. e.g.
-        {"transaction": {"merchant": "Burger King", "amount": 50, "time": "2019-02-13T10:55:50.000Z"}}
-        {"transaction": {"merchant": "Habbib's", "amount": 90, "time": "2019-02-13T11:35:00.000Z"}}
+    :param account: Account Immutable object.
+    :param operation: Transaction record, current transaction operation.
+    :param previous_transactions: TransactionHistory, time-ordered window index of the previous transactions.
     :return: String, the violation "high-frequency-small-interval" or None.
     """
-    operation_time = datetime.datetime.strptime(operation['time'], "%Y-%m-%dT%H:%M:%S.%fZ")
-    min_date_range = operation_time - datetime.timedelta(minutes=2)
-    transaction_in_last_2_minutes_count = 0
-
-    for transaction in previous_transactions:
-        transaction_date = datetime.datetime.strptime(transaction['transaction']['time'], "%Y-%m-%dT%H:%M:%S.%fZ")
-        if min_date_range <= transaction_date <= operation_time:
-            transaction_in_last_2_minutes_count += 1
+    operation_time = operation.time
+    min_date_range = operation_time - TRANSACTION_WINDOW
+    transaction_in_last_2_minutes_count = previous_transactions.count_between(min_date_range, operation_time)
 
     if transaction_in_last_2_minutes_count > 2:
         return violation_errors.HIGH_FREQUENCY_SMALL_INTERVAL
 
 
-def _get_operation_doubled_transaction_violations(operation, previous_transactions):
+def _get_operation_doubled_transaction_violations(account, operation, previous_transactions):
     """
-    Check if exist more than 3 transaction on a 2-minutes interval.
-    :param operation: Dict, Current transaction operation. e.g.
-        {"merchant": "Habbib's", "amount": 10, "time": "2019-02-13T11:35:00.000Z"}
-    :param previous_transactions: List, previous transaction list. e.g.
-        {"transaction": {"merchant": "Burger King", "amount": 50, "time": "2019-02-13T10:55:50.000Z"}}
-        {"transaction": {"merchant": "Habbib's", "amount": 90, "time": "2019-02-13T11:35:00.000Z"}}
-    :return: String, the violation "high-frequency-small-interval" or None.
+    Check if exist a transaction with the same merchant and amount on a 2-minutes interval.
+    :param account: Account Immutable object.
+    :param operation: Transaction record, current transaction operation.
+    :param previous_transactions: TransactionHistory, time-ordered window index of the previous transactions.
+    :return: String, the violation "doubled-transaction" or None.
     """
-    operation_time = datetime.datetime.strptime(operation['time'], "%Y-%m-%dT%H:%M:%S.%fZ")
-    min_date_range = operation_time - datetime.timedelta(minutes=2)
+    operation_time = operation.time
+    min_date_range = operation_time - TRANSACTION_WINDOW
 
-    for transaction in previous_transactions:
-        transaction_date = datetime.datetime.strptime(transaction['transaction']['time'], "%Y-%m-%dT%H:%M:%S.%fZ")
-        if transaction['transaction']['merchant'] == operation['merchant']:
-            if transaction['transaction']['amount'] == operation['amount']:
-                if min_date_range <= transaction_date <= operation_time:
-                    return violation_errors.DOUBLED_TRANSACTION
+    if previous_transactions.has_operation_between(operation.merchant, operation.amount,
+                                                   min_date_range, operation_time):
+        return violation_errors.DOUBLED_TRANSACTION
 
 
 def execute_operation_amount_transaction(account, amount):
@@ -133,3 +115,11 @@ def execute_operation_amount_transaction(account, amount):
             is_premium=account.is_premium,
         )
     return account
+
+
+register_rule(violation_errors.INSUFFICIENT_LIMITS, _get_operation_insufficient_limit_violations, cost=0)
+register_rule(violation_errors.CARD_NOT_ACTIVE, _get_operation_card_not_active_violations, cost=1)
+register_rule(violation_errors.HIGH_FREQUENCY_SMALL_INTERVAL, _get_operation_high_frequency_violations,
+              cost=10, window=True)
+register_rule(violation_errors.DOUBLED_TRANSACTION, _get_operation_doubled_transaction_violations,
+              cost=11, window=True)
@@ -0,0 +1,150 @@
+# Python utils
+from typing import Callable, NamedTuple
+
+# Utils
+from src.utils import violation_errors
+from src.utils.stats import STATS
+
+DEFAULT_RULE_COST = 1000
+
+
+class Rule(NamedTuple):
+    """
+    Transaction rule. The check receives the account, the operation and the previous transactions and returns a
+    violation or None.
+    The window rules are skipped for premium accounts, the others are skipped for not initialized accounts.
+    """
+    name: str
+    check: Callable
+    cost: int
+    window: bool
+
+
+class RuleChain:
+    """
+    Flat evaluation chain of the active rules, compiled once. The account rules are evaluated before the window
+    rules, each group is ordered by cost. Every check is timed if the stats are enabled when it's compiled.
+    """
+    __slots__ = ('account_checks', 'window_checks')
+
+    def __init__(self, rules):
+        """
+        :param rules: Iterable, Rule objects in registration order.
+        """
+        rules = sorted(rules, key=lambda rule: rule.cost)
+        self.account_checks = tuple(_get_rule_check(rule) for rule in rules if not rule.window)
+        self.window_checks = tuple(_get_rule_check(rule) for rule in rules if rule.window)
+
+    def get_violations(self, account, operation, previous_transactions):
+        """
+        Get the violations of an operation.
+        :param account: Account Immutable object.
+        :param operation: Transaction record, current transaction operation.
+        :param previous_transactions: TransactionHistory, time-ordered window index of the previous transactions.
+        :return: List, violations to apply. e.g.
+            ['insufficient-limit', 'high-frequency-small-interval']
+        """
+        violations = self.find_violations(account, operation, previous_transactions)
+        return [] if violations is None else violations
+
+    def find_violations(self, account, operation, previous_transactions):
+        """
+        Get the violations of an operation, the violation list is only allocated if there is a violation.
+        :param account: Account Immutable object or AccountState.
+        :param operation: Transaction record, current transaction operation.
+        :param previous_transactions: TransactionHistory, time-ordered window index of the previous transactions.
+        :return: List, violations to apply or None if there are no violations. e.g.
+            ['insufficient-limit', 'high-frequency-small-interval']
+        """
+        violations = None
+        if not account.is_initialized:
+            violations = [violation_errors.ACCOUNT_NOT_INITIALIZED]
+        else:
+            for check in self.account_checks:
+                violation = check(account, operation, previous_transactions)
+                if violation:
+                    if violations is None:
+                        violations = [violation]
+                    else:
+                        violations.append(violation)
+
+        if not account.is_premium:
+            for check in self.window_checks:
+                violation = check(account, operation, previous_transactions)
+                if violation:
+                    if violations is None:
+                        violations = [violation]
+                    else:
+                        violations.append(violation)
+
+        return violations
+
+
+def _get_rule_check(rule):
+    """
+    :param rule: Rule.
+    :return: Function, rule check, timed if the stats are enabled.
+    """
+    return STATS.timed('rule:{}'.format(rule.name), rule.check)
+
+
+_registered_rules = {}
+_compiled_rules = None
+
+
+def register_rule(name, check, cost=DEFAULT_RULE_COST, window=False):
+    """
+    Register a transaction rule, it's evaluated by the next compiled rule chain.
+    :param name: String, rule name. e.g. "max-amount"
+    :param check: Function, (account, operation, previous_transactions) -> violation or None.
+    :param cost: Int, evaluation cost, the cheapest rules are evaluated first.
+    :param window: Bool, True if the rule uses the previous transactions, it's skipped for premium accounts.
+    """
+    _registered_rules[name] = Rule(name=name, check=check, cost=cost, window=window)
+    reset_compiled_rules()
+
+
+def unregister_rule(name):
+    """
+    Remove a registered transaction rule.
+    :param name: String, rule name. e.g. "max-amount"
+    """
+    del _registered_rules[name]
+    reset_compiled_rules()
+
+
+def get_rule_names():
+    """
+    :return: Tuple, names of the registered rules in registration order.
+    """
+    return tuple(_registered_rules)
+
+
+def compile_rules(names=None):
+    """
+    Compile the registered rules into a flat evaluation chain.
+    :param names: Iterable, names of the active rules, all the registered rules by default.
+    :return: RuleChain.
+    """
+    if names is None:
+        return RuleChain(_registered_rules.values())
+    return RuleChain(_registered_rules[name] for name in names)
+
+
+def get_compiled_rules():
+    """
+    Get the compiled chain of all the registered rules, it's compiled again only if the registry changes.
+    :return: RuleChain.
+    """
+    global _compiled_rules
+    if _compiled_rules is None:
+        _compiled_rules = compile_rules()
+    return _compiled_rules
+
+
+def reset_compiled_rules():
+    """
+    Discard the compiled chain, it's compiled again on the next use.
+    """
+    global _compiled_rules
+    _compiled_rules = None
@@ -0,0 +1,168 @@
+# Python utils
+import time
+from bisect import bisect_left
+from functools import wraps
+
+LATENCY_BUCKETS = (
+    0.000001, 0.0000025, 0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.01, 0.1, 1.0,
+)
+
+
+class Histogram:
+    """
+    Latency histogram with fixed buckets, in seconds.
+    """
+    __slots__ = ('bucket_counts', 'count', 'sum')
+
+    def __init__(self):
+        self.bucket_counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        """
+        :param seconds: Float, observed latency.
+        """
+        self.bucket_counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def merge(self, histogram):
+        """
+        :param histogram: Histogram, latencies to add.
+        """
+        self.bucket_counts = [count + other_count
+                              for count, other_count in zip(self.bucket_counts, histogram.bucket_counts)]
+        self.count += histogram.count
+        self.sum += histogram.sum
+
+    def clear(self):
+        """
+        Set the histogram to zero.
+        """
+        self.bucket_counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+
+class Stats:
+    """
+    Pipeline counters and latency histograms.
+    It's disabled by default, the stages are only wrapped with timers once it's enabled, so it has no cost otherwise.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.counters = {}
+        self.histograms = {}
+
+    def increment(self, name, label=None, value=1):
+        """
+        Increment a counter.
+        :param name: String, counter name. e.g. "violations"
+        :param label: String, counter label. e.g. "insufficient-limit"
+        :param value: Int, increment.
+        """
+        key = (name, label)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, stage, seconds):
+        """
+        Add a latency to the histogram of a stage.
+        :param stage: String, stage name. e.g. "ingest"
+        :param seconds: Float, latency.
+        """
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            histogram = self.histograms[stage] = Histogram()
+        histogram.observe(seconds)
+
+    def timed(self, stage, function):
+        """
+        Wrap a function with a timer of a stage, the function is returned as is if the stats are disabled.
+        :param stage: String, stage name. e.g. "get_event_type"
+        :param function: Function, function to measure.
+        :return: Function.
+        """
+        if not self.enabled:
+            return function
+
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            histogram = self.histograms[stage] = Histogram()
+        perf_counter = time.perf_counter
+
+        @wraps(function)
+        def timed_function(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                histogram.observe(perf_counter() - start)
+
+        return timed_function
+
+    def reset(self):
+        """
+        Remove all the counters and histograms.
+        """
+        self.counters.clear()
+        self.histograms.clear()
+
+    def clear(self):
+        """
+        Set the counters and histograms to zero, the timed functions keep updating their histograms.
+        """
+        self.counters.clear()
+        for histogram in self.histograms.values():
+            histogram.clear()
+
+    def merge(self, counters, histograms):
+        """
+        Add the counters and histograms of another process. e.g. a shard worker.
+        :param counters: Dict, counter values by (name, label).
+        :param histograms: Dict, Histogram by stage.
+        """
+        for name, label in counters:
+            self.increment(name, label, counters[(name, label)])
+        for stage, histogram in histograms.items():
+            own_histogram = self.histograms.get(stage)
+            if own_histogram is None:
+                own_histogram = self.histograms[stage] = Histogram()
+            own_histogram.merge(histogram)
+
+    def to_prometheus(self, prefix='authorizer'):
+        """
+        Render the stats with the Prometheus text format.
+        :param prefix: String, metric name prefix.
+        :return: String, Prometheus text.
+        """
+        lines = []
+        for name in sorted({name for name, _ in self.counters}):
+            lines.append('# TYPE {}_{}_total counter'.format(prefix, name))
+            for (counter_name, label), value in sorted(self.counters.items(), key=lambda item: str(item[0])):
+                if counter_name != name:
+                    continue
+                labels = '{{{}="{}"}}'.format(_LABEL_NAMES.get(name, 'label'), label) if label is not None else ''
+                lines.append('{}_{}_total{} {}'.format(prefix, name, labels, value))
+
+        if self.histograms:
+            lines.append('# TYPE {}_stage_seconds histogram'.format(prefix))
+        for stage, histogram in sorted(self.histograms.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(LATENCY_BUCKETS + ('+Inf',), histogram.bucket_counts):
+                cumulative += bucket_count
+                lines.append('{}_stage_seconds_bucket{{stage="{}",le="{}"}} {}'.format(
+                    prefix, stage, bound, cumulative))
+            lines.append('{}_stage_seconds_sum{{stage="{}"}} {}'.format(prefix, stage, histogram.sum))
+            lines.append('{}_stage_seconds_count{{stage="{}"}} {}'.format(prefix, stage, histogram.count))
+
+        return '\n'.join(lines) + '\n'
+
+
+_LABEL_NAMES = {
+    'violations': 'violation',
+    'retry_cache': 'outcome',
+}
+
+STATS = Stats()
@@ -0,0 +1,45 @@
+# Python utils
+import datetime
+from typing import NamedTuple
+
+TRANSACTION_TIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+TRANSACTION_WINDOW = 2 * 60 * 1000000
+
+EPOCH = datetime.datetime(1970, 1, 1)
+MICROSECOND = datetime.timedelta(microseconds=1)
+
+
+class Transaction(NamedTuple):
+    """
+    Immutable transaction record, normalized once at ingest.
+    The time is an epoch-based integer in microseconds.
+    """
+    merchant: str
+    amount: float
+    time: int
+
+
+class TransactionAmendment(NamedTuple):
+    """
+    Amendment of a processed transaction, normalized once at ingest.
+    """
+    original: Transaction
+    amended: Transaction
+
+
+def parse_transaction_time(time):
+    """
+    Parse a transaction time into epoch microseconds.
+    :param time: String, transaction time. e.g. "2019-02-13T11:35:00.000Z".
+    :return: Int, epoch microseconds. e.g. 1550057700000000.
+    """
+    moment = None
+    if len(time) == 24 and time[10] == 'T' and time[19] == '.' and time[23] == 'Z':
+        # Fast path for the millisecond times, the other times are parsed with the full format.
+        try:
+            moment = datetime.datetime.fromisoformat(time[:23])
+        except ValueError:
+            pass
+    if moment is None:
+        moment = datetime.datetime.strptime(time, TRANSACTION_TIME_FORMAT)
+    return (moment - EPOCH) // MICROSECOND
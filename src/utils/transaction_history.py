@@ -0,0 +1,228 @@
+# Python utils
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import deque
+
+# Utils
+from src.utils.transaction import TRANSACTION_WINDOW, Transaction
+
+
+class TransactionHistory:
+    """
+    Time-ordered window index of the previous transactions.
+    Only the transactions inside the retention period of the newest transaction are indexed, the retention period is
+    the window plus the max lateness, so the transactions delivered up to the max lateness out of order are evaluated
+    exactly like the time-ordered ones.
+    The transactions are also indexed by (merchant, amount), with a time-ordered bucket per key, and they feed the
+    trackers attached by the rules that need a longer window (e.g. the velocity rules).
+    With a max lateness, the evicted transactions are dropped, so the memory is bounded by the window instead of the
+    stream length, and a transaction older than the newest one minus the max lateness is late: the start of its window
+    may have been evicted, so it can't be evaluated.
+    Without a max lateness, the evicted transactions are moved to a compact archive, so every transaction is evaluated
+    against the full history, no matter how late it is.
+    """
+    __slots__ = ('_times', '_keys', '_buckets', '_retention', '_max_lateness', '_archive', '_trackers')
+
+    def __init__(self, transactions=(), window=TRANSACTION_WINDOW, max_lateness=None):
+        """
+        :param transactions: Iterable, previous Transaction records.
+        :param window: Int, time window of the rules in microseconds.
+        :param max_lateness: Int, max lateness of an out of order transaction in microseconds, or None to evaluate the
+            transactions against the full history.
+        """
+        self._times = deque()
+        self._keys = deque()
+        self._buckets = {}
+        self._retention = window + (TRANSACTION_WINDOW if max_lateness is None else max_lateness)
+        self._max_lateness = max_lateness
+        self._archive = _TransactionArchive() if max_lateness is None else None
+        self._trackers = None
+        for transaction in transactions:
+            self.append(transaction)
+
+    def __len__(self):
+        return len(self._times)
+
+    def __iter__(self):
+        """
+        Iterate the retained transactions in time order.
+        :return: Generator, Transaction records.
+        """
+        for time, (merchant, amount) in zip(self._times, self._keys):
+            yield Transaction(merchant=merchant, amount=amount, time=time)
+
+    def append(self, transaction):
+        """
+        Add a transaction and evict the transactions that are out of the retention period.
+        :param transaction: Transaction record.
+        """
+        time = transaction.time
+        key = (transaction.merchant, transaction.amount)
+        times = self._times
+        bucket = self._buckets.setdefault(key, deque())
+
+        if not times or times[-1] <= time:
+            times.append(time)
+            self._keys.append(key)
+        else:
+            # Out of order transaction, keep the entries sorted by time.
+            index = bisect_right(times, time)
+            times.insert(index, time)
+            self._keys.insert(index, key)
+
+        if not bucket or bucket[-1] <= time:
+            bucket.append(time)
+        else:
+            bucket.insert(bisect_right(bucket, time), time)
+
+        min_time = times[-1] - self._retention
+        while times[0] < min_time:
+            self._evict_oldest()
+
+        if self._trackers:
+            for tracker in self._trackers.values():
+                tracker.add(transaction)
+
+    def is_late(self, time):
+        """
+        Check if a transaction is later than the max lateness, its window may be out of the retention period.
+        :param time: Int, transaction time in epoch microseconds.
+        :return: Bool, True if the transaction can't be evaluated, always False without a max lateness.
+        """
+        if self._max_lateness is None:
+            return False
+        times = self._times
+        return bool(times) and time < times[-1] - self._max_lateness
+
+    def get_tracker(self, name, create_tracker):
+        """
+        Get a tracker attached to the history, every appended transaction is added to it. A new tracker is created with
+        the retained transactions.
+        :param name: String, tracker name. e.g. "hourly-limit"
+        :param create_tracker: Function, tracker factory, the tracker has an add(transaction) method.
+        :return: Object, tracker.
+        """
+        if self._trackers is None:
+            self._trackers = {}
+        tracker = self._trackers.get(name)
+        if tracker is None:
+            tracker = self._trackers[name] = create_tracker()
+            for transaction in self:
+                tracker.add(transaction)
+        return tracker
+
+    def get_trackers(self):
+        """
+        :return: Dict, attached trackers by name.
+        """
+        return dict(self._trackers or {})
+
+    def set_tracker(self, name, tracker):
+        """
+        Attach a restored tracker, it's not seeded with the retained transactions.
+        :param name: String, tracker name. e.g. "hourly-limit"
+        :param tracker: Object, tracker with an add(transaction) method.
+        """
+        if self._trackers is None:
+            self._trackers = {}
+        self._trackers[name] = tracker
+
+    def _evict_oldest(self):
+        time = self._times.popleft()
+        key = self._keys.popleft()
+        bucket = self._buckets[key]
+        bucket.popleft()
+        if not bucket:
+            del self._buckets[key]
+        if self._archive is not None:
+            self._archive.add(time, key)
+
+    def count_between(self, start, end):
+        """
+        Count the transactions with a time on the [start, end] range.
+        :param start: Int, range start in epoch microseconds.
+        :param end: Int, range end in epoch microseconds.
+        :return: Int, transactions count.
+        """
+        count = _count_between(self._times, start, end)
+        if self._archive is not None and self._archive.contains_start(start):
+            count += self._archive.count_between(start, end)
+        return count
+
+    def has_operation_between(self, merchant, amount, start, end):
+        """
+        Check if exist a transaction with the same merchant and amount with a time on the [start, end] range.
+        Only the bucket of the (merchant, amount) key is checked.
+        :param merchant: String, transaction merchant. e.g. "Habbib's".
+        :param amount: Float, transaction amount. e.g. 10.
+        :param start: Int, range start in epoch microseconds.
+        :param end: Int, range end in epoch microseconds.
+        :return: Bool, True if exist a transaction.
+        """
+        bucket = self._buckets.get((merchant, amount))
+        if bucket and _count_between(bucket, start, end) > 0:
+            return True
+        if self._archive is not None and self._archive.contains_start(start):
+            return self._archive.has_key_between((merchant, amount), start, end)
+        return False
+
+
+class _TransactionArchive:
+    """
+    Compact time-ordered archive of the evicted transactions: a time and a key id per transaction (16 bytes), the keys
+    are stored once. It's only read by the transactions older than the retention period.
+    """
+    __slots__ = ('_times', '_key_ids', '_ids_by_key')
+
+    def __init__(self):
+        self._times = array('q')
+        self._key_ids = array('q')
+        self._ids_by_key = {}
+
+    def add(self, time, key):
+        """
+        :param time: Int, transaction time in epoch microseconds.
+        :param key: Tuple, transaction (merchant, amount).
+        """
+        key_id = self._ids_by_key.setdefault(key, len(self._ids_by_key))
+        times = self._times
+        if not times or times[-1] <= time:
+            times.append(time)
+            self._key_ids.append(key_id)
+        else:
+            index = bisect_right(times, time)
+            times.insert(index, time)
+            self._key_ids.insert(index, key_id)
+
+    def contains_start(self, start):
+        """
+        :param start: Int, range start in epoch microseconds.
+        :return: Bool, True if a range from the start may include archived transactions.
+        """
+        return bool(self._times) and start <= self._times[-1]
+
+    def count_between(self, start, end):
+        return _count_between(self._times, start, end)
+
+    def has_key_between(self, key, start, end):
+        key_id = self._ids_by_key.get(key)
+        if key_id is None:
+            return False
+        times = self._times
+        high = bisect_right(times, end)
+        return key_id in self._key_ids[bisect_left(times, start, 0, high):high]
+
+
+def _count_between(times, start, end):
+    """
+    Count the times on the [start, end] range.
+    :param times: Deque or Array, sorted epoch microseconds.
+    :param start: Int, range start in epoch microseconds.
+    :param end: Int, range end in epoch microseconds.
+    :return: Int, times count.
+    """
+    if not times:
+        return 0
+
+    high = len(times) if times[-1] <= end else bisect_right(times, end)
+    return high - bisect_left(times, start, 0, high)
@@ -0,0 +1,270 @@
+# Utils
+from src.utils.rules import get_rule_names, register_rule
+
+DEFAULT_VELOCITY_BUCKETS = 60
+DEFAULT_VELOCITY_RULE_COST = 20
+# Number of counters of a per merchant tracker before the idle ones are evicted, it grows with the active ones.
+MIN_PRUNE_SIZE = 64
+
+# Tracker factory of every registered velocity rule, by rule name.
+_tracker_factories = {}
+
+
+class BucketedCounter:
+    """
+    Sliding window count and sum of the transactions, on a ring buffer of time buckets.
+    The window is approximated to the bucket width: the buckets that started up to one window before the newest bucket
+    are counted. The update and the query cost O(1), the buckets are only summed when the newest bucket moves forward,
+    and the memory only depends on the number of buckets.
+    """
+    __slots__ = ('_width', '_counts', '_sums', '_head', '_count', '_sum')
+
+    def __init__(self, window, buckets=DEFAULT_VELOCITY_BUCKETS):
+        """
+        :param window: Int, window in microseconds. e.g. 3600000000
+        :param buckets: Int, number of buckets of the window.
+        """
+        self._width = -(-window // buckets)
+        self._counts = [0] * buckets
+        self._sums = [0] * buckets
+        self._head = None
+        self._count = 0
+        self._sum = 0
+
+    def add(self, time, amount):
+        """
+        :param time: Int, transaction time in epoch microseconds.
+        :param amount: Float, transaction amount.
+        """
+        bucket = time // self._width
+        self._advance(bucket)
+        if bucket <= self._head - len(self._counts):
+            # Older than the window.
+            return
+        slot = bucket % len(self._counts)
+        self._counts[slot] += 1
+        self._sums[slot] += amount
+        self._count += 1
+        self._sum += amount
+
+    def get(self, time):
+        """
+        :param time: Int, window end in epoch microseconds.
+        :return: Int, transactions count, Float, transactions amount sum.
+        """
+        self._advance(time // self._width)
+        return self._count, self._sum
+
+    def is_idle(self, time):
+        """
+        :param time: Int, window end in epoch microseconds.
+        :return: Bool, True if every bucket is out of the window.
+        """
+        return self._head is None or self._head <= time // self._width - len(self._counts)
+
+    def get_state(self):
+        """
+        :return: List, JSON serializable state. e.g. [25920, [0, 1], [0, 10]]
+        """
+        return [self._head, list(self._counts), list(self._sums)]
+
+    def load_state(self, state):
+        """
+        :param state: List, state of a counter with the same number of buckets.
+        """
+        head, counts, sums = state
+        if len(counts) != len(self._counts) or len(sums) != len(self._sums):
+            raise ValueError('The counter state has a different number of buckets')
+        self._head = head
+        self._counts = list(counts)
+        self._sums = list(sums)
+        self._count = sum(self._counts)
+        self._sum = sum(self._sums)
+
+    def _advance(self, bucket):
+        """
+        Move the newest bucket forward and clear the buckets that left the window.
+        :param bucket: Int, bucket index of a time.
+        """
+        head = self._head
+        if head is not None and bucket <= head:
+            return
+        self._head = bucket
+        if head is None:
+            return
+
+        size = len(self._counts)
+        for expired_bucket in range(head + 1, min(bucket, head + size) + 1):
+            slot = expired_bucket % size
+            self._counts[slot] = 0
+            self._sums[slot] = 0
+        # The totals are summed again, so the float sums don't drift.
+        self._count = sum(self._counts)
+        self._sum = sum(self._sums)
+
+
+class VelocityTracker:
+    """
+    Bucketed counters of an account, or of every merchant of an account.
+    """
+    __slots__ = ('window', 'buckets', 'per_merchant', '_counters', '_prune_size')
+
+    def __init__(self, window, buckets=DEFAULT_VELOCITY_BUCKETS, per_merchant=False):
+        """
+        :param window: Int, window in microseconds.
+        :param buckets: Int, number of buckets of the window.
+        :param per_merchant: Bool, True to count the transactions of every merchant apart.
+        """
+        self.window = window
+        self.buckets = buckets
+        self.per_merchant = per_merchant
+        self._counters = {}
+        self._prune_size = MIN_PRUNE_SIZE
+
+    def add(self, transaction):
+        """
+        :param transaction: Transaction record.
+        """
+        self._get_counter(transaction.merchant).add(transaction.time, transaction.amount)
+        if len(self._counters) > self._prune_size:
+            self._prune(transaction.time)
+
+    def get(self, merchant, time):
+        """
+        :param merchant: String, transaction merchant. e.g. "Habbib's"
+        :param time: Int, window end in epoch microseconds.
+        :return: Int, transactions count, Float, transactions amount sum.
+        """
+        return self._get_counter(merchant).get(time)
+
+    def get_state(self):
+        """
+        :return: Dict, JSON serializable state. e.g.
+            {"window": 3600000000, "buckets": 60, "counters": [[null, [25920, [0, 1], [0, 10]]]]}
+        """
+        return {
+            'window': self.window,
+            'buckets': self.buckets,
+            'counters': [[key, counter.get_state()] for key, counter in self._counters.items()],
+        }
+
+    def load_state(self, state):
+        """
+        :param state: Dict, state of a tracker with the same window and number of buckets.
+        """
+        if state['window'] != self.window or state['buckets'] != self.buckets:
+            raise ValueError('The tracker state has a different window')
+        counters = {}
+        for key, counter_state in state['counters']:
+            counter = counters[key] = BucketedCounter(self.window, self.buckets)
+            counter.load_state(counter_state)
+        self._counters = counters
+
+    def _prune(self, time):
+        """
+        Evict the counters with every bucket out of the window, so the merchants that stop buying are forgotten.
+        :param time: Int, newest transaction time in epoch microseconds.
+        """
+        for key in [key for key, counter in self._counters.items() if counter.is_idle(time)]:
+            del self._counters[key]
+        self._prune_size = max(MIN_PRUNE_SIZE, 2 * len(self._counters))
+
+    def _get_counter(self, merchant):
+        key = merchant if self.per_merchant else None
+        counter = self._counters.get(key)
+        if counter is None:
+            counter = self._counters[key] = BucketedCounter(self.window, self.buckets)
+        return counter
+
+
+def register_velocity_rule(name, window, max_count=None, max_amount=None, per_merchant=False,
+                           buckets=DEFAULT_VELOCITY_BUCKETS, cost=DEFAULT_VELOCITY_RULE_COST):
+    """
+    Register a velocity rule: the count or the amount sum of the transactions on a window, the current one included,
+    can't exceed a limit. Like the other window rules, every processed transaction is counted and it's skipped for
+    premium accounts.
+    :param name: String, rule name and violation. e.g. "hourly-limit"
+    :param window: Int, window in microseconds. e.g. 3600000000
+    :param max_count: Int, maximum number of transactions on the window or None.
+    :param max_amount: Float, maximum amount sum on the window or None.
+    :param per_merchant: Bool, True to limit the transactions of every merchant apart.
+    :param buckets: Int, number of buckets of the window.
+    :param cost: Int, evaluation cost.
+    """
+    if max_count is None and max_amount is None:
+        raise ValueError('A velocity rule needs a max count or a max amount')
+
+    def create_tracker():
+        return VelocityTracker(window, buckets=buckets, per_merchant=per_merchant)
+
+    _tracker_factories[name] = create_tracker
+
+    def check(account, operation, previous_transactions):
+        tracker = previous_transactions.get_tracker(name, create_tracker)
+        count, amount = tracker.get(operation.merchant, operation.time)
+        if max_count is not None and count + 1 > max_count:
+            return name
+        if max_amount is not None and amount + operation.amount > max_amount:
+            return name
+
+    register_rule(name, check, cost=cost, window=True)
+
+
+def get_velocity_tracker_states(previous_transactions):
+    """
+    Get the state of the velocity trackers attached to a history, so the long windows survive a restart.
+    :param previous_transactions: TransactionHistory.
+    :return: Dict, JSON serializable state by rule name.
+    """
+    rule_names = get_rule_names()
+    return {
+        name: tracker.get_state() for name, tracker in previous_transactions.get_trackers().items()
+        if name in rule_names and isinstance(tracker, VelocityTracker)
+    }
+
+
+def restore_velocity_trackers(previous_transactions, states):
+    """
+    Attach the saved velocity trackers to a history. The states of the rules that are not registered anymore or have
+    another window are skipped, those trackers are created again from the retained transactions.
+    :param previous_transactions: TransactionHistory.
+    :param states: Dict, state by rule name, from get_velocity_tracker_states.
+    """
+    for name, state in states.items():
+        create_tracker = _tracker_factories.get(name)
+        if create_tracker is None or name not in get_rule_names():
+            continue
+        tracker = create_tracker()
+        try:
+            tracker.load_state(state)
+        except (ValueError, TypeError, KeyError):
+            continue
+        previous_transactions.set_tracker(name, tracker)
+
+
+def parse_velocity_rule(specification):
+    """
+    Parse a velocity rule specification.
+    :param specification: String, comma separated options, the window is in seconds. e.g.
+        "name=hourly-limit,window=3600,max-count=20,max-amount=5000,per=merchant"
+    :return: Dict, register_velocity_rule arguments.
+    """
+    options = dict(option.partition('=')[::2] for option in specification.split(','))
+    if 'name' not in options or 'window' not in options:
+        raise ValueError('A velocity rule needs a name and a window: {}'.format(specification))
+    arguments = {
+        'name': options.pop('name'),
+        'window': int(float(options.pop('window')) * 1000000),
+        'per_merchant': options.pop('per', 'account') == 'merchant',
+    }
+    if 'max-count' in options:
+        arguments['max_count'] = int(options.pop('max-count'))
+    if 'max-amount' in options:
+        arguments['max_amount'] = float(options.pop('max-amount'))
+    if 'buckets' in options:
+        arguments['buckets'] = int(options.pop('buckets'))
+    if 'max_count' not in arguments and 'max_amount' not in arguments:
+        raise ValueError('A velocity rule needs a max-count or a max-amount: {}'.format(specification))
+    if options:
+        raise ValueError('Unknown velocity rule options: {}'.format(', '.join(options)))
+    return arguments
@@ -6,3 +6,6 @@ INSUFFICIENT_LIMITS = "insufficient-limit"
 CARD_NOT_ACTIVE = "card-not-active"
 HIGH_FREQUENCY_SMALL_INTERVAL = "high-frequency-small-interval"
 DOUBLED_TRANSACTION = "doubled-transaction"
+LATE_TRANSACTION = "late-transaction"
+TRANSACTION_NOT_FOUND = "transaction-not-found"
+AMENDMENT_OUTSIDE_HORIZON = "amendment-outside-horizon"
@@ -0,0 +1,150 @@
+# Python
+import os
+import sqlite3
+import tempfile
+import unittest
+from functools import partial
+
+# Utils
+from src.utils.rules import get_rule_names, unregister_rule
+from src.utils.transaction import Transaction
+from src.utils.transaction_history import TransactionHistory
+from src.utils.velocity import register_velocity_rule
+
+# Handlers
+from src.handlers.account_handler import initialize_account, new_account
+from src.handlers.account_store_handler import MemoryAccountStore, SQLiteAccountStore
+from src.handlers.event_handler import normalize_event
+from src.handlers.shard_handler import process_sharded_event_stream
+
+
+class TestAccountStoreHandler(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'accounts.sqlite')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _state(self, available_limit, transaction_time=0):
+        return (
+            new_account(is_active_card=True, available_limit=available_limit, is_premium=True),
+            TransactionHistory([Transaction(merchant="Habbib's", amount=10, time=transaction_time)]),
+        )
+
+    def _assert_state(self, state, available_limit, transaction_time=0):
+        account, previous_transactions = state
+        self.assertEqual(account, self._state(available_limit)[0])
+        self.assertEqual(list(previous_transactions), [Transaction(merchant="Habbib's", amount=10,
+                                                                   time=transaction_time)])
+
+    def test_memory_account_store(self):
+        store = MemoryAccountStore()
+        self.assertEqual(store.get("1")[0], initialize_account())
+        store.put("1", self._state(90))
+        self._assert_state(store.get("1"), 90)
+
+    def test_sqlite_account_store_new_account(self):
+        store = SQLiteAccountStore(self.path)
+        account, previous_transactions = store.get("1")
+        self.assertEqual(account, initialize_account())
+        self.assertEqual(len(previous_transactions), 0)
+        store.close()
+
+    def test_sqlite_account_store_reopen(self):
+        store = SQLiteAccountStore(self.path)
+        store.put("1", self._state(90))
+        store.put(1, self._state(80))
+        store.close()
+
+        store = SQLiteAccountStore(self.path)
+        self._assert_state(store.get("1"), 90)
+        self._assert_state(store.get(1), 80)
+        store.close()
+
+    def test_sqlite_account_store_eviction(self):
+        store = SQLiteAccountStore(self.path, cache_size=2, write_batch=2)
+        for index in range(5):
+            store.put(str(index), self._state(index, transaction_time=index))
+        self.assertEqual(list(store.cache), ["3", "4"])
+        # "0" and "1" are written, "2" is pending.
+        self.assertEqual(list(store.pending_writes), ["2"])
+
+        for index in range(5):
+            self._assert_state(store.get(str(index)), index, transaction_time=index)
+        store.close()
+
+    def test_sqlite_account_store_prefetch(self):
+        store = SQLiteAccountStore(self.path)
+        store.put("1", self._state(90))
+        store.close()
+
+        store = SQLiteAccountStore(self.path)
+        store.prefetch(["1", "2"])
+        self.assertEqual(set(store.cache), {"1", "2"})
+        self._assert_state(store.cache["1"], 90)
+        self.assertEqual(store.cache["2"][0], initialize_account())
+        store.close()
+
+    def test_sqlite_account_store_prefetch_unhashable_account_id(self):
+        store = SQLiteAccountStore(self.path)
+        store.prefetch(["1", ["2"], {"3": 3}])
+        self.assertEqual(list(store.cache), ["1"])
+        store.close()
+
+    def test_sqlite_account_store_velocity_trackers(self):
+        register_velocity_rule('hourly-limit', window=3600 * 1000000, max_count=2)
+        self.addCleanup(lambda: 'hourly-limit' in get_rule_names() and unregister_rule('hourly-limit'))
+        # The transactions are 20 minutes apart, older than the retained window, only the tracker has them.
+        events = [normalize_event({"account-id": "1", "transaction": {
+            "merchant": "Habbib's", "amount": 10, "time": time}}) for time in [
+            "2019-02-13T10:00:00.000Z", "2019-02-13T10:20:00.000Z", "2019-02-13T10:40:00.000Z"]]
+        account_event = {"account-id": "1", "account": {"active-card": True, "available-limit": 100}}
+        # The first account is evicted, so its state is written and loaded again.
+        create_store = partial(SQLiteAccountStore, self.path, cache_size=1, write_batch=1)
+        list(process_sharded_event_stream([account_event] + events[:1], create_store=create_store))
+        list(process_sharded_event_stream([events[1], {"account-id": "2", "account": {
+            "active-card": True, "available-limit": 100}}], create_store=create_store))
+        results = list(process_sharded_event_stream(events[2:], create_store=create_store))
+        self.assertEqual(results[0]['violations'], ['hourly-limit'])
+
+    def test_sqlite_account_store_without_trackers_column(self):
+        connection = sqlite3.connect(self.path)
+        connection.execute('CREATE TABLE accounts (id TEXT PRIMARY KEY, account TEXT NOT NULL, '
+                           'transactions TEXT NOT NULL)')
+        connection.execute('INSERT INTO accounts VALUES (?, ?, ?)', ('"1"', '[true, 90, true, true]',
+                                                                     '[["Habbib\'s", 10, 0]]'))
+        connection.commit()
+        connection.close()
+
+        store = SQLiteAccountStore(self.path)
+        self._assert_state(store.get("1"), 90)
+        store.put("1", self._state(80))
+        store.close()
+
+    def test_process_sharded_event_stream_with_sqlite_account_store(self):
+        create_store = partial(SQLiteAccountStore, self.path, cache_size=1, write_batch=1)
+        first_events = [
+            {"account-id": "1", "account": {"active-card": True, "available-limit": 100}},
+            {"account-id": "2", "account": {"active-card": True, "available-limit": 10}},
+            normalize_event({"account-id": "1", "transaction": {
+                "merchant": "Habbib's", "amount": 20, "time": "2019-02-13T11:35:00.000Z"}}),
+        ]
+        second_events = [
+            normalize_event({"account-id": "1", "transaction": {
+                "merchant": "Habbib's", "amount": 20, "time": "2019-02-13T11:35:10.000Z"}}),
+            normalize_event({"account-id": "2", "transaction": {
+                "merchant": "Habbib's", "amount": 5, "time": "2019-02-13T11:35:10.000Z"}}),
+        ]
+        list(process_sharded_event_stream(first_events, workers=1, chunk_size=2, create_store=create_store))
+        results = list(process_sharded_event_stream(second_events, workers=2, create_store=create_store))
+        self.assertEqual(results, [
+            {'account-id': '1', 'account': {'active-card': True, 'available-limit': 80},
+             'violations': ['doubled-transaction']},
+            {'account-id': '2', 'account': {'active-card': True, 'available-limit': 5}, 'violations': []},
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
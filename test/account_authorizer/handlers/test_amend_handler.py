@@ -0,0 +1,146 @@
+# Python
+import copy
+import unittest
+
+# Handlers
+from src.handlers import amend_handler
+from src.handlers.amend_handler import AmendableAuthorizer, process_amendable_event_stream
+from src.handlers.event_handler import normalize_event
+from src.handlers.operations_handler import process_events
+
+
+class TestAmendHandler(unittest.TestCase):
+
+    def _transaction(self, merchant, amount, time):
+        return {"transaction": {"merchant": merchant, "amount": amount, "time": time}}
+
+    def _event_stream(self):
+        return [
+            {"account": {"active-card": True, "available-limit": 100}},
+            self._transaction("Burger King", 60, "2019-02-13T10:00:00.000Z"),
+            self._transaction("Habbib's", 50, "2019-02-13T11:00:00.000Z"),
+            self._transaction("McDonald's", 30, "2019-02-13T12:00:00.000Z"),
+            self._transaction("McDonald's", 5, "2019-02-13T12:00:30.000Z"),
+            self._transaction("McDonald's", 5, "2019-02-13T12:01:00.000Z"),
+            self._transaction("Subway", 1, "2019-02-13T15:00:00.000Z"),
+        ]
+
+    def _authorize(self, events):
+        authorizer = AmendableAuthorizer()
+        results = [authorizer.authorize(normalize_event(event)) for event in copy.deepcopy(events)]
+        return authorizer, results
+
+    def _expected_results(self, events):
+        return process_events([normalize_event(event) for event in copy.deepcopy(events)])
+
+    def test_authorize_like_process_events(self):
+        authorizer, results = self._authorize(self._event_stream())
+        self.assertEqual(results, self._expected_results(self._event_stream()))
+
+    def test_reverse_transaction(self):
+        authorizer, _ = self._authorize(self._event_stream())
+        result = authorizer.authorize(normalize_event({"reverse-transaction": {
+            "merchant": "Burger King", "amount": 60, "time": "2019-02-13T10:00:00.000Z"}}))
+
+        events = self._event_stream()
+        del events[1]
+        expected_results = self._expected_results(events)
+        self.assertEqual(result['account'], expected_results[-1]['account'])
+        self.assertEqual(result['violations'], [])
+        self.assertEqual(result['changes'], [
+            {'event': 1, 'reversed': True},
+            {'event': 2, **expected_results[1]},
+            {'event': 3, **expected_results[2]},
+            {'event': 4, **expected_results[3]},
+            {'event': 5, **expected_results[4]},
+            {'event': 6, **expected_results[5]},
+        ])
+
+    def test_amend_transaction_window(self):
+        authorizer, _ = self._authorize(self._event_stream())
+        result = authorizer.authorize(normalize_event({"amend-transaction": {
+            "merchant": "McDonald's", "amount": 5, "time": "2019-02-13T12:00:30.000Z", "amended": {"amount": 4}}}))
+
+        events = self._event_stream()
+        events[4] = self._transaction("McDonald's", 4, "2019-02-13T12:00:30.000Z")
+        expected_results = self._expected_results(events)
+        self.assertEqual(result['account'], expected_results[-1]['account'])
+        # The amended transaction is not a doubled transaction anymore and the limit path changes.
+        self.assertEqual(result['changes'], [
+            {'event': 4, **expected_results[4]},
+            {'event': 5, **expected_results[5]},
+            {'event': 6, **expected_results[6]},
+        ])
+
+    def test_amend_transaction_converges(self):
+        authorizer, _ = self._authorize(self._event_stream())
+        result = authorizer.authorize(normalize_event({"amend-transaction": {
+            "merchant": "Burger King", "amount": 60, "time": "2019-02-13T10:00:00.000Z",
+            "amended": {"merchant": "Wendy's"}}}))
+        # The evaluation stops at the next transaction, the account is the same and the window has moved on.
+        self.assertEqual(result['changes'], [])
+        self.assertEqual(authorizer.events[1], {'transaction': normalize_event(
+            self._transaction("Wendy's", 60, "2019-02-13T10:00:00.000Z"))['transaction']})
+
+        result = authorizer.authorize(normalize_event({"reverse-transaction": {
+            "merchant": "Wendy's", "amount": 60, "time": "2019-02-13T10:00:00.000Z"}}))
+        self.assertEqual(result['changes'][0], {'event': 1, 'reversed': True})
+
+    def test_transaction_not_found(self):
+        authorizer, _ = self._authorize(self._event_stream())
+        result = authorizer.authorize(normalize_event({"reverse-transaction": {
+            "merchant": "Burger King", "amount": 10, "time": "2019-02-13T10:00:00.000Z"}}))
+        self.assertEqual(result['violations'], ['transaction-not-found'])
+        self.assertEqual(result['changes'], [])
+
+    def test_new_events_after_change(self):
+        events = self._event_stream() + [self._transaction("Subway", 1, "2019-02-13T15:00:10.000Z")]
+        authorizer, _ = self._authorize(events[:-1])
+        authorizer.authorize(normalize_event({"reverse-transaction": {
+            "merchant": "Subway", "amount": 1, "time": "2019-02-13T15:00:00.000Z"}}))
+        result = authorizer.authorize(normalize_event(copy.deepcopy(events[-1])))
+
+        del events[6]
+        self.assertEqual(result, self._expected_results(events)[-1])
+
+    def test_amendment_outside_horizon(self):
+        authorizer = AmendableAuthorizer(amendment_horizon=2 * 60 * 60 * 1000000)
+        for event in copy.deepcopy(self._event_stream()):
+            authorizer.authorize(normalize_event(event))
+        result = authorizer.authorize(normalize_event({"reverse-transaction": {
+            "merchant": "Habbib's", "amount": 50, "time": "2019-02-13T11:00:00.000Z"}}))
+        self.assertEqual(result['violations'], ['amendment-outside-horizon'])
+        self.assertEqual(result['changes'], [])
+
+        result = authorizer.authorize(normalize_event({"amend-transaction": {
+            "merchant": "Subway", "amount": 1, "time": "2019-02-13T15:00:00.000Z",
+            "amended": {"time": "2019-02-13T12:59:00.000Z"}}}))
+        self.assertEqual(result['violations'], ['amendment-outside-horizon'])
+
+    def test_log_is_trimmed(self):
+        min_trim_size = amend_handler.MIN_TRIM_SIZE
+        amend_handler.MIN_TRIM_SIZE = 4
+        self.addCleanup(setattr, amend_handler, 'MIN_TRIM_SIZE', min_trim_size)
+        events = self._event_stream() + [
+            self._transaction("Subway", 1, "2019-02-13T{}:00:00.000Z".format(hour)) for hour in range(16, 20)]
+        authorizer = AmendableAuthorizer(amendment_horizon=2 * 60 * 60 * 1000000)
+        for event in copy.deepcopy(events):
+            authorizer.authorize(normalize_event(event))
+        self.assertGreater(authorizer.offset, 0)
+        self.assertEqual(len(authorizer.events) + authorizer.offset, len(events))
+
+        result = authorizer.authorize(normalize_event({"reverse-transaction": {
+            "merchant": "Subway", "amount": 1, "time": "2019-02-13T18:00:00.000Z"}}))
+        del events[9]
+        expected_results = self._expected_results(events)
+        self.assertEqual(result['account'], expected_results[-1]['account'])
+        self.assertEqual(result['changes'], [{'event': 9, 'reversed': True}, {'event': 10, **expected_results[9]}])
+
+    def test_process_amendable_event_stream(self):
+        events = [normalize_event(event) for event in self._event_stream()]
+        results = list(process_amendable_event_stream(events))
+        self.assertEqual(results, self._expected_results(self._event_stream()))
+
+
+if __name__ == '__main__':
+    unittest.main()
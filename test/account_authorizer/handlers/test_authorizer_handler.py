@@ -0,0 +1,67 @@
+# Python
+import unittest
+
+# Handlers
+from src.handlers.authorizer_handler import NO_VIOLATIONS, AuthorizationResult, Authorizer
+from src.handlers.operations_handler import process_events
+
+# Utils
+from src.utils import violation_errors
+from src.utils.transaction import Transaction
+
+
+class TestAuthorizerHandler(unittest.TestCase):
+
+    def setUp(self):
+        self.authorizer = Authorizer()
+        self.event_list = [
+            {"transaction": Transaction(merchant="Habbib's", amount=10, time=0)},
+            {"account": {"active-card": True, "available-limit": 100}},
+            {"account": {"active-card": True, "available-limit": 350}},
+            {"unknown": {}},
+        ] + [
+            {"transaction": Transaction(merchant=merchant, amount=amount, time=second * 1000000)}
+            for merchant, amount, second in [
+                ("Habbib's", 10, 10), ("Habbib's", 10, 20), ("Burger King", 20, 30), ("Burger King", 90, 40),
+                ("Burger King", 5, 300), ("Habbib's", 10, 100),
+            ]
+        ]
+
+    def test_authorize(self):
+        operation_results = []
+        for event in self.event_list:
+            result = self.authorizer.authorize(event)
+            if result is not None:
+                operation_results.append(result.to_dict())
+        self.assertEqual(operation_results, process_events(self.event_list))
+
+    def test_authorize_raw_event(self):
+        self.authorizer.authorize({"account": {"active-card": True, "available-limit": 100}})
+        result = self.authorizer.authorize({
+            "transaction": {"merchant": "Habbib's", "amount": 10, "time": "2019-02-13T11:35:00.000Z"}})
+
+        self.assertEqual(result.to_json(),
+                         '{"account": {"active-card": true, "available-limit": 90}, "violations": []}')
+        self.assertIsNone(self.authorizer.authorize({"transaction": {"merchant": "Habbib's"}}))
+
+    def test_authorize_does_not_change_the_event(self):
+        event = {"transaction": {"merchant": "Habbib's", "amount": 10, "time": "2019-02-13T11:35:00.000Z"}}
+        self.authorizer.authorize(event)
+        self.assertEqual(event, {
+            "transaction": {"merchant": "Habbib's", "amount": 10, "time": "2019-02-13T11:35:00.000Z"}})
+
+    def test_result_view(self):
+        first_result = self.authorizer.authorize({"account": {"active-card": False, "available-limit": 100}})
+        copied_result = first_result.copy()
+        second_result = self.authorizer.authorize({"account": {"active-card": True, "available-limit": 100}})
+
+        # The view is reused, the violation tuples are interned.
+        self.assertIs(first_result, second_result)
+        self.assertIs(copied_result.violations, NO_VIOLATIONS)
+        self.assertEqual(second_result, AuthorizationResult(
+            active_card=False, available_limit=100, violations=(violation_errors.ACCOUNT_ALREADY_INITIALIZED,)))
+        self.assertIs(second_result.violations, self.authorizer.authorize(self.event_list[1]).violations)
+
+
+if __name__ == '__main__':
+    unittest.main()
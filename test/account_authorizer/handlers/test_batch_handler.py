@@ -0,0 +1,76 @@
+# Python
+import io
+import os
+import tempfile
+import unittest
+
+# Handlers
+from src.handlers.batch_handler import get_batch_files, process_batch
+
+ACCOUNT_LINE = '{"account": {"active-card": true, "available-limit": %s}}\n'
+TRANSACTION_LINE = '{"transaction": {"merchant": "Burger King", "amount": 20, "time": "2019-02-13T10:00:00.000Z"}}\n'
+
+
+class TestBatchHandler(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.paths = []
+        for limit in (100, 10, 50):
+            path = os.path.join(self.directory.name, 'customer-{}.jsonl'.format(limit))
+            with open(path, 'w') as operations_file:
+                operations_file.write(ACCOUNT_LINE % limit + TRANSACTION_LINE)
+            self.paths.append(path)
+        self.paths.sort()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_get_batch_files(self):
+        self.assertEqual(get_batch_files([self.directory.name]), self.paths)
+        self.assertEqual(get_batch_files([os.path.join(self.directory.name, '*-1*.jsonl')]), self.paths[:2])
+
+    def test_merged_output(self):
+        for workers in (1, 2):
+            stream, progress = io.StringIO(), io.StringIO()
+            file_results = process_batch(self.paths, stream=stream, workers=workers, progress=progress)
+
+            # Every file starts its own account, the results keep the files order.
+            self.assertEqual(stream.getvalue().splitlines()[1::2], [
+                '{"account": {"active-card": true, "available-limit": 10}, "violations": ["insufficient-limit"]}',
+                '{"account": {"active-card": true, "available-limit": 80}, "violations": []}',
+                '{"account": {"active-card": true, "available-limit": 30}, "violations": []}',
+            ])
+            self.assertEqual([file_result.events for file_result in file_results], [2, 2, 2])
+            self.assertIn('3 files, 6 events', progress.getvalue())
+
+    def test_per_file_output(self):
+        output_dir = os.path.join(self.directory.name, 'results')
+        process_batch(self.paths, output_dir=output_dir, workers=2, progress=io.StringIO())
+
+        with open(os.path.join(output_dir, 'customer-10.jsonl.results')) as results_file:
+            self.assertEqual(len(results_file.readlines()), 2)
+
+    def test_per_file_output_with_the_same_name(self):
+        paths = []
+        for limit in (100, 10):
+            directory = os.path.join(self.directory.name, 'exports', str(limit))
+            os.makedirs(directory)
+            paths.append(os.path.join(directory, 'events.jsonl'))
+            with open(paths[-1], 'w') as operations_file:
+                operations_file.write(ACCOUNT_LINE % limit + TRANSACTION_LINE)
+
+        output_dir = os.path.join(self.directory.name, 'results')
+        process_batch(paths, output_dir=output_dir, workers=2, progress=io.StringIO())
+
+        # The results files keep the paths relative to the common directory of the files.
+        for limit, available_limit in ((100, 80), (10, 10)):
+            with open(os.path.join(output_dir, str(limit), 'events.jsonl.results')) as results_file:
+                self.assertIn('"available-limit": {}'.format(available_limit), results_file.readlines()[-1])
+
+        with self.assertRaises(ValueError):
+            process_batch(paths + paths[:1], output_dir=output_dir, workers=1, progress=io.StringIO())
+
+
+if __name__ == '__main__':
+    unittest.main()
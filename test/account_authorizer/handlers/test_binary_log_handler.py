@@ -0,0 +1,105 @@
+# Python
+import os
+import tempfile
+import unittest
+
+# Handlers
+from src.handlers.binary_log_handler import BinaryEventLog, convert_events
+from src.handlers.operations_handler import process_events
+from src.handlers.replay_handler import numpy, replay_binary_log
+
+# Utils
+from src.utils.transaction import Transaction
+
+
+class TestBinaryLogHandler(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'operations.bin')
+        self.event_list = [
+            {"transaction": Transaction(merchant="Habbib's", amount=10, time=0)},
+            {"account": {"active-card": True, "available-limit": 100.5}},
+            {"transaction": Transaction(merchant="Habbib's", amount=10, time=30000000)},
+            {"unknown": {}},
+            {"transaction": Transaction(merchant="Burger King", amount=20.25, time=60000000)},
+            {"transaction": Transaction(merchant="Habbib's", amount=10.0, time=90000000)},
+        ]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_convert_events(self):
+        self.assertEqual(convert_events(self.event_list, self.path), 5)
+
+        with BinaryEventLog(self.path) as binary_log:
+            self.assertEqual(len(binary_log), 5)
+            self.assertEqual(binary_log.merchants, ["Habbib's", "Burger King"])
+            self.assertEqual(list(binary_log.times), [0, 0, 30000000, 60000000, 90000000])
+            events = list(binary_log)
+
+        self.assertEqual(events[1], {"account": {"active-card": True, "available-limit": 100.5, "is-premium": False}})
+        self.assertIs(type(events[2]['transaction'].amount), int)
+        self.assertIs(type(events[4]['transaction'].amount), float)
+        self.assertEqual(process_events(events), process_events(self.event_list))
+
+    def test_convert_account_ids(self):
+        event_list = [{"account-id": account_id, **event} for account_id, event in zip(
+            ["1", 1, True, "1", None], [event for event in self.event_list if "unknown" not in event])]
+        event_list.append(self.event_list[0])
+        self.assertEqual(convert_events(event_list, self.path), 6)
+
+        with BinaryEventLog(self.path) as binary_log:
+            self.assertEqual(binary_log.account_dictionary, ["1", 1, True, None])
+            self.assertEqual(list(binary_log.account_ids), [0, 1, 2, 0, 3, -1])
+            events = list(binary_log)
+
+        self.assertEqual([event.get("account-id", "none") for event in events], ["1", 1, True, "1", None, "none"])
+        self.assertIs(type(events[2]["account-id"]), bool)
+        self.assertEqual(events[3], event_list[3])
+
+    def test_convert_merchant_that_is_not_a_string(self):
+        event_list = [{"transaction": Transaction(merchant=42, amount=10, time=0)}]
+        convert_events(event_list, self.path)
+
+        with BinaryEventLog(self.path) as binary_log:
+            self.assertEqual(list(binary_log), event_list)
+
+    def test_convert_unsupported_events(self):
+        with self.assertRaises(ValueError):
+            convert_events([{"transaction": Transaction(merchant="Habbib's", amount=0.1234567, time=0)}], self.path)
+
+        with self.assertRaises(ValueError):
+            convert_events([{"account": {"active-card": 1, "available-limit": 100}}], self.path)
+
+        with self.assertRaises(ValueError):
+            convert_events([{"account-id": ["1"], "account": {"active-card": True, "available-limit": 100}}], self.path)
+
+    def test_not_binary_log(self):
+        with open(self.path, 'wb') as log_file:
+            log_file.write(b'{"account": {"active-card": true, "available-limit": 100}}\n')
+
+        with self.assertRaises(ValueError):
+            BinaryEventLog(self.path)
+
+        with open(self.path, 'wb') as log_file:
+            log_file.write(b'AUTHLOG1' + bytes(24))
+
+        with self.assertRaisesRegex(ValueError, 'another version'):
+            BinaryEventLog(self.path)
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed')
+    def test_replay_binary_log(self):
+        convert_events(self.event_list, self.path)
+
+        with BinaryEventLog(self.path) as binary_log:
+            self.assertEqual(replay_binary_log(binary_log), process_events(self.event_list))
+
+        event_list = [{"account-id": "1", **event} for event in self.event_list]
+        convert_events(event_list, self.path)
+        with BinaryEventLog(self.path) as binary_log:
+            self.assertEqual(replay_binary_log(binary_log), process_events(event_list))
+
+
+if __name__ == '__main__':
+    unittest.main()
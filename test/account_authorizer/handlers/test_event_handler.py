@@ -0,0 +1,89 @@
+# Python
+import io
+import os
+import tempfile
+import unittest
+
+# Handlers
+from src.handlers.event_handler import EventReader, ParallelEventReader, normalize_event
+
+# Utils
+from src.utils.transaction import Transaction, parse_transaction_time
+
+
+class TestEventHandler(unittest.TestCase):
+
+    def test_normalize_transaction_event(self):
+        event = normalize_event({
+            "transaction": {"merchant": "Habbib's", "amount": 10, "time": "2019-02-13T11:35:00.000Z"}})
+        self.assertEqual(event, {
+            "transaction": Transaction(merchant="Habbib's", amount=10, time=1550057700000000)})
+
+    def test_normalize_transaction_event_with_a_merchant_that_is_not_a_string(self):
+        event = normalize_event({"transaction": {"merchant": 42, "amount": 10, "time": "2019-02-13T11:35:00.000Z"}})
+        self.assertEqual(event, {"transaction": Transaction(merchant=42, amount=10, time=1550057700000000)})
+
+    def test_normalize_account_event(self):
+        event = {"account": {"active-card": True, "available-limit": 1000}}
+        self.assertEqual(normalize_event(event), event)
+
+    def test_normalize_invalid_transaction_event(self):
+        with self.assertRaises(ValueError):
+            normalize_event({"transaction": {"merchant": "Habbib's", "amount": 10, "time": "2019-02-13"}})
+
+        with self.assertRaises(ValueError):
+            normalize_event({
+                "transaction": {"merchant": "Habbib's", "amount": "10", "time": "2019-02-13T11:35:00.000Z"}})
+
+    def test_parse_transaction_time(self):
+        self.assertEqual(parse_transaction_time("2019-02-13T11:35:00.000Z"), 1550057700000000)
+        self.assertEqual(parse_transaction_time("2019-02-13T11:35:00.5Z"), 1550057700500000)
+        self.assertEqual(parse_transaction_time("2019-02-13T11:35:00.123456Z"), 1550057700123456)
+
+        with self.assertRaises(ValueError):
+            parse_transaction_time("2019-02-13T25:35:00.000Z")
+
+    def test_event_reader(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'operations')
+            with open(path, 'wb') as operations_file:
+                operations_file.write(
+                    b'{"account": {"active-card": true, "available-limit": 100}}\r\n'
+                    b'\n'
+                    b'not json\n'
+                    b'{"transaction": {"merchant": "Burger King", "amount": 20, "time": "2019-02-13T10:00:00.000Z"}}'
+                )
+
+            # The small chunks split the lines, the last line has no line break.
+            event_reader = EventReader([path], chunk_size=7)
+            self.assertEqual(list(event_reader), [
+                {"account": {"active-card": True, "available-limit": 100}},
+                {"transaction": Transaction(merchant="Burger King", amount=20, time=1550052000000000)},
+            ])
+            self.assertEqual(event_reader.malformed_lines, 1)
+
+    def test_parallel_event_reader(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'operations')
+            with open(path, 'w') as operations_file:
+                operations_file.write('{"account": {"active-card": true, "available-limit": 100}}\n')
+                for second in range(200):
+                    operations_file.write('{"transaction": {"merchant": "M%d", "amount": 1, '
+                                          '"time": "2019-02-13T10:00:%02d.000Z"}}\n' % (second, second % 60))
+                    if second % 50 == 0:
+                        operations_file.write('not json\n')
+
+            # Small chunks, so there are many pending chunks decoded out of order by the workers.
+            event_reader = ParallelEventReader([path], workers=2, chunk_size=512, max_pending_chunks=3)
+            self.assertEqual(list(event_reader), list(EventReader([path])))
+            self.assertEqual(event_reader.malformed_lines, 4)
+
+    def test_event_reader_stream(self):
+        event_reader = EventReader()
+        self.assertEqual(list(event_reader._read_events(io.BytesIO(b'{"account": {"active-card": false}}\n'))), [
+            {"account": {"active-card": False}},
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
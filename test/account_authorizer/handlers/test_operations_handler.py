@@ -6,24 +6,28 @@ from src.handlers.operations_handler import (
     get_handler_by_transaction_type,
     _process_transaction_default,
     _process_transaction_event,
-    _process_account_event
+    _process_account_event,
+    process_event_stream,
+    process_events,
 )
 from src.handlers.account_handler import new_account, initialize_account
+from src.handlers.event_handler import normalize_event
 
 # Utils
 from src.utils import violation_errors
+from src.utils.transaction_history import TransactionHistory
 
 
 class TestOperationsHandler(unittest.TestCase):
     def setUp(self):
-        self.transaction_event = {
-            "transaction": {"merchant": "Habbib's", "amount": 10, "time": "2019-02-13T11:35:00.000Z"}}
-        self.transaction_event_2 = {
-            "transaction": {"merchant": "Habbib's 2", "amount": 20, "time": "2019-02-13T11:35:10.000Z"}}
-        self.transaction_event_3 = {
-            "transaction": {"merchant": "Habbib's 3", "amount": 30, "time": "2019-02-13T11:35:30.000Z"}}
-        self.transaction_event_4 = {
-            "transaction": {"merchant": "Habbib's 4", "amount": 40, "time": "2019-02-13T11:35:40.000Z"}}
+        self.transaction_event = normalize_event({
+            "transaction": {"merchant": "Habbib's", "amount": 10, "time": "2019-02-13T11:35:00.000Z"}})
+        self.transaction_event_2 = normalize_event({
+            "transaction": {"merchant": "Habbib's 2", "amount": 20, "time": "2019-02-13T11:35:10.000Z"}})
+        self.transaction_event_3 = normalize_event({
+            "transaction": {"merchant": "Habbib's 3", "amount": 30, "time": "2019-02-13T11:35:30.000Z"}})
+        self.transaction_event_4 = normalize_event({
+            "transaction": {"merchant": "Habbib's 4", "amount": 40, "time": "2019-02-13T11:35:40.000Z"}})
         self.account_event = {"account": {"active-card": True, "available-limit": 1000}}
 
     def test_handler_by_transaction_type(self):
@@ -54,7 +58,7 @@ class TestOperationsHandler(unittest.TestCase):
         account, violations = _process_transaction_event(
             event=self.transaction_event,
             account=new_account(is_active_card=True, available_limit=0),
-            previous_transactions=[]
+            previous_transactions=TransactionHistory()
         )
         self.assertEqual(violations, [violation_errors.INSUFFICIENT_LIMITS])
 
@@ -62,7 +66,7 @@ class TestOperationsHandler(unittest.TestCase):
         account, violations = _process_transaction_event(
             event=self.transaction_event,
             account=new_account(is_active_card=True, available_limit=10),
-            previous_transactions=[]
+            previous_transactions=TransactionHistory()
         )
         self.assertEqual(violations, [])
 
@@ -70,7 +74,7 @@ class TestOperationsHandler(unittest.TestCase):
         account, violations = _process_transaction_event(
             event=self.transaction_event,
             account=new_account(is_active_card=True, available_limit=100),
-            previous_transactions=[self.transaction_event]
+            previous_transactions=TransactionHistory([self.transaction_event['transaction']])
         )
         self.assertEqual(violations, [violation_errors.DOUBLED_TRANSACTION])
 
@@ -78,7 +82,11 @@ class TestOperationsHandler(unittest.TestCase):
         account, violations = _process_transaction_event(
             event=self.transaction_event_4,
             account=new_account(is_active_card=True, available_limit=100),
-            previous_transactions=[self.transaction_event, self.transaction_event_2, self.transaction_event_3]
+            previous_transactions=TransactionHistory([
+                self.transaction_event['transaction'],
+                self.transaction_event_2['transaction'],
+                self.transaction_event_3['transaction'],
+            ])
         )
         self.assertEqual(violations, [violation_errors.HIGH_FREQUENCY_SMALL_INTERVAL])
 
@@ -86,17 +94,70 @@ class TestOperationsHandler(unittest.TestCase):
         account, violations = _process_transaction_event(
             event=self.transaction_event,
             account=new_account(is_active_card=True, available_limit=100, is_premium=True),
-            previous_transactions=[self.transaction_event],
+            previous_transactions=TransactionHistory([self.transaction_event['transaction']]),
         )
         self.assertEqual(violations, [])
 
         account, violations = _process_transaction_event(
             event=self.transaction_event_4,
             account=new_account(is_active_card=True, available_limit=100, is_premium=True),
-            previous_transactions=[self.transaction_event, self.transaction_event_2, self.transaction_event_3]
+            previous_transactions=TransactionHistory([
+                self.transaction_event['transaction'],
+                self.transaction_event_2['transaction'],
+                self.transaction_event_3['transaction'],
+            ])
         )
         self.assertEqual(violations, [])
 
+    def test_process_events(self):
+        results = process_events([self.account_event, self.transaction_event, self.transaction_event])
+        self.assertEqual(results, [
+            {'account': {'active-card': True, 'available-limit': 1000}, 'violations': []},
+            {'account': {'active-card': True, 'available-limit': 990}, 'violations': []},
+            {'account': {'active-card': True, 'available-limit': 990},
+             'violations': [violation_errors.DOUBLED_TRANSACTION]},
+        ])
+
+    def test_process_transaction_later_than_the_retention(self):
+        late_event = {'transaction': self.transaction_event['transaction']._replace(
+            time=self.transaction_event['transaction'].time - 10 * 60 * 1000000)}
+        results = process_events([self.account_event, self.transaction_event, late_event, late_event])
+        # Without a max lateness, the late transaction is evaluated against the full history.
+        self.assertEqual(results[2:], [
+            {'account': {'active-card': True, 'available-limit': 980}, 'violations': []},
+            {'account': {'active-card': True, 'available-limit': 980},
+             'violations': [violation_errors.DOUBLED_TRANSACTION]},
+        ])
+
+    def test_process_out_of_order_transactions(self):
+        transactions = [event['transaction'] for event in (
+            self.transaction_event, self.transaction_event_2, self.transaction_event_3, self.transaction_event_4)]
+        late_time = transactions[-1].time + 10 * 60 * 1000000
+        events = [self.account_event, {'transaction': transactions[0]._replace(time=late_time)}] + [
+            {'transaction': transaction} for transaction in transactions]
+        results = process_events(events)
+        # The older transactions only see each other in their windows, not the newest one.
+        self.assertEqual([result['violations'] for result in results[2:]], [
+            [], [], [], [violation_errors.HIGH_FREQUENCY_SMALL_INTERVAL]])
+        self.assertEqual(results[-1]['account']['available-limit'], 930)
+
+    def test_process_late_transaction_with_max_lateness(self):
+        late_event = {'transaction': self.transaction_event['transaction']._replace(
+            time=self.transaction_event['transaction'].time - 10 * 60 * 1000000)}
+        results = list(process_event_stream([self.account_event, self.transaction_event, late_event],
+                                            max_lateness=2 * 60 * 1000000))
+        # The window of the late transaction may be evicted, it's not evaluated nor added to the window.
+        self.assertEqual(results[2], {'account': {'active-card': True, 'available-limit': 990},
+                                      'violations': [violation_errors.LATE_TRANSACTION]})
+
+    def test_process_event_stream_is_lazy(self):
+        def event_stream():
+            yield self.account_event
+            raise AssertionError('The stream was consumed before the first result.')
+
+        results = process_event_stream(event_stream())
+        self.assertEqual(next(results), {'account': {'active-card': True, 'available-limit': 1000}, 'violations': []})
+
 
 if __name__ == '__main__':
     unittest.main()
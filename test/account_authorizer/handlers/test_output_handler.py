@@ -0,0 +1,40 @@
+# Python
+import io
+import json
+import unittest
+
+# Handlers
+from src.handlers.output_handler import serialize_result, write_results
+
+# Utils
+from src.utils import violation_errors
+
+
+class TestOutputHandler(unittest.TestCase):
+
+    def setUp(self):
+        self.operation_result = {
+            'account': {'active-card': True, 'available-limit': 79.5},
+            'violations': [violation_errors.INSUFFICIENT_LIMITS, violation_errors.DOUBLED_TRANSACTION],
+        }
+
+    def test_serialize_result(self):
+        self.assertEqual(serialize_result(self.operation_result), json.dumps(self.operation_result))
+
+    def test_serialize_result_with_account_id(self):
+        operation_result = {'account-id': 'abc', **self.operation_result}
+        self.assertEqual(serialize_result(operation_result), json.dumps(operation_result))
+
+    def test_serialize_unexpected_result(self):
+        operation_result = {'account': {'active-card': 1, 'available-limit': float('inf')}, 'violations': []}
+        self.assertEqual(serialize_result(operation_result), json.dumps(operation_result))
+
+    def test_write_results(self):
+        stream = io.StringIO()
+        write_results([self.operation_result, self.operation_result], stream=stream)
+        lines = stream.getvalue().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], [self.operation_result, self.operation_result])
+
+
+if __name__ == '__main__':
+    unittest.main()
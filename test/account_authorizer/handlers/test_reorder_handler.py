@@ -0,0 +1,72 @@
+# Python
+import unittest
+
+# Handlers
+from src.handlers.operations_handler import process_event_stream, process_events
+from src.handlers.reorder_handler import process_reordered_event_stream, reorder_event_stream
+
+# Utils
+from src.utils import violation_errors
+from src.utils.transaction import Transaction
+
+
+def _transaction_event(merchant, second):
+    return {"transaction": Transaction(merchant=merchant, amount=10, time=second * 1000000)}
+
+
+class TestReorderHandler(unittest.TestCase):
+
+    def setUp(self):
+        self.account_event = {"account": {"active-card": True, "available-limit": 100}}
+
+    def test_reorder_events(self):
+        event_list = [self.account_event] + [_transaction_event(merchant, second) for merchant, second in [
+            ("A", 10), ("B", 8), ("C", 12), ("D", 11), ("E", 20),
+        ]]
+        merchants = [event['transaction'].merchant for event in reorder_event_stream(event_list[1:], 3000000)]
+        self.assertEqual(merchants, ["B", "A", "D", "C", "E"])
+
+    def test_late_events(self):
+        late_event = _transaction_event("B", 1)
+        event_list = [self.account_event, _transaction_event("A", 10), late_event, _transaction_event("C", 12)]
+        reordered_event_list = list(reorder_event_stream(event_list, 5000000))
+
+        self.assertEqual(reordered_event_list[1], {"late-transaction": late_event['transaction']})
+        operation_results = process_events(reordered_event_list)
+        self.assertEqual(operation_results[1], {
+            'account': {'active-card': True, 'available-limit': 100}, 'violations': [violation_errors.LATE_TRANSACTION]
+        })
+        # The late transaction is not evaluated nor added to the previous transactions.
+        self.assertEqual(operation_results[3]['account']['available-limit'], 80)
+
+    def test_account_event_barrier(self):
+        event_list = [_transaction_event("A", 10), _transaction_event("B", 9), self.account_event,
+                      _transaction_event("C", 8), _transaction_event("D", 11)]
+        reordered_event_list = list(reorder_event_stream(event_list, 60000000))
+
+        self.assertEqual(reordered_event_list[:3], [event_list[1], event_list[0], self.account_event])
+        self.assertIn("late-transaction", reordered_event_list[3])
+        self.assertEqual(reordered_event_list[4], event_list[4])
+
+    def test_reorder_sharded_events(self):
+        event = {"account-id": "1", **_transaction_event("A", 10)}
+        late_event = {"account-id": "1", **_transaction_event("B", 1)}
+        reordered_event_list = list(reorder_event_stream([event, late_event], 0))
+
+        self.assertEqual(reordered_event_list, [
+            event, {"late-transaction": late_event['transaction'], "account-id": "1"},
+        ])
+
+    def test_process_reordered_event_stream(self):
+        event_list = [self.account_event, _transaction_event("A", 10), _transaction_event("B", 8), [1],
+                      _transaction_event("C", 1), _transaction_event("D", 12), {"unknown": {}}]
+        operation_results = list(process_reordered_event_stream(event_list, 3000000, process_event_stream))
+
+        # The results are in the input order, the transactions were evaluated in time order.
+        self.assertEqual([operation_result['account']['available-limit'] for operation_result in operation_results],
+                         [100, 80, 90, 80, 70])
+        self.assertEqual(operation_results[3]['violations'], [violation_errors.LATE_TRANSACTION])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+# Python
+import io
+import unittest
+
+# Handlers
+from src.handlers.operations_handler import process_events
+from src.handlers.output_handler import serialize_result, write_results
+from src.handlers.replay_handler import ReplayResults, numpy, replay_events
+
+# Utils
+from src.utils.transaction import Transaction
+
+
+@unittest.skipIf(numpy is None, 'NumPy is not installed')
+class TestReplayHandler(unittest.TestCase):
+
+    def setUp(self):
+        self.account_event = {"account": {"active-card": True, "available-limit": 100}}
+        self.transaction_events = [
+            {"transaction": Transaction(merchant=merchant, amount=amount, time=second * 1000000)}
+            for merchant, amount, second in [
+                ("Habbib's", 10, 0), ("Habbib's", 10, 30), ("Burger King", 20, 60), ("Burger King", 90, 100),
+                ("Habbib's", 10, 200), ("Habbib's", 10, 330), ("Burger King", 5, 331),
+            ]
+        ]
+
+    def test_replay_events(self):
+        event_list = self.transaction_events[:1] + [self.account_event] + self.transaction_events[1:]
+        self.assertEqual(replay_events(event_list), process_events(event_list))
+
+    def test_replay_events_with_premium_account(self):
+        event_list = [{"account": {"active-card": True, "available-limit": 100, "is-premium": True}}]
+        event_list += self.transaction_events
+        self.assertEqual(replay_events(event_list), process_events(event_list))
+
+    def test_replay_out_of_order_events(self):
+        event_list = [self.account_event] + list(reversed(self.transaction_events))
+        self.assertEqual(replay_events(event_list), process_events(event_list))
+
+    def test_replay_late_events(self):
+        event_list = [self.account_event, {"late-transaction": self.transaction_events[0]['transaction']}]
+        event_list += self.transaction_events
+        self.assertEqual(replay_events(event_list), process_events(event_list))
+
+    def test_replay_results(self):
+        event_list = [self.account_event, {"account": {"active-card": False, "available-limit": 10}}, {}]
+        event_list += self.transaction_events + [{"transaction": Transaction("Wendy's", 60, 400000000)}]
+        results = replay_events(event_list)
+        expected_results = process_events(event_list)
+        self.assertIsInstance(results, ReplayResults)
+        self.assertEqual(list(results), expected_results)
+        self.assertEqual(results[-1], expected_results[-1])
+        self.assertEqual(results[1:3], expected_results[1:3])
+        self.assertEqual(results.to_json_lines(), [serialize_result(result) for result in expected_results])
+
+        stream = io.StringIO()
+        write_results(results, stream=stream)
+        self.assertEqual(stream.getvalue(), ''.join(serialize_result(result) + '\n' for result in expected_results))
+
+    def test_replay_inactive_card(self):
+        event_list = [{"account": {"active-card": False, "available-limit": 15}}] + self.transaction_events
+        self.assertEqual(replay_events(event_list), process_events(event_list))
+
+    def test_replay_float_amounts(self):
+        event_list = [{"account": {"active-card": True, "available-limit": 100.5}}] + self.transaction_events
+        event_list.append({"transaction": Transaction("Wendy's", 0.5, 400000000)})
+        results = replay_events(event_list)
+        self.assertNotIsInstance(results, ReplayResults)
+        self.assertEqual(results, process_events(event_list))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+# Python
+import unittest
+
+# Handlers
+from src.handlers.operations_handler import process_events
+from src.handlers.retry_handler import RetryCache, process_idempotent_event_stream
+
+# Utils
+from src.utils import violation_errors
+from src.utils.transaction import Transaction
+
+
+class TestRetryHandler(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0.0
+        self.retry_cache = RetryCache(max_entries=2, ttl=10.0, clock=lambda: self.now)
+        self.account_event = {"account": {"active-card": True, "available-limit": 100}}
+        self.transaction = Transaction(merchant="Habbib's", amount=30, time=1550057700000000)
+
+    def test_retried_transaction(self):
+        event_list = [self.account_event] + [{"transaction": self.transaction} for _ in range(3)]
+        operation_results = list(process_idempotent_event_stream(event_list, self.retry_cache))
+
+        self.assertEqual([operation_result['account']['available-limit'] for operation_result in operation_results],
+                         [100, 70, 70, 70])
+        self.assertEqual(operation_results[2]['violations'], [])
+        self.assertEqual(process_events(event_list)[2]['violations'], [violation_errors.DOUBLED_TRANSACTION])
+        self.assertEqual((self.retry_cache.hits, self.retry_cache.misses), (2, 1))
+        self.assertAlmostEqual(self.retry_cache.hit_rate, 2 / 3)
+
+    def test_idempotency_key(self):
+        event_list = [
+            self.account_event,
+            {"idempotency-key": "a1", "transaction": self.transaction},
+            {"idempotency-key": "a1", "transaction": self.transaction._replace(time=self.transaction.time + 1)},
+            {"idempotency-key": "a2", "transaction": self.transaction._replace(merchant="Burger King")},
+        ]
+        operation_results = list(process_idempotent_event_stream(event_list, self.retry_cache))
+
+        self.assertEqual([operation_result['account']['available-limit'] for operation_result in operation_results],
+                         [100, 70, 70, 40])
+
+    def test_invalid_event(self):
+        event_list = [self.account_event, [1], 1, {"transaction": self.transaction}]
+        operation_results = list(process_idempotent_event_stream(event_list, self.retry_cache))
+
+        self.assertEqual([operation_result['account']['available-limit'] for operation_result in operation_results],
+                         [100, 70])
+
+    def test_expiration_and_eviction(self):
+        self.retry_cache.put("a", {})
+        self.now = 11.0
+        self.assertIsNone(self.retry_cache.get("a"))
+        self.assertEqual(self.retry_cache.expirations, 1)
+
+        for key in ("b", "c", "d"):
+            self.retry_cache.put(key, {})
+        self.assertEqual(list(self.retry_cache.entries), ["c", "d"])
+        self.assertEqual(self.retry_cache.evictions, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+# Python
+import asyncio
+import json
+import unittest
+
+# Handlers
+from src.handlers.server_handler import AuthorizerServer
+
+
+class TestServerHandler(unittest.TestCase):
+
+    def setUp(self):
+        self.account_event = {"account": {"active-card": True, "available-limit": 100}}
+        self.transaction_event = {
+            "transaction": {"merchant": "Habbib's", "amount": 20, "time": "2019-02-13T11:35:00.000Z"}}
+
+    def _request(self, port, events):
+        async def request():
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(''.join(json.dumps(event) + '\n' for event in events).encode())
+            writer.write_eof()
+            lines = [json.loads(line) async for line in reader]
+            writer.close()
+            return lines
+        return request()
+
+    def test_pipelined_requests_keep_the_state(self):
+        async def run():
+            authorizer_server = AuthorizerServer()
+            server = await authorizer_server.start(host='127.0.0.1', port=0)
+            port = server.sockets[0].getsockname()[1]
+            first = await self._request(port, [self.account_event, 'invalid', self.transaction_event])
+            second = await self._request(port, [self.transaction_event])
+            await authorizer_server.stop(server)
+            return first, second
+
+        first, second = asyncio.run(run())
+        self.assertEqual(first, [
+            {'account': {'active-card': True, 'available-limit': 100}, 'violations': []},
+            {'account': {'active-card': True, 'available-limit': 80}, 'violations': []},
+        ])
+        self.assertEqual(second, [
+            {'account': {'active-card': True, 'available-limit': 80}, 'violations': ['doubled-transaction']},
+        ])
+
+    def test_long_lines_are_skipped(self):
+        async def run():
+            authorizer_server = AuthorizerServer(line_limit=1024)
+            server = await authorizer_server.start(host='127.0.0.1', port=0)
+            port = server.sockets[0].getsockname()[1]
+            long_event = {"account": {"active-card": True, "available-limit": 100, "padding": "x" * 4096}}
+            lines = await self._request(port, [long_event, self.account_event, 'invalid', long_event])
+            await authorizer_server.stop(server)
+            return authorizer_server, lines
+
+        authorizer_server, lines = asyncio.run(run())
+        self.assertEqual(lines, [{'account': {'active-card': True, 'available-limit': 100}, 'violations': []}])
+        self.assertEqual(authorizer_server.malformed_lines, 2)
+
+    def test_reading_stops_when_the_writer_fails(self):
+        class FailingServer(AuthorizerServer):
+            async def _write_results(self, pending_results, writer):
+                # The reading is blocked on the full results queue when the writer fails.
+                await asyncio.sleep(0.1)
+                raise ConnectionResetError()
+
+        async def run():
+            authorizer_server = FailingServer(max_pending=1)
+            server = await authorizer_server.start(host='127.0.0.1', port=0)
+            port = server.sockets[0].getsockname()[1]
+            lines = await asyncio.wait_for(self._request(port, [self.account_event] * 100), timeout=5)
+            await authorizer_server.stop(server)
+            return lines
+
+        self.assertEqual(asyncio.run(run()), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+# Python
+import os
+import sqlite3
+import unittest
+
+# Handlers
+from src.handlers.account_store_handler import MemoryAccountStore
+from src.handlers.event_handler import normalize_event
+from src.handlers.shard_handler import get_shard_index, process_sharded_event_stream
+
+
+def _stop_worker():
+    os._exit(1)
+
+
+class _FailingAccountStore(MemoryAccountStore):
+
+    def put(self, account_id, state):
+        raise sqlite3.OperationalError('database is locked')
+
+
+class TestShardHandler(unittest.TestCase):
+
+    def _event_stream(self):
+        return [
+            {"account-id": "1", "account": {"active-card": True, "available-limit": 100}},
+            {"account-id": "2", "account": {"active-card": True, "available-limit": 10}},
+            normalize_event({"account-id": "1", "transaction": {
+                "merchant": "Habbib's", "amount": 20, "time": "2019-02-13T11:35:00.000Z"}}),
+            normalize_event({"account-id": "2", "transaction": {
+                "merchant": "Habbib's", "amount": 20, "time": "2019-02-13T11:35:00.000Z"}}),
+            normalize_event({"account-id": "1", "transaction": {
+                "merchant": "Habbib's", "amount": 20, "time": "2019-02-13T11:35:10.000Z"}}),
+        ]
+
+    def _expected_results(self):
+        return [
+            {'account-id': '1', 'account': {'active-card': True, 'available-limit': 100}, 'violations': []},
+            {'account-id': '2', 'account': {'active-card': True, 'available-limit': 10}, 'violations': []},
+            {'account-id': '1', 'account': {'active-card': True, 'available-limit': 80}, 'violations': []},
+            {'account-id': '2', 'account': {'active-card': True, 'available-limit': 10},
+             'violations': ['insufficient-limit']},
+            {'account-id': '1', 'account': {'active-card': True, 'available-limit': 80},
+             'violations': ['doubled-transaction']},
+        ]
+
+    def test_get_shard_index(self):
+        self.assertEqual(get_shard_index("1", 4), get_shard_index("1", 4))
+        self.assertTrue(0 <= get_shard_index("1", 4) < 4)
+
+    def test_process_sharded_event_stream_in_process(self):
+        results = list(process_sharded_event_stream(self._event_stream(), workers=1))
+        self.assertEqual(results, self._expected_results())
+
+    def test_process_sharded_event_stream_with_workers(self):
+        results = list(process_sharded_event_stream(self._event_stream(), workers=2, chunk_size=2))
+        self.assertEqual(results, self._expected_results())
+
+    def _invalid_event_stream(self):
+        return [
+            [1],
+            {"account-id": [1], "account": {"active-card": True, "available-limit": 100}},
+            *self._event_stream(),
+        ]
+
+    def test_process_sharded_event_stream_skips_invalid_events(self):
+        for workers in (1, 2):
+            invalid_events = []
+            results = list(process_sharded_event_stream(self._invalid_event_stream(), workers=workers,
+                                                        count_invalid_events=invalid_events.append))
+            self.assertEqual(results, self._expected_results())
+            self.assertEqual(invalid_events, [1, 1])
+
+    def test_process_sharded_event_stream_stopped_worker(self):
+        with self.assertRaises(RuntimeError):
+            list(process_sharded_event_stream(self._event_stream(), workers=2, create_store=_stop_worker))
+
+    def test_process_sharded_event_stream_store_error(self):
+        # The store errors are not skipped like the invalid events, the run fails.
+        with self.assertRaises(sqlite3.OperationalError):
+            list(process_sharded_event_stream(self._event_stream(), workers=1, create_store=_FailingAccountStore))
+        with self.assertRaises(RuntimeError):
+            list(process_sharded_event_stream(self._event_stream(), workers=2, create_store=_FailingAccountStore))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+# Python
+import os
+import tempfile
+import unittest
+
+# Utils
+from src.utils.rules import get_rule_names, unregister_rule
+from src.utils.velocity import register_velocity_rule
+
+# Handlers
+from src.handlers.event_handler import normalize_event
+from src.handlers.operations_handler import process_events
+from src.handlers.state_handler import DurableState, process_durable_event_stream, LOG_FILE_NAME
+
+
+class TestStateHandler(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.events = [{"account": {"active-card": True, "available-limit": 100}}] + [
+            {"transaction": {"merchant": "Habbib's", "amount": 10, "time": time}} for time in [
+                "2019-02-13T11:35:00.000Z", "2019-02-13T11:35:10.000Z", "2019-02-13T11:35:20.000Z",
+                "2019-02-13T11:35:30.000Z", "2019-02-13T11:35:40.000Z",
+            ]
+        ]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _normalized_events(self, start=0, end=None):
+        return [normalize_event({key: dict(value) for key, value in event.items()}) for event in self.events[start:end]]
+
+    def _process(self, start=0, end=None, snapshot_interval=2):
+        durable_state = DurableState(self.directory.name, snapshot_interval=snapshot_interval)
+        return list(process_durable_event_stream(self._normalized_events(start, end), durable_state))
+
+    def test_restart_keeps_the_state(self):
+        expected_results = process_events(self._normalized_events())
+        self.assertEqual(self._process(end=3) + self._process(start=3), expected_results)
+
+    def test_restart_replays_only_the_log_tail(self):
+        self._process(end=5)
+        durable_state = DurableState(self.directory.name)
+        durable_state.recover()
+        durable_state.close()
+        self.assertEqual(durable_state.logged_events, 1)
+
+    def test_recovery_ignores_an_incomplete_log_line(self):
+        self._process(end=3, snapshot_interval=100)
+        with open(os.path.join(self.directory.name, LOG_FILE_NAME.format(0)), 'a') as log_file:
+            log_file.write('{"transaction": ["Habbib')
+
+        expected_results = process_events(self._normalized_events())
+        self.assertEqual(self._process(start=3, snapshot_interval=100), expected_results[3:])
+
+    def test_restart_keeps_the_velocity_trackers(self):
+        register_velocity_rule('hourly-limit', window=3600 * 1000000, max_count=2)
+        self.addCleanup(lambda: 'hourly-limit' in get_rule_names() and unregister_rule('hourly-limit'))
+        # The transactions are older than the retained window, only the tracker has them.
+        self.events[1:] = [
+            {"transaction": {"merchant": "Habbib's", "amount": 10, "time": time}} for time in [
+                "2019-02-13T10:00:00.000Z", "2019-02-13T10:20:00.000Z", "2019-02-13T10:40:00.000Z",
+            ]
+        ]
+        expected_results = process_events(self._normalized_events())
+        self.assertEqual(expected_results[3]['violations'], ['hourly-limit'])
+        self.assertEqual(self._process(end=3, snapshot_interval=1) + self._process(start=3), expected_results)
+
+
+if __name__ == '__main__':
+    unittest.main()
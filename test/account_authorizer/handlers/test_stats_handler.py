@@ -0,0 +1,90 @@
+# Python
+import io
+import os
+import tempfile
+import unittest
+
+# Utils
+from src.utils.stats import STATS
+
+# Handlers
+from src.handlers import event_handler
+from src.handlers.event_handler import get_event_stream_from_stdin
+from src.handlers.operations_handler import process_event_stream
+from src.handlers.output_handler import write_results
+from src.handlers.replay_handler import numpy, replay_events
+from src.handlers.shard_handler import process_sharded_event_stream
+from src.handlers.stats_handler import disable_stats, enable_stats, write_stats
+
+
+class TestStatsHandler(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'operations')
+        with open(self.path, 'w') as operations_file:
+            operations_file.write(
+                '{"account": {"active-card": true, "available-limit": 100}}\n'
+                'not json\n'
+                '{"transaction": {"merchant": "Burger King", "amount": 20, "time": "2019-02-13T10:00:00.000Z"}}\n'
+                '{"transaction": {"merchant": "Habbib\'s", "amount": 90, "time": "2019-02-13T11:00:00.000Z"}}\n'
+            )
+
+    def tearDown(self):
+        disable_stats()
+        STATS.reset()
+        self.directory.cleanup()
+
+    def test_disabled_stages(self):
+        decode_event = event_handler.decode_event
+        enable_stats()
+        self.assertIsNot(event_handler.decode_event, decode_event)
+        disable_stats()
+        self.assertIs(event_handler.decode_event, decode_event)
+
+    def test_pipeline_stats(self):
+        enable_stats()
+        output = io.StringIO()
+        write_results(process_event_stream(get_event_stream_from_stdin([self.path])), stream=output)
+
+        self.assertEqual(len(output.getvalue().splitlines()), 3)
+        self.assertEqual(STATS.counters[('dropped_lines', None)], 1)
+        self.assertEqual(STATS.counters[('results', None)], 3)
+        self.assertEqual(STATS.counters[('violations', 'insufficient-limit')], 1)
+        self.assertEqual(STATS.histograms['ingest'].count, 4)
+        self.assertEqual(STATS.histograms['get_event_type'].count, 3)
+        self.assertEqual(STATS.histograms['rule:insufficient-limit'].count, 2)
+        self.assertEqual(STATS.histograms['execute_operation_amount_transaction'].count, 1)
+        self.assertEqual(STATS.histograms['output'].count, 3)
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed')
+    def test_replay_stats(self):
+        enable_stats()
+        output = io.StringIO()
+        write_results(replay_events(list(get_event_stream_from_stdin([self.path]))), stream=output)
+
+        self.assertEqual(len(output.getvalue().splitlines()), 3)
+        self.assertEqual(STATS.counters[('results', None)], 3)
+        self.assertEqual(STATS.counters[('violations', 'insufficient-limit')], 1)
+
+    def test_shard_worker_stats(self):
+        enable_stats()
+        event_stream = [dict(event, **{'account-id': '1'}) for event in get_event_stream_from_stdin([self.path])]
+        results = list(process_sharded_event_stream(event_stream, workers=2))
+
+        self.assertEqual(len(results), 3)
+        # The stages of the events are measured by the workers.
+        self.assertEqual(STATS.histograms['get_event_type'].count, 3)
+        self.assertEqual(STATS.histograms['rule:insufficient-limit'].count, 2)
+
+    def test_write_stats(self):
+        STATS.increment('dropped_lines')
+        path = os.path.join(self.directory.name, 'authorizer.prom')
+        write_stats(path)
+
+        with open(path) as stats_file:
+            self.assertIn('authorizer_dropped_lines_total 1\n', stats_file.read())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,7 +5,7 @@ import unittest
 from dataclasses import FrozenInstanceError
 
 # Utils
-from src.utils.account import Account
+from src.utils.account import Account, AccountState
 
 
 class TestAccountUtils(unittest.TestCase):
@@ -15,6 +15,13 @@ class TestAccountUtils(unittest.TestCase):
         with self.assertRaises(FrozenInstanceError):
             account.is_active_card = True
 
+    def test_account_state_slots(self):
+        account = AccountState(is_active_card=True, available_limit=100, is_initialized=True)
+        account.available_limit -= 20
+        self.assertEqual(account.available_limit, 80)
+        with self.assertRaises(AttributeError):
+            account.unknown = True
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,83 @@
+# Python
+import unittest
+
+# Utils
+from src.utils import violation_errors
+from src.utils.operations import get_operation_violations
+from src.utils.rules import compile_rules, get_rule_names, register_rule, unregister_rule
+from src.utils.transaction import Transaction
+from src.utils.transaction_history import TransactionHistory
+
+# Handlers
+from src.handlers.account_handler import new_account, initialize_account
+
+
+def _get_max_amount_violations(account, operation, _):
+    if operation.amount > 50:
+        return 'max-amount'
+
+
+def _get_same_second_violations(account, operation, previous_transactions):
+    if previous_transactions.count_between(operation.time - 1000000, operation.time):
+        return 'same-second'
+
+
+class TestRulesUtils(unittest.TestCase):
+
+    def setUp(self):
+        self.operation = Transaction(merchant="Habbib's", amount=90, time=1550057700000000)
+        self.previous_transactions = TransactionHistory([self.operation])
+
+    def tearDown(self):
+        for name in ('max-amount', 'same-second'):
+            if name in get_rule_names():
+                unregister_rule(name)
+
+    def test_builtin_rules(self):
+        self.assertEqual(get_rule_names(), (
+            violation_errors.INSUFFICIENT_LIMITS,
+            violation_errors.CARD_NOT_ACTIVE,
+            violation_errors.HIGH_FREQUENCY_SMALL_INTERVAL,
+            violation_errors.DOUBLED_TRANSACTION,
+        ))
+
+    def test_custom_rules_are_ordered_by_cost_and_registration(self):
+        register_rule('same-second', _get_same_second_violations, cost=0, window=True)
+        register_rule('max-amount', _get_max_amount_violations, cost=0)
+        account = new_account(is_active_card=False, available_limit=10)
+
+        violations = get_operation_violations(account, self.operation, self.previous_transactions)
+        self.assertEqual(violations, [
+            violation_errors.INSUFFICIENT_LIMITS,
+            'max-amount',
+            violation_errors.CARD_NOT_ACTIVE,
+            'same-second',
+            violation_errors.DOUBLED_TRANSACTION,
+        ])
+
+    def test_premium_accounts_skip_the_window_rules(self):
+        register_rule('same-second', _get_same_second_violations, window=True)
+        account = new_account(is_active_card=True, available_limit=100, is_premium=True)
+        violations = get_operation_violations(account, self.operation, self.previous_transactions)
+        self.assertEqual(violations, [])
+
+    def test_not_initialized_accounts_skip_the_account_rules(self):
+        register_rule('max-amount', _get_max_amount_violations)
+        violations = get_operation_violations(initialize_account(), self.operation, TransactionHistory())
+        self.assertEqual(violations, [violation_errors.ACCOUNT_NOT_INITIALIZED])
+
+    def test_compile_active_rules(self):
+        rules = compile_rules([violation_errors.CARD_NOT_ACTIVE])
+        account = new_account(is_active_card=False, available_limit=10)
+        violations = rules.get_violations(account, self.operation, self.previous_transactions)
+        self.assertEqual(violations, [violation_errors.CARD_NOT_ACTIVE])
+
+    def test_find_violations(self):
+        rules = compile_rules([violation_errors.CARD_NOT_ACTIVE])
+        account = new_account(is_active_card=True, available_limit=10)
+        self.assertIsNone(rules.find_violations(account, self.operation, self.previous_transactions))
+        self.assertEqual(rules.get_violations(account, self.operation, self.previous_transactions), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
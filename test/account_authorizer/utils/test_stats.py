@@ -0,0 +1,50 @@
+# Python
+import unittest
+
+# Utils
+from src.utils.stats import LATENCY_BUCKETS, Histogram, Stats
+
+
+class TestStatsUtils(unittest.TestCase):
+
+    def setUp(self):
+        self.stats = Stats()
+
+    def test_histogram_buckets(self):
+        histogram = Histogram()
+        histogram.observe(0.0000001)
+        histogram.observe(0.00003)
+        histogram.observe(5.0)
+
+        self.assertEqual(histogram.count, 3)
+        self.assertEqual(histogram.bucket_counts[0], 1)
+        self.assertEqual(histogram.bucket_counts[LATENCY_BUCKETS.index(0.00005)], 1)
+        self.assertEqual(histogram.bucket_counts[-1], 1)
+
+    def test_timed_disabled(self):
+        self.assertIs(self.stats.timed('stage', len), len)
+        self.assertEqual(self.stats.histograms, {})
+
+    def test_timed_enabled(self):
+        self.stats.enabled = True
+        timed_len = self.stats.timed('stage', len)
+
+        self.assertEqual(timed_len('abc'), 3)
+        self.assertEqual(self.stats.histograms['stage'].count, 1)
+
+    def test_to_prometheus(self):
+        self.stats.increment('violations', 'insufficient-limit', 2)
+        self.stats.increment('dropped_lines')
+        self.stats.observe('ingest', 0.00002)
+
+        lines = self.stats.to_prometheus().splitlines()
+        self.assertIn('authorizer_violations_total{violation="insufficient-limit"} 2', lines)
+        self.assertIn('authorizer_dropped_lines_total 1', lines)
+        self.assertIn('authorizer_stage_seconds_bucket{stage="ingest",le="1e-05"} 0', lines)
+        self.assertIn('authorizer_stage_seconds_bucket{stage="ingest",le="2.5e-05"} 1', lines)
+        self.assertIn('authorizer_stage_seconds_bucket{stage="ingest",le="+Inf"} 1', lines)
+        self.assertIn('authorizer_stage_seconds_count{stage="ingest"} 1', lines)
+
+
+if __name__ == '__main__':
+    unittest.main()
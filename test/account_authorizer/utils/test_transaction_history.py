@@ -0,0 +1,92 @@
+# Python
+import unittest
+
+# Utils
+from src.utils.transaction import Transaction, parse_transaction_time
+from src.utils.transaction_history import TransactionHistory
+
+
+class TestTransactionHistoryUtils(unittest.TestCase):
+
+    def setUp(self):
+        self.transaction1 = Transaction(
+            merchant="TranX1", amount=10, time=parse_transaction_time("2019-02-13T11:35:05.000Z"))
+
+        self.transaction2 = Transaction(
+            merchant="TranX2", amount=20, time=parse_transaction_time("2019-02-13T11:35:10.000Z"))
+
+        self.transaction3 = Transaction(
+            merchant="TranX3", amount=30, time=parse_transaction_time("2019-02-13T11:36:20.000Z"))
+
+        self.transaction4 = Transaction(
+            merchant="TranX4", amount=40, time=parse_transaction_time("2019-02-13T11:40:00.000Z"))
+
+    def test_count_between(self):
+        history = TransactionHistory([self.transaction1, self.transaction2, self.transaction3])
+        count = history.count_between(self.transaction2.time, self.transaction3.time)
+        self.assertEqual(count, 2)
+
+    def test_count_between_excludes_later_transactions(self):
+        history = TransactionHistory([self.transaction1, self.transaction2, self.transaction3])
+        count = history.count_between(self.transaction1.time, self.transaction2.time)
+        self.assertEqual(count, 2)
+
+    def test_window_eviction(self):
+        history = TransactionHistory([
+            self.transaction1, self.transaction2, self.transaction3, self.transaction4
+        ])
+        self.assertEqual(len(history), 2)
+
+    def test_iterate_transactions(self):
+        history = TransactionHistory([self.transaction2, self.transaction1])
+        self.assertEqual(list(history), [self.transaction1, self.transaction2])
+
+    def test_out_of_order_transaction(self):
+        history = TransactionHistory([self.transaction3, self.transaction1, self.transaction2])
+        count = history.count_between(self.transaction1.time, self.transaction2.time)
+        self.assertEqual(count, 2)
+
+    def test_is_late(self):
+        history = TransactionHistory(max_lateness=2 * 60 * 1000000)
+        self.assertFalse(history.is_late(self.transaction1.time))
+        history.append(self.transaction3)
+        self.assertFalse(history.is_late(self.transaction1.time))
+        self.assertTrue(history.is_late(self.transaction3.time - 3 * 60 * 1000000))
+
+    def test_is_never_late_without_max_lateness(self):
+        history = TransactionHistory([self.transaction3])
+        self.assertFalse(history.is_late(self.transaction3.time - 60 * 60 * 1000000))
+
+    def test_archived_transactions(self):
+        history = TransactionHistory([self.transaction1, self.transaction2, self.transaction4])
+        self.assertEqual(len(history), 1)
+        # The evicted transactions are archived, a late transaction still sees them in its window.
+        self.assertEqual(history.count_between(self.transaction1.time, self.transaction2.time), 2)
+        self.assertEqual(history.count_between(self.transaction1.time, self.transaction4.time), 3)
+        transaction = self.transaction1
+        self.assertTrue(history.has_operation_between(
+            transaction.merchant, transaction.amount, transaction.time, self.transaction2.time))
+        self.assertFalse(history.has_operation_between(
+            transaction.merchant, transaction.amount, self.transaction2.time, self.transaction4.time))
+
+        history.append(self.transaction1._replace(time=self.transaction1.time - 1000000))
+        self.assertEqual(history.count_between(self.transaction1.time - 1000000, self.transaction1.time), 2)
+
+    def test_has_operation_between(self):
+        history = TransactionHistory([self.transaction1, self.transaction2])
+        transaction = self.transaction1
+        start, end = transaction.time, self.transaction2.time
+
+        self.assertTrue(history.has_operation_between(transaction.merchant, transaction.amount, start, end))
+        self.assertFalse(history.has_operation_between(transaction.merchant, 99, start, end))
+        self.assertFalse(history.has_operation_between(transaction.merchant, transaction.amount, end, end))
+
+    def test_bucket_eviction(self):
+        history = TransactionHistory([self.transaction1, self.transaction4], max_lateness=2 * 60 * 1000000)
+        transaction = self.transaction1
+        start, end = transaction.time, self.transaction4.time
+        self.assertFalse(history.has_operation_between(transaction.merchant, transaction.amount, start, end))
+
+
+if __name__ == '__main__':
+    unittest.main()
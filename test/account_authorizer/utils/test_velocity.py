@@ -0,0 +1,114 @@
+# Python
+import unittest
+
+# Utils
+from src.utils.rules import get_rule_names, unregister_rule
+from src.utils.transaction import Transaction
+from src.utils.transaction_history import TransactionHistory
+from src.utils.velocity import BucketedCounter, VelocityTracker, get_velocity_tracker_states, parse_velocity_rule, \
+    register_velocity_rule, restore_velocity_trackers
+
+# Handlers
+from src.handlers.operations_handler import process_events
+
+SECOND = 1000000
+HOUR = 3600 * SECOND
+
+
+class _TransactionTracker:
+
+    def __init__(self):
+        self.transactions = []
+
+    def add(self, transaction):
+        self.transactions.append(transaction.merchant)
+
+
+class TestVelocityUtils(unittest.TestCase):
+
+    def setUp(self):
+        self.account_event = {"account": {"active-card": True, "available-limit": 10000}}
+
+    def tearDown(self):
+        if 'hourly-limit' in get_rule_names():
+            unregister_rule('hourly-limit')
+
+    def test_bucketed_counter(self):
+        counter = BucketedCounter(window=60 * SECOND, buckets=6)
+        counter.add(0, 10)
+        counter.add(15 * SECOND, 20.5)
+        self.assertEqual(counter.get(30 * SECOND), (2, 30.5))
+
+        # The first bucket [0, 10) leaves the window once the newest bucket is [60, 70).
+        self.assertEqual(counter.get(60 * SECOND), (1, 20.5))
+        self.assertEqual(counter.get(10 * 60 * SECOND), (0, 0))
+
+        counter.add(5 * 60 * SECOND, 1)
+        self.assertEqual(counter.get(10 * 60 * SECOND), (0, 0))
+
+    def test_velocity_rule(self):
+        register_velocity_rule('hourly-limit', window=HOUR, max_count=3, max_amount=250)
+        event_list = [self.account_event] + [
+            {"transaction": Transaction(merchant=merchant, amount=amount, time=minutes * 60 * SECOND)}
+            for merchant, amount, minutes in [("A", 100, 0), ("B", 100, 10), ("C", 100, 20), ("D", 10, 30),
+                                              ("E", 10, 40), ("F", 10, 130)]
+        ]
+        violations = [operation_result['violations'] for operation_result in process_events(event_list)]
+        # C exceeds the amount, D the count, and E too because the rejected transactions are counted.
+        self.assertEqual(violations, [[], [], [], ['hourly-limit'], ['hourly-limit'], ['hourly-limit'], []])
+
+    def test_velocity_rule_per_merchant(self):
+        register_velocity_rule('hourly-limit', window=HOUR, max_count=1, per_merchant=True)
+        event_list = [self.account_event] + [
+            {"transaction": Transaction(merchant=merchant, amount=amount, time=minutes * 60 * SECOND)}
+            for merchant, amount, minutes in [("A", 10, 0), ("B", 20, 10), ("A", 30, 20)]
+        ]
+        violations = [operation_result['violations'] for operation_result in process_events(event_list)]
+        self.assertEqual(violations, [[], [], [], ['hourly-limit']])
+
+    def test_tracker_with_retained_transactions(self):
+        previous_transactions = TransactionHistory([Transaction(merchant="A", amount=10, time=0)])
+        tracker = previous_transactions.get_tracker('tracker', _TransactionTracker)
+        previous_transactions.append(Transaction(merchant="B", amount=20, time=SECOND))
+        self.assertEqual(tracker.transactions, ["A", "B"])
+
+    def test_tracker_state(self):
+        register_velocity_rule('hourly-limit', window=HOUR, max_count=2)
+        previous_transactions = TransactionHistory()
+        previous_transactions.get_tracker('hourly-limit', lambda: VelocityTracker(HOUR))
+        for minutes in (0, 20):
+            previous_transactions.append(Transaction(merchant="A", amount=10, time=minutes * 60 * SECOND))
+        states = get_velocity_tracker_states(previous_transactions)
+
+        # The restored tracker has the transactions that are not retained by the history.
+        restored_transactions = TransactionHistory()
+        restore_velocity_trackers(restored_transactions, states)
+        self.assertEqual(len(restored_transactions), 0)
+        self.assertEqual(restored_transactions.get_trackers()['hourly-limit'].get("A", 40 * 60 * SECOND), (2, 20))
+
+        # A state of another window is skipped.
+        states['hourly-limit']['window'] = 2 * HOUR
+        restored_transactions = TransactionHistory()
+        restore_velocity_trackers(restored_transactions, states)
+        self.assertEqual(restored_transactions.get_trackers(), {})
+
+    def test_tracker_prunes_idle_merchants(self):
+        tracker = VelocityTracker(HOUR, per_merchant=True)
+        for index in range(200):
+            tracker.add(Transaction(merchant=str(index), amount=1, time=index * 60 * SECOND))
+        # Only the merchants of the last hour, plus the ones added since the last pruning, are kept.
+        self.assertLess(len(tracker.get_state()['counters']), 130)
+        self.assertEqual(tracker.get("199", 199 * 60 * SECOND), (1, 1))
+
+    def test_parse_velocity_rule(self):
+        self.assertEqual(parse_velocity_rule('name=daily,window=86400,max-amount=5000,per=merchant'), {
+            'name': 'daily', 'window': 86400 * SECOND, 'per_merchant': True, 'max_amount': 5000.0,
+        })
+        with self.assertRaises(ValueError):
+            parse_velocity_rule('name=daily,window=86400')
+        with self.assertRaises(ValueError):
+            parse_velocity_rule('name=daily,window=86400,max-count=1,unknown=1')
+
+
+if __name__ == '__main__':
+    unittest.main()